@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import localtime
+
+from core.utils.cache import available_slots_key, invalidate_public_cache, public_work_days_key
+from schedule.models import TimeSlot
+from .models import Appointment
+
+
+class SlotUnavailable(Exception):
+    """
+    O horário já foi reservado por outro cliente ou não está mais ativo.
+    """
+
+
+def book_time_slot(client, barber, service, time_slot):
+    """
+    Reserva o horário e cria o agendamento em uma única transação.
+
+    O horário é reivindicado com um UPDATE condicional: apenas a primeira
+    requisição encontra `is_available=True` e altera a linha; as concorrentes
+    recebem 0 linhas afetadas e falham com `SlotUnavailable`, sem nenhuma
+    leitura adicional. Horários que já passaram (datas anteriores ou horas
+    anteriores de hoje) não podem ser reservados.
+    """
+    now = localtime()
+    with transaction.atomic():
+        claimed = TimeSlot.objects.filter(
+            pk=time_slot.pk,
+            is_available=True,
+            is_active=True,
+        ).exclude(
+            Q(date__lt=now.date()) | Q(date=now.date(), time__lte=now.time())
+        ).update(is_available=False)
+
+        if not claimed:
+            raise SlotUnavailable()
+
+        time_slot.is_available = False
+        appointment = Appointment.objects.create(
+            client=client,
+            barber=barber,
+            service=service,
+            time_slot=time_slot,
+            price=service.price,
+        )
+
+    invalidate_public_cache(public_work_days_key(barber.pk), available_slots_key(time_slot.work_day_id))
+    return appointment
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barber', '-created_at', '-id'], name='appt_barber_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['client', '-created_at', '-id'], name='appt_client_recent_idx'),
+        ),
+    ]
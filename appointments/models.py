@@ -1,5 +1,8 @@
-from django.db import models
-from users.models import User
+from decimal import Decimal
+
+from django.db import models, transaction
+from users import loyalty
+from users.models import BarberStats, User
 from services.models import Services
 from schedule.models import TimeSlot
 
@@ -10,6 +13,9 @@ class Appointment(models.Model):
         CANCELED = 'canceled', 'Cancelado'
         COMPLETED = 'completed', 'Atendido'
 
+    # A cada REWARD_THRESHOLD atendimentos o cliente ganha um agendamento gratuito
+    REWARD_THRESHOLD = loyalty.REWARD_THRESHOLD
+
     barber = models.ForeignKey(User, on_delete=models.CASCADE, related_name="barber_appointments")
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name="client_appointments")
     service = models.ForeignKey(Services, on_delete=models.CASCADE)
@@ -21,34 +27,57 @@ class Appointment(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Estatísticas e listagem do barbeiro filtram por status e período
+            models.Index(fields=['barber', 'status', 'created_at'], name='appt_barber_status_idx'),
+            # Listagem do cliente filtra por status
+            models.Index(fields=['client', 'status'], name='appt_client_status_idx'),
+            # Paginação por cursor (-created_at, -id) das listagens
+            models.Index(fields=['barber', '-created_at', '-id'], name='appt_barber_recent_idx'),
+            models.Index(fields=['client', '-created_at', '-id'], name='appt_client_recent_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         """
-        Aplica a recompensa ao agendar e atualiza o contador de agendamentos finalizados.
+        Aplica a recompensa ao agendar e atualiza o saldo de fidelidade do cliente.
         """
         is_new = not self.pk
         previous_status = None
+        previous_revenue = Decimal('0')
 
         if not is_new:
-            previous_status = Appointment.objects.get(pk=self.pk).status
+            previous = Appointment.objects.values('status', 'price').get(pk=self.pk)
+            previous_status = previous['status']
+            previous_revenue = self.revenue_for(previous['status'], previous['price'])
 
-        if is_new:
-            if self.client.confirmed_appointments_count % 5 == 0 and self.client.confirmed_appointments_count > 0: 
+        with transaction.atomic():
+            if is_new and loyalty.redeem_reward(self.client_id):
                 self.is_free = True
                 self.price = 0
-                self.client.confirmed_appointments_count = 0
-                self.client.save()
-
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
+            BarberStats.record_appointment_change(
+                barber_id=self.barber_id,
+                created_at=self.created_at,
+                previous_status=previous_status,
+                status=self.status,
+                revenue_delta=self.revenue_for(self.status, self.price) - previous_revenue,
+            )
 
-        if self.status == self.Status.COMPLETED and previous_status != self.Status.COMPLETED:
             if not self.is_free:
-                self.client.confirmed_appointments_count += 1
-                self.client.save()
+                if self.status == self.Status.COMPLETED and previous_status != self.Status.COMPLETED:
+                    loyalty.add_visits(self.client_id)
+                elif previous_status == self.Status.COMPLETED and self.status != self.Status.COMPLETED:
+                    loyalty.remove_visit(self.client_id)
 
-        elif previous_status == self.Status.COMPLETED and self.status != self.Status.COMPLETED:
-            if not self.is_free:
-                self.client.confirmed_appointments_count = max(0, self.client.confirmed_appointments_count - 1)
-                self.client.save()
+    @classmethod
+    def revenue_for(cls, status, price):
+        """
+        Valor que o agendamento soma ao faturamento: apenas atendimentos contam.
+        """
+        if status == cls.Status.COMPLETED and price:
+            return Decimal(price)
+        return Decimal('0')
 
     def __str__(self):
         return f"{self.client} - {self.service} em {self.time_slot.time}"
@@ -2,9 +2,10 @@ from rest_framework import serializers
 
 from services.models import Services
 from .models import Appointment
+from .transitions import ALLOWED_TRANSITIONS
 from users.models import User
 from users.serializers import UserSerializer
-from schedule.models import TimeSlot
+from schedule.models import TimeSlot, WorkDay
 from schedule.serializers import TimeSlotSerializer
 from services.serializers import ServicoSerializer
 
@@ -48,6 +49,19 @@ class AppointmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "is_free", "created_at"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Carrega em uma única consulta todas as relações aninhadas, incluindo o
+        consolidado de avaliações usado pelo UserSerializer.
+        """
+        return queryset.select_related(
+            'barber__stats',
+            'client__stats',
+            'service__barber__stats',
+            'time_slot__work_day'
+        )
+
     def get_day_of_week(self, obj):
         """Retorna o dia da semana formatado em português"""
         return obj.time_slot.work_day.get_day_of_week_display()
@@ -56,3 +70,107 @@ class AppointmentSerializer(serializers.ModelSerializer):
         service = validated_data['service']
         validated_data['price'] = service.price
         return Appointment.objects.create(**validated_data)
+
+
+class AppointmentListRepresentation:
+    """
+    Representação leve e somente leitura das listas de agendamentos.
+
+    Monta cada item a partir de linhas de `values()`, sem instanciar modelos nem
+    serializers aninhados. `?fields=` escolhe os campos planos e `?expand=`
+    inclui os objetos relacionados como dicionários enxutos.
+    """
+    FIELDS = {
+        'id': 'id',
+        'status': 'status',
+        'price': 'price',
+        'is_free': 'is_free',
+        'created_at': 'created_at',
+        'barber_name': 'barber__username',
+        'client_name': 'client__username',
+        'service_name': 'service__name',
+        'time': 'time_slot__time',
+        'day_of_week': 'time_slot__work_day__day_of_week',
+    }
+    EXPANDABLE = {
+        'barber': ('id', 'username', 'whatsapp', 'avatar_thumbnail', 'address', 'pix_key'),
+        'client': ('id', 'username', 'whatsapp', 'avatar_thumbnail'),
+        'service': ('id', 'name', 'price', 'image_thumbnail'),
+        'time_slot': ('id', 'time', 'work_day_id'),
+    }
+    # Sempre consultados: a paginação por cursor depende deles
+    KEY_FIELDS = ('id', 'created_at')
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields or list(self.FIELDS)
+        self.expand = expand or []
+
+    @staticmethod
+    def is_requested(request):
+        params = request.query_params
+        return 'fields' in params or 'expand' in params
+
+    @classmethod
+    def from_request(cls, request):
+        """
+        Lê `fields` e `expand` da query string, rejeitando nomes desconhecidos.
+        """
+        selected = {}
+        for param, allowed in (('fields', cls.FIELDS), ('expand', cls.EXPANDABLE)):
+            names = [name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()]
+            invalid = [name for name in names if name not in allowed]
+            if invalid:
+                raise serializers.ValidationError({
+                    param: f"Campos inválidos: {', '.join(invalid)}. Valores permitidos: {', '.join(allowed)}"
+                })
+            selected[param] = list(dict.fromkeys(names))
+        return cls(**selected)
+
+    def get_value_paths(self):
+        paths = [self.FIELDS[name] for name in self.fields]
+        paths += [f'{relation}__{field}' for relation in self.expand for field in self.EXPANDABLE[relation]]
+        return list(dict.fromkeys([*self.KEY_FIELDS, *paths]))
+
+    def values(self, queryset):
+        return queryset.values(*self.get_value_paths())
+
+    def to_representation(self, rows):
+        weekdays = dict(WorkDay.Weekday.choices)
+        data = []
+        for row in rows:
+            item = {name: row[self.FIELDS[name]] for name in self.fields}
+            if 'day_of_week' in item:
+                item['day_of_week'] = weekdays.get(item['day_of_week'])
+            if 'time' in item and item['time'] is not None:
+                item['time'] = item['time'].isoformat()
+            if 'price' in item:
+                item['price'] = str(item['price'])
+            for relation in self.expand:
+                nested = {field: row[f'{relation}__{field}'] for field in self.EXPANDABLE[relation]}
+                if 'price' in nested:
+                    nested['price'] = str(nested['price'])
+                if 'time' in nested:
+                    nested['time'] = nested['time'].isoformat()
+                item[relation] = nested
+            data.append(item)
+        return data
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    """
+    Entrada da transição em lote: ids dos agendamentos e status de destino.
+    """
+    MAX_APPOINTMENTS = 100
+
+    appointment_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_APPOINTMENTS
+    )
+    status = serializers.ChoiceField(choices=[
+        (value, label) for value, label in Appointment.Status.choices if value in ALLOWED_TRANSITIONS
+    ])
+
+    def validate_appointment_ids(self, value):
+        # Mantém a ordem enviada, sem repetições
+        return list(dict.fromkeys(value))
@@ -1,3 +1,559 @@
-from django.test import TestCase
+import threading
+from datetime import time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from schedule.models import TimeSlot, WorkDay
+from services.models import Services
+from users.models import BarberStats, User
+from .booking import SlotUnavailable, book_time_slot
+from .models import Appointment
+from .transitions import TRANSITION_FIELDS, TransitionConflict, apply_transition, transition_appointment
+
+
+def create_barber(email='barbeiro@teste.com', **kwargs):
+    return User.objects.create_user(
+        username=kwargs.pop('username', 'barbeiro'),
+        email=email,
+        profile_type=User.Perfil.BARBER,
+        city=kwargs.pop('city', User.Cidade.SALINAS_MG),
+        **kwargs
+    )
+
+
+def create_client(email='cliente@teste.com', **kwargs):
+    return User.objects.create_user(
+        username=kwargs.pop('username', 'cliente'),
+        email=email,
+        profile_type=User.Perfil.CLIENT,
+        city=kwargs.pop('city', User.Cidade.SALINAS_MG),
+        **kwargs
+    )
+
+
+# Dia da semana de amanhã: os horários dos testes nunca são de hoje, em que os
+# horários que já passaram não podem ser reservados
+TEST_WEEKDAY = next(
+    day for day, order in WorkDay.WEEKDAY_ORDER.items() if order - 1 == (localdate() + timedelta(days=1)).weekday()
+)
+
+
+def create_work_day(barber, day_of_week=TEST_WEEKDAY):
+    return WorkDay.objects.create(
+        barber=barber,
+        day_of_week=day_of_week,
+        start_time=time(8, 0),
+        end_time=time(12, 0),
+        lunch_start_time=time(10, 0),
+        lunch_end_time=time(10, 30),
+        slot_duration=30,
+    )
+
+
+def create_service(barber, price='30.00', name='Corte'):
+    return Services.objects.create(barber=barber, name=name, description='Corte simples', price=price)
+
+
+class CreateAppointmentAPITest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+        self.service = create_service(self.barber)
+        self.work_day = create_work_day(self.barber)
+        self.time_slot = self.work_day.time_slots.filter(is_active=True).first()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def payload(self):
+        return {
+            'barber_id': self.barber.id,
+            'client_id': self.client_user.id,
+            'service_id': self.service.id,
+            'time_slot_id': self.time_slot.id,
+        }
+
+    def test_books_slot_and_marks_it_unavailable(self):
+        response = self.api.post('/api/v1/appointments/create/', self.payload(), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.time_slot.refresh_from_db()
+        self.assertFalse(self.time_slot.is_available)
+        appointment = Appointment.objects.get()
+        self.assertEqual(appointment.client, self.client_user)
+        self.assertEqual(appointment.price, Decimal('30.00'))
+
+    def test_second_booking_of_same_slot_returns_conflict(self):
+        self.api.post('/api/v1/appointments/create/', self.payload(), format='json')
+        response = self.api.post('/api/v1/appointments/create/', self.payload(), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_slot_earlier_today_cannot_be_booked(self):
+        passed = TimeSlot.objects.create(
+            work_day=self.work_day, barber=self.barber, date=localdate(), time=time(0, 0)
+        )
+
+        with self.assertRaises(SlotUnavailable):
+            book_time_slot(client=self.client_user, barber=self.barber, service=self.service, time_slot=passed)
+        passed.refresh_from_db()
+        self.assertTrue(passed.is_available)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    """
+    Dispara centenas de reservas simultâneas para o mesmo horário e garante
+    que exatamente uma delas vence.
+    """
+    workers = 200
+
+    def test_exactly_one_winner(self):
+        barber = create_barber()
+        service = create_service(barber)
+        time_slot = create_work_day(barber).time_slots.filter(is_active=True).first()
+        clients = [
+            create_client(email=f'cliente{i}@teste.com', username=f'cliente{i}')
+            for i in range(self.workers)
+        ]
+
+        barrier = threading.Barrier(self.workers)
+        results = []
+        lock = threading.Lock()
+
+        def attempt(client):
+            outcome = 'error'
+            try:
+                barrier.wait()
+                book_time_slot(client=client, barber=barber, service=service, time_slot=time_slot)
+                outcome = 'won'
+            except SlotUnavailable:
+                outcome = 'lost'
+            except OperationalError:
+                # O SQLite serializa escritores e pode recusar a transação
+                # concorrente; ela também não reservou o horário.
+                outcome = 'lost'
+            finally:
+                connection.close()
+                with lock:
+                    results.append(outcome)
+
+        threads = [threading.Thread(target=attempt, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('won'), 1)
+        self.assertEqual(results.count('lost'), self.workers - 1)
+        self.assertEqual(Appointment.objects.filter(time_slot_id=time_slot.pk).count(), 1)
+        time_slot.refresh_from_db()
+        self.assertFalse(time_slot.is_available)
+
+
+class AppointmentTransitionTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+        self.time_slot = create_work_day(self.barber).time_slots.filter(is_active=True).first()
+        self.appointment = book_time_slot(
+            client=self.client_user, barber=self.barber, service=create_service(self.barber), time_slot=self.time_slot
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def post(self, action, user=None):
+        if user is not None:
+            self.api.force_authenticate(user)
+        return self.api.post(f'/api/v1/appointments/{action}/{self.appointment.id}/')
+
+    def test_confirm_then_complete_updates_counter_and_stats(self):
+        self.assertEqual(self.post('confirm').data['status'], Appointment.Status.CONFIRMED)
+        response = self.post('complete')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Appointment.Status.COMPLETED)
+        self.client_user.refresh_from_db()
+        self.assertEqual(self.client_user.confirmed_appointments_count, 1)
+        stats = BarberStats.objects.get(barber=self.barber)
+        self.assertEqual((stats.pending_count, stats.completed_count, stats.revenue), (0, 1, Decimal('30.00')))
+
+    def test_client_cancel_frees_the_slot(self):
+        response = self.post('cancel', self.client_user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.time_slot.refresh_from_db()
+        self.assertTrue(self.time_slot.is_available)
+        self.assertEqual(BarberStats.objects.get(barber=self.barber).canceled_count, 1)
+
+    def test_invalid_transitions_are_rejected(self):
+        self.assertEqual(self.post('complete').status_code, status.HTTP_400_BAD_REQUEST)
+        self.post('cancel')
+        self.assertEqual(self.post('confirm').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post('cancel').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_the_owner_can_transition(self):
+        other = create_barber('outro@teste.com', username='outro')
+
+        self.assertEqual(self.post('confirm', other).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.post('confirm', self.client_user).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.api.post('/api/v1/appointments/cancel/999999/').status_code, status.HTTP_404_NOT_FOUND
+        )
+
+    def test_stale_transition_conflicts_instead_of_overwriting(self):
+        stale = Appointment.objects.filter(pk=self.appointment.pk).values(*TRANSITION_FIELDS).get()
+        transition_appointment(self.appointment.id, Appointment.Status.CANCELED, self.client_user)
+
+        with self.assertRaises(TransitionConflict):
+            apply_transition(stale, Appointment.Status.CONFIRMED, self.barber)
+
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, Appointment.Status.CANCELED)
+        self.assertEqual(BarberStats.objects.get(barber=self.barber).confirmed_count, 0)
+
+
+class BulkAppointmentTransitionTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+        self.service = create_service(self.barber)
+        self.slots = list(create_work_day(self.barber).time_slots.filter(is_active=True))
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def book(self, count):
+        return [
+            book_time_slot(client=self.client_user, barber=self.barber, service=self.service, time_slot=slot).id
+            for slot in self.slots[Appointment.objects.count():][:count]
+        ]
+
+    def post(self, appointment_ids, target):
+        return self.api.post(
+            '/api/v1/appointments/bulk-transition/',
+            {'appointment_ids': appointment_ids, 'status': target},
+            format='json'
+        )
+
+    def test_reports_result_per_id(self):
+        pending = self.book(2)
+        other_barber = create_barber('outro@teste.com', username='outro')
+        foreign = book_time_slot(
+            client=self.client_user, barber=other_barber, service=create_service(other_barber),
+            time_slot=create_work_day(other_barber).time_slots.filter(is_active=True).first()
+        ).id
+        self.post(pending[1:], Appointment.Status.CANCELED)
+
+        response = self.post([*pending, foreign, 999999, pending[0]], Appointment.Status.CONFIRMED)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(
+            [(item['id'], item['result'], item['status']) for item in response.data['results']],
+            [
+                (pending[0], 'updated', Appointment.Status.CONFIRMED),
+                (pending[1], 'invalid', Appointment.Status.CANCELED),
+                (foreign, 'forbidden', None),
+                (999999, 'not_found', None),
+            ]
+        )
+        self.assertEqual(Appointment.objects.get(pk=foreign).status, Appointment.Status.PENDING)
+
+    def test_complete_updates_counters_in_aggregate(self):
+        appointment_ids = self.book(6)
+        self.post(appointment_ids, Appointment.Status.CONFIRMED)
+
+        response = self.post(appointment_ids, Appointment.Status.COMPLETED)
+
+        self.assertEqual(response.data['updated'], 6)
+        self.client_user.refresh_from_db()
+        self.assertEqual(self.client_user.confirmed_appointments_count, 6)
+        stats = BarberStats.objects.get(barber=self.barber)
+        self.assertEqual((stats.pending_count, stats.completed_count, stats.revenue), (0, 6, Decimal('180.00')))
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def queries(appointment_ids):
+            with CaptureQueriesContext(connection) as context:
+                self.post(appointment_ids, Appointment.Status.CANCELED)
+            return len(context)
+
+        self.assertEqual(queries(self.book(2)), queries(self.book(10)))
+        self.assertEqual(self.work_day_available(), len(self.slots))
+
+    def work_day_available(self):
+        return TimeSlot.objects.filter(pk__in=[slot.pk for slot in self.slots], is_available=True).count()
+
+    def test_rejects_invalid_payload(self):
+        self.assertEqual(self.post([], Appointment.Status.CONFIRMED).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([1], Appointment.Status.PENDING).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BarberStatisticsAPITest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.service = create_service(self.barber)
+        self.slots = list(create_work_day(self.barber).time_slots.filter(is_active=True))
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def create_appointments(self, count, appointment_status=Appointment.Status.COMPLETED):
+        for i in range(count):
+            client = create_client(email=f'cliente{appointment_status}{i}@teste.com', username=f'cliente{i}')
+            Appointment.objects.create(
+                barber=self.barber,
+                client=client,
+                service=self.service,
+                time_slot=self.slots[i % len(self.slots)],
+                price=self.service.price,
+                status=appointment_status,
+            )
+
+    def test_statistics_totals(self):
+        self.create_appointments(3)
+        self.create_appointments(2, Appointment.Status.CANCELED)
+
+        response = self.api.get('/api/v1/appointments/barber/statistics/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['last_30_days_stats']
+        self.assertEqual(stats['total_appointments'], 5)
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(stats['canceled'], 2)
+        self.assertEqual(stats['revenue'], 90.0)
+        self.assertEqual(stats['status_distribution'][Appointment.Status.COMPLETED], 3)
+        self.assertEqual(response.data['financial_metrics']['lifetime_gross_revenue'], 90.0)
+
+    def test_query_count_does_not_grow_with_appointments(self):
+        self.create_appointments(1)
+        self.barber.refresh_from_db()
+        with self.assertNumQueries(4):
+            self.api.get('/api/v1/appointments/barber/statistics/')
+
+        self.create_appointments(20, Appointment.Status.CANCELED)
+        self.barber.refresh_from_db()
+        with self.assertNumQueries(4):
+            self.api.get('/api/v1/appointments/barber/statistics/')
+
+
+class AppointmentListQueryCountTest(TestCase):
+    def setUp(self):
+        self.client_user = create_client()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.created = 0
+
+    def create_appointments(self, count):
+        for _ in range(count):
+            self.created += 1
+            barber = create_barber(email=f'barbeiro{self.created}@teste.com', username=f'barbeiro{self.created}')
+            service = create_service(barber)
+            time_slot = create_work_day(barber).time_slots.first()
+            Appointment.objects.create(
+                barber=barber,
+                client=self.client_user,
+                service=service,
+                time_slot=time_slot,
+                price=service.price,
+            )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.api.get('/api/v1/appointments/client/appointments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries), len(response.data)
+
+    def test_query_count_is_constant_as_list_grows(self):
+        self.create_appointments(2)
+        small_queries, small_rows = self.count_queries()
+
+        self.create_appointments(10)
+        large_queries, large_rows = self.count_queries()
+
+        self.assertEqual((small_rows, large_rows), (2, 12))
+        self.assertEqual(small_queries, large_queries)
+
+
+class AppointmentKeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.service = create_service(self.barber)
+        self.time_slot = create_work_day(self.barber).time_slots.first()
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+        self.appointments = [
+            Appointment.objects.create(
+                barber=self.barber,
+                client=create_client(email=f'cliente{i}@teste.com', username=f'cliente{i}'),
+                service=self.service,
+                time_slot=self.time_slot,
+                price=self.service.price,
+            )
+            for i in range(5)
+        ]
+        # Dois agendamentos com a mesma data de criação exercitam o desempate por id
+        Appointment.objects.filter(pk=self.appointments[1].pk).update(created_at=self.appointments[2].created_at)
+
+    def test_pages_cover_every_appointment_once(self):
+        url = '/api/v1/appointments/barber/appointments/'
+        seen = []
+        params = {'page_size': 2}
+        pages = 0
+        while True:
+            response = self.api.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages += 1
+            seen += [item['id'] for item in response.data['results']]
+            if not response.data['has_more']:
+                self.assertIsNone(response.data['next_cursor'])
+                break
+            params = {'page_size': 2, 'cursor': response.data['next_cursor']}
+
+        self.assertEqual(pages, 3)
+        expected = list(
+            Appointment.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_unpaginated_request_keeps_full_list(self):
+        response = self.api.get('/api/v1/appointments/barber/appointments/')
+
+        self.assertEqual(len(response.data), 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.api.get('/api/v1/appointments/barber/appointments/', {'cursor': 'invalido'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ClientStatisticsAPITest(TestCase):
+    def setUp(self):
+        self.client_user = create_client()
+        self.barber = create_barber()
+        self.service = create_service(self.barber)
+        self.slots = list(create_work_day(self.barber).time_slots.filter(is_active=True))
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def create_appointments(self, count, appointment_status=Appointment.Status.COMPLETED):
+        for i in range(count):
+            Appointment.objects.create(
+                barber=self.barber,
+                client=self.client_user,
+                service=self.service,
+                time_slot=self.slots[i % len(self.slots)],
+                price=self.service.price,
+                status=appointment_status,
+            )
+
+    def test_statistics_totals(self):
+        self.create_appointments(3)
+        self.create_appointments(1, Appointment.Status.CANCELED)
+        User.objects.filter(pk=self.client_user.pk).update(confirmed_appointments_count=3)
+        self.client_user.refresh_from_db()
+
+        response = self.api.get('/api/v1/appointments/client/statistics/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_appointments'], 4)
+        self.assertEqual(response.data['status_distribution'][Appointment.Status.COMPLETED], 3)
+        self.assertEqual(response.data['status_distribution'][Appointment.Status.CANCELED], 1)
+        self.assertEqual(response.data['total_spent'], 90.0)
+        self.assertEqual(response.data['loyalty']['remaining_for_next_reward'], 2)
+        self.assertFalse(response.data['loyalty']['reward_available'])
+        self.assertEqual(len(response.data['appointments']), 4)
+        self.assertEqual(response.data['appointments'][0]['service'], 'Corte')
+
+    def test_query_count_does_not_grow_with_appointments(self):
+        self.create_appointments(1)
+        with self.assertNumQueries(2):
+            self.api.get('/api/v1/appointments/client/statistics/')
+
+        self.create_appointments(20, Appointment.Status.CANCELED)
+        with self.assertNumQueries(2):
+            self.api.get('/api/v1/appointments/client/statistics/')
+
+    def test_date_range_and_pagination(self):
+        self.create_appointments(3)
+
+        response = self.api.get('/api/v1/appointments/client/statistics/', {'end_date': '2000-01-01'})
+        self.assertEqual(response.data['total_appointments'], 0)
+
+        response = self.api.get('/api/v1/appointments/client/statistics/', {'page_size': 2})
+        self.assertEqual(response.data['total_appointments'], 3)
+        self.assertEqual(len(response.data['appointments']), 2)
+        self.assertTrue(response.data['has_more'])
+
+        response = self.api.get(
+            '/api/v1/appointments/client/statistics/',
+            {'page_size': 2, 'cursor': response.data['next_cursor']}
+        )
+        self.assertEqual(len(response.data['appointments']), 1)
+        self.assertFalse(response.data['has_more'])
+
+    def test_invalid_date_is_rejected(self):
+        response = self.api.get('/api/v1/appointments/client/statistics/', {'start_date': 'ontem'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AppointmentSparseFieldsTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+        self.service = create_service(self.barber)
+        self.time_slot = create_work_day(self.barber).time_slots.first()
+        self.appointment = Appointment.objects.create(
+            barber=self.barber,
+            client=self.client_user,
+            service=self.service,
+            time_slot=self.time_slot,
+            price=self.service.price,
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def test_fields_returns_only_selected_columns(self):
+        response = self.api.get(
+            '/api/v1/appointments/barber/appointments/',
+            {'fields': 'client_name,service_name,time,status'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{
+            'client_name': self.client_user.username,
+            'service_name': 'Corte',
+            'time': '08:00:00',
+            'status': Appointment.Status.PENDING,
+        }])
+
+    def test_expand_includes_nested_objects(self):
+        response = self.api.get(
+            '/api/v1/appointments/barber/appointments/',
+            {'fields': 'id', 'expand': 'client,service'}
+        )
+
+        item = response.data[0]
+        self.assertEqual(item['id'], self.appointment.id)
+        self.assertEqual(item['client']['username'], self.client_user.username)
+        self.assertEqual(item['service']['price'], '30.00')
+        self.assertNotIn('barber', item)
+
+    def test_sparse_list_uses_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.api.get('/api/v1/appointments/barber/appointments/', {'expand': 'barber,client,service,time_slot'})
+
+    def test_sparse_list_supports_pagination(self):
+        response = self.api.get('/api/v1/appointments/barber/appointments/', {'fields': 'id', 'page_size': 1})
+
+        self.assertEqual(response.data['results'], [{'id': self.appointment.id}])
+        self.assertFalse(response.data['has_more'])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.api.get('/api/v1/appointments/barber/appointments/', {'fields': 'id,password'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
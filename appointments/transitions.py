@@ -0,0 +1,178 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.utils.cache import available_slots_key, invalidate_public_cache, public_work_days_key
+from schedule.models import TimeSlot
+from users import loyalty
+from users.models import BarberStats
+from .models import Appointment
+
+
+# Status de origem aceitos para cada status de destino
+ALLOWED_TRANSITIONS = {
+    Appointment.Status.CONFIRMED: (Appointment.Status.PENDING,),
+    Appointment.Status.COMPLETED: (Appointment.Status.CONFIRMED,),
+    Appointment.Status.CANCELED: (Appointment.Status.PENDING, Appointment.Status.CONFIRMED),
+}
+
+# Transições que o cliente do agendamento também pode executar (as demais são do barbeiro)
+CLIENT_TRANSITIONS = (Appointment.Status.CANCELED,)
+
+# Colunas lidas para aplicar a transição e seus efeitos (imutáveis, exceto o status)
+TRANSITION_FIELDS = (
+    'id', 'status', 'barber_id', 'client_id', 'time_slot_id', 'time_slot__work_day_id',
+    'price', 'is_free', 'created_at',
+)
+
+
+class TransitionError(Exception):
+    """
+    Base dos erros de transição de status de um agendamento.
+    """
+
+
+class AppointmentNotFound(TransitionError):
+    pass
+
+
+class TransitionForbidden(TransitionError):
+    """
+    O usuário não é o barbeiro (ou, no cancelamento, o cliente) do agendamento.
+    """
+
+
+class InvalidTransition(TransitionError):
+    """
+    O status atual do agendamento não permite a transição pedida.
+    """
+
+    def __init__(self, current, target):
+        self.current = current
+        self.target = target
+        super().__init__(f'Não é possível passar de "{current}" para "{target}".')
+
+
+class TransitionConflict(TransitionError):
+    """
+    O agendamento foi alterado por outra requisição entre a leitura e o UPDATE.
+    """
+
+
+def owner_filter(user, target):
+    if target in CLIENT_TRANSITIONS:
+        return Q(barber_id=user.pk) | Q(client_id=user.pk)
+    return Q(barber_id=user.pk)
+
+
+def is_owner(row, user, target):
+    return row['barber_id'] == user.pk or (target in CLIENT_TRANSITIONS and row['client_id'] == user.pk)
+
+
+def transition_appointment(appointment_id, target, user):
+    """
+    Executa a transição de status do agendamento pelo usuário e retorna o novo estado.
+    """
+    row = Appointment.objects.filter(pk=appointment_id).values(*TRANSITION_FIELDS).first()
+    if row is None:
+        raise AppointmentNotFound()
+    if not is_owner(row, user, target):
+        raise TransitionForbidden()
+    return apply_transition(row, target, user)
+
+
+def apply_transition(row, target, user):
+    """
+    Aplica a transição a partir da linha lida (`TRANSITION_FIELDS`).
+
+    O status é trocado com um único UPDATE condicional no status lido e no dono do
+    agendamento: se outra requisição alterou o agendamento nesse meio tempo, nenhuma
+    linha é afetada e a transição falha com `TransitionConflict`, sem sobrescrevê-la.
+    Horário, contador de fidelidade e estatísticas são atualizados na mesma transação
+    com UPDATEs diretos, sem reler o agendamento.
+    """
+    if row['status'] not in ALLOWED_TRANSITIONS[target]:
+        raise InvalidTransition(row['status'], target)
+
+    with transaction.atomic():
+        updated = Appointment.objects.filter(
+            owner_filter(user, target),
+            pk=row['id'],
+            status=row['status'],
+        ).update(status=target)
+        if not updated:
+            raise TransitionConflict()
+        apply_side_effects([row], target)
+
+    return {**row, 'previous_status': row['status'], 'status': target}
+
+
+def bulk_transition(appointment_ids, target, barber):
+    """
+    Aplica a mesma transição a vários agendamentos do barbeiro em uma transação.
+
+    As linhas são lidas e travadas de uma vez (SELECT ... FOR UPDATE), validadas em
+    conjunto e atualizadas com um UPDATE por status de origem; horários, fidelidade
+    e estatísticas recebem os efeitos somados. Retorna {id: (resultado, status)},
+    com resultado 'updated', 'not_found', 'forbidden' ou 'invalid'.
+    """
+    results = {}
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in Appointment.objects.select_for_update().filter(pk__in=appointment_ids).values(*TRANSITION_FIELDS)
+        }
+        by_status = {}
+        for appointment_id in appointment_ids:
+            row = rows.get(appointment_id)
+            if row is None:
+                results[appointment_id] = ('not_found', None)
+            elif row['barber_id'] != barber.pk:
+                results[appointment_id] = ('forbidden', None)
+            elif row['status'] not in ALLOWED_TRANSITIONS[target]:
+                results[appointment_id] = ('invalid', row['status'])
+            else:
+                by_status.setdefault(row['status'], []).append(row)
+                results[appointment_id] = ('updated', target)
+
+        for status, group in by_status.items():
+            Appointment.objects.filter(
+                pk__in=[row['id'] for row in group],
+                barber_id=barber.pk,
+                status=status,
+            ).update(status=target)
+        apply_side_effects([row for group in by_status.values() for row in group], target)
+
+    return results
+
+
+def apply_side_effects(rows, target):
+    """
+    Efeitos das transições já gravadas: libera os horários cancelados, soma os
+    atendimentos não gratuitos ao contador de fidelidade e atualiza as estatísticas.
+    """
+    if not rows:
+        return
+    BarberStats.record_appointment_changes([
+        (
+            row['barber_id'],
+            row['created_at'],
+            row['status'],
+            target,
+            Appointment.revenue_for(target, row['price']) - Appointment.revenue_for(row['status'], row['price']),
+        )
+        for row in rows
+    ])
+
+    if target == Appointment.Status.CANCELED:
+        TimeSlot.objects.filter(pk__in=[row['time_slot_id'] for row in rows]).update(is_available=True)
+        invalidate_public_cache(*{
+            key for row in rows
+            for key in (public_work_days_key(row['barber_id']), available_slots_key(row['time_slot__work_day_id']))
+        })
+
+    if target == Appointment.Status.COMPLETED:
+        visits = Counter(row['client_id'] for row in rows if not row['is_free'])
+        for client_id, count in visits.items():
+            loyalty.add_visits(client_id, count)
@@ -1,11 +1,12 @@
 from django.urls import path
-from .views import ConfirmAppintmentAPIView, CreateAppointmentAPIView, CancelAppointmentAPIView, BarberStatisticsAPIView, ClientStatisticsAPIView, BarberAppointmentsListView, CompleteAppointmentAPIView, ClientAppointmentsListView
+from .views import BulkAppointmentTransitionAPIView, ConfirmAppintmentAPIView, CreateAppointmentAPIView, CancelAppointmentAPIView, BarberStatisticsAPIView, ClientStatisticsAPIView, BarberAppointmentsListView, CompleteAppointmentAPIView, ClientAppointmentsListView
 
 urlpatterns = [
     path('create/', CreateAppointmentAPIView.as_view(), name='create-appointment'),
     path('cancel/<int:appointment_id>/', CancelAppointmentAPIView.as_view(), name='cancel-appointment'),
     path('confirm/<int:appointment_id>/', ConfirmAppintmentAPIView.as_view(), name='confirm-appointment'),
     path('complete/<int:appointment_id>/', CompleteAppointmentAPIView.as_view(), name='complete-appointment'),
+    path('bulk-transition/', BulkAppointmentTransitionAPIView.as_view(), name='bulk-appointment-transition'),
     path('barber/statistics/', BarberStatisticsAPIView.as_view(), name='barber-statistics'),
     path('client/statistics/', ClientStatisticsAPIView.as_view(), name='client-statistics'),
     path('barber/appointments/', BarberAppointmentsListView.as_view(), name='barber-appointments-list'),
@@ -3,18 +3,54 @@ from django.db.models import Q, Case, When, Value, IntegerField, F
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from core.pagination import KeysetPagination
 from core.permissions import IsBarber, IsClient
 from core.utils.utils import get_current_english_weekday
 from schedule.models import WorkDay
 from services.models import Services
 from .models import Appointment
+from .booking import SlotUnavailable, book_time_slot
+from .transitions import (
+    AppointmentNotFound,
+    InvalidTransition,
+    TransitionConflict,
+    TransitionForbidden,
+    bulk_transition,
+    transition_appointment,
+)
 from django.db.models import Sum, Count, Q
-from .serializers import AppointmentSerializer
-from django.utils.timezone import now, timedelta
-from datetime import datetime
+from .serializers import AppointmentListRepresentation, AppointmentSerializer, BulkTransitionSerializer
+from django.utils.timezone import localdate, now, timedelta
+from datetime import date, datetime
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from users.models import User, Rating
+from users import loyalty
+from users.models import BarberDailyStats, BarberStats
+
+
+LIST_REPRESENTATION_PARAMETERS = [
+    openapi.Parameter(
+        'fields',
+        openapi.IN_QUERY,
+        description=f"Campos planos separados por vírgula ({', '.join(AppointmentListRepresentation.FIELDS)})",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'expand',
+        openapi.IN_QUERY,
+        description=f"Objetos relacionados a incluir ({', '.join(AppointmentListRepresentation.EXPANDABLE)})",
+        type=openapi.TYPE_STRING
+    ),
+]
+
+
+def serialize_appointments(items, representation=None):
+    """
+    Serializa a lista com a representação leve, quando solicitada, ou com o AppointmentSerializer completo.
+    """
+    if representation is not None:
+        return representation.to_representation(items)
+    return AppointmentSerializer(items, many=True).data
 
 
 class CreateAppointmentAPIView(APIView):
@@ -25,7 +61,8 @@ class CreateAppointmentAPIView(APIView):
         request_body=AppointmentSerializer,
         responses={
             201: AppointmentSerializer,
-            400: "Erro de validação ou horário já ocupado.",
+            400: "Erro de validação.",
+            409: "Horário já ocupado.",
         }
     )
     def post(self, request):
@@ -35,33 +72,62 @@ class CreateAppointmentAPIView(APIView):
         """
         serializer = AppointmentSerializer(data=request.data)
         if serializer.is_valid():
-            time_slot = serializer.validated_data["time_slot"]
-
-            if not time_slot.is_available:
+            data = serializer.validated_data
+
+            # Reserva o horário e cria o agendamento na mesma transação
+            try:
+                appointment = book_time_slot(
+                    client=request.user,
+                    barber=data["barber"],
+                    service=data["service"],
+                    time_slot=data["time_slot"],
+                )
+            except SlotUnavailable:
                 return Response(
                     {"error": "Este horário já está ocupado."},
-                    status=status.HTTP_400_BAD_REQUEST,
+                    status=status.HTTP_409_CONFLICT,
                 )
 
-            # Cria o agendamento e marca o horário como ocupado
-            appointment = serializer.save(client=request.user)
-            time_slot.is_available = False
-            time_slot.save()
-
             return Response(AppointmentSerializer(appointment).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def transition_response(request, appointment_id, target, success_message, forbidden_message, invalid_message=None):
+    """
+    Executa a transição de status e traduz os erros em respostas HTTP.
+    """
+    try:
+        appointment = transition_appointment(appointment_id, target, request.user)
+    except AppointmentNotFound:
+        return Response({"error": "Agendamento não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+    except TransitionForbidden:
+        return Response({"error": forbidden_message}, status=status.HTTP_403_FORBIDDEN)
+    except InvalidTransition as error:
+        return Response({"error": invalid_message or str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    except TransitionConflict:
+        return Response(
+            {"error": "O agendamento foi alterado por outra requisição. Atualize e tente novamente."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return Response(
+        {"message": success_message, "id": appointment['id'], "status": appointment['status']},
+        status=status.HTTP_200_OK,
+    )
+
+
 class CancelAppointmentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Cancela um agendamento, liberando o time_slot correspondente. O cancelamento pode ser feito pelo cliente ou pelo barbeiro responsável.",
+        operation_description="Cancela um agendamento pendente ou confirmado, liberando o time_slot correspondente. O cancelamento pode ser feito pelo cliente ou pelo barbeiro responsável.",
         responses={
             200: "Agendamento cancelado com sucesso.",
+            400: "Agendamento já cancelado ou atendido.",
             404: "Agendamento não encontrado.",
             403: "Usuário não autorizado a cancelar o agendamento.",
+            409: "Agendamento alterado por outra requisição.",
         }
     )
     def post(self, request, appointment_id):
@@ -69,60 +135,34 @@ class CancelAppointmentAPIView(APIView):
         Cancela um agendamento, liberando o time_slot correspondente.
         O cancelamento pode ser feito pelo cliente ou pelo barbeiro responsável.
         """
-        try:
-            appointment = Appointment.objects.get(id=appointment_id)
-        except Appointment.DoesNotExist:
-            return Response(
-                {"error": "Agendamento não encontrado."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        if request.user != appointment.client and request.user != appointment.barber:
-            return Response(
-                {"error": "Você não tem permissão para cancelar este agendamento."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
-        appointment.status = Appointment.Status.CANCELED
-        appointment.time_slot.is_available = True
-        appointment.time_slot.save()
-        appointment.save()
-
-        return Response(
-            {"message": "Agendamento cancelado com sucesso."},
-            status=status.HTTP_200_OK,
+        return transition_response(
+            request, appointment_id, Appointment.Status.CANCELED,
+            success_message="Agendamento cancelado com sucesso.",
+            forbidden_message="Você não tem permissão para cancelar este agendamento.",
         )
 
 class ConfirmAppintmentAPIView(APIView):
     permission_classes = [IsAuthenticated, IsBarber]
 
     @swagger_auto_schema(
-        operation_description="Confirma um agendamento. A confirmação pode ser realizada apenas pelo barbeiro responsável.",
+        operation_description="Confirma um agendamento pendente. A confirmação pode ser realizada apenas pelo barbeiro responsável.",
         responses={
             200: "Agendamento confirmado com sucesso.",
+            400: "Agendamento não está pendente.",
             404: "Agendamento não encontrado.",
             403: "Usuário não autorizado a confirmar o agendamento.",
+            409: "Agendamento alterado por outra requisição.",
         }
     )
     def post(self, request, appointment_id):
         """
         Confirma um agendamento
         """
-        try:
-            appointment = Appointment.objects.get(id=appointment_id)
-        except Appointment.DoesNotExist:
-            return Response(
-                {"error": "Agendamento não encontrado."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        appointment.status = Appointment.Status.CONFIRMED
-        appointment.time_slot.save()
-        appointment.save()
-
-        return Response(
-            {"message": "Agendamento confirmado com sucesso."},
-            status=status.HTTP_200_OK,
+        return transition_response(
+            request, appointment_id, Appointment.Status.CONFIRMED,
+            success_message="Agendamento confirmado com sucesso.",
+            forbidden_message="Você não tem permissão para confirmar este agendamento.",
+            invalid_message="Apenas agendamentos pendentes podem ser confirmados.",
         )
 
 class CompleteAppointmentAPIView(APIView):
@@ -135,6 +175,7 @@ class CompleteAppointmentAPIView(APIView):
             404: "Agendamento não encontrado.",
             403: "Usuário não autorizado a marcar o agendamento como atendido.",
             400: "Agendamento não está confirmado ou já foi atendido.",
+            409: "Agendamento alterado por outra requisição.",
         }
     )
     def post(self, request, appointment_id):
@@ -143,36 +184,44 @@ class CompleteAppointmentAPIView(APIView):
         Apenas o barbeiro responsável pode marcar como atendido.
         O agendamento deve estar confirmado.
         """
-        try:
-            appointment = Appointment.objects.get(id=appointment_id)
-        except Appointment.DoesNotExist:
-            return Response(
-                {"error": "Agendamento não encontrado."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        return transition_response(
+            request, appointment_id, Appointment.Status.COMPLETED,
+            success_message="Agendamento marcado como atendido com sucesso.",
+            forbidden_message="Você não tem permissão para marcar este agendamento como atendido.",
+            invalid_message="Apenas agendamentos confirmados podem ser marcados como atendidos.",
+        )
 
-        # Verifica se o usuário é o barbeiro responsável
-        if request.user != appointment.barber:
-            return Response(
-                {"error": "Você não tem permissão para marcar este agendamento como atendido."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
+class BulkAppointmentTransitionAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsBarber]
 
-        # Verifica se o agendamento está confirmado
-        if appointment.status != Appointment.Status.CONFIRMED:
-            return Response(
-                {"error": "Apenas agendamentos confirmados podem ser marcados como atendidos."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    @swagger_auto_schema(
+        operation_description=(
+            "Confirma, conclui ou cancela vários agendamentos do barbeiro autenticado em uma única transação. "
+            "Cada id recebe seu resultado: updated, not_found, forbidden (de outro barbeiro) ou invalid (status atual não permite)."
+        ),
+        request_body=BulkTransitionSerializer,
+        responses={
+            200: "Resultado por agendamento.",
+            400: "Dados inválidos.",
+            403: "Usuário não autorizado. Necessário ser barbeiro autenticado.",
+        }
+    )
+    def post(self, request):
+        serializer = BulkTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Marca o agendamento como atendido
-        appointment.status = Appointment.Status.COMPLETED
-        appointment.save()
+        target = serializer.validated_data['status']
+        results = bulk_transition(serializer.validated_data['appointment_ids'], target, request.user)
+        return Response({
+            "status": target,
+            "updated": sum(1 for result, _ in results.values() if result == 'updated'),
+            "results": [
+                {"id": appointment_id, "result": result, "status": current}
+                for appointment_id, (result, current) in results.items()
+            ],
+        }, status=status.HTTP_200_OK)
 
-        return Response(
-            {"message": "Agendamento marcado como atendido com sucesso."},
-            status=status.HTTP_200_OK,
-        )
 
 class BarberStatisticsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsBarber]
@@ -191,29 +240,35 @@ class BarberStatisticsAPIView(APIView):
         barber = request.user
         last_30_days = now() - timedelta(days=30)
 
-        # Agendamentos nos últimos 30 dias
-        appointments_last_30_days = Appointment.objects.filter(barber=barber, created_at__gte=last_30_days)
-
-        confirmed_last_30 = appointments_last_30_days.filter(status=Appointment.Status.CONFIRMED)
-        canceled_last_30 = appointments_last_30_days.filter(status=Appointment.Status.CANCELED)
-        completed_last_30 = appointments_last_30_days.filter(status=Appointment.Status.COMPLETED)
-        revenue_last_30 = completed_last_30.aggregate(total=Sum('price'))['total'] or 0
+        # Consolidado histórico e baldes diários mantidos incrementalmente
+        stats = BarberStats.for_barber(barber)
+        window = BarberDailyStats.objects.filter(
+            barber=barber,
+            day__gte=localdate(last_30_days)
+        ).aggregate(
+            total=Sum(F('pending_count') + F('confirmed_count') + F('canceled_count') + F('completed_count')),
+            completed=Sum('completed_count'),
+            canceled=Sum('canceled_count'),
+            revenue=Sum('revenue')
+        )
+        revenue_last_30 = window['revenue'] or 0
+        gross_revenue = stats.revenue
 
         # Total de agendamentos por status
-        total_appointments = Appointment.objects.filter(barber=barber)
         status_counts = {
-            status: total_appointments.filter(status=status).count()
-            for status, _ in Appointment.Status.choices
+            value: getattr(stats, f'{value}_count')
+            for value, _ in Appointment.Status.choices
         }
 
-        # Agendamentos do dia atual
+        # Agendamentos do dia atual (horários com data ou, os antigos, pelo dia da semana)
         current_day = get_current_english_weekday()
-        work_day_today = WorkDay.objects.filter(barber=barber,day_of_week=current_day).first()
-        upcoming_appointments = []
-        if work_day_today:
-            current_time = datetime.now().time()
-            time_slots = work_day_today.time_slots.filter(time__gte=current_time)
-            upcoming_appointments = Appointment.objects.filter(time_slot__in=time_slots,status__in=[Appointment.Status.CONFIRMED]).select_related('client', 'service', 'time_slot').order_by('time_slot__time')
+        current_time = datetime.now().time()
+        upcoming_appointments = Appointment.objects.filter(
+            Q(time_slot__date=localdate()) | Q(time_slot__date__isnull=True, time_slot__work_day__day_of_week=current_day),
+            barber=barber,
+            status=Appointment.Status.CONFIRMED,
+            time_slot__time__gte=current_time
+        ).select_related('client', 'service', 'time_slot').order_by('time_slot__time')
 
         # Serviços mais populares (últimos 30 dias)
         popular_services = Services.objects.filter(
@@ -228,24 +283,13 @@ class BarberStatisticsAPIView(APIView):
                 )
             )
         ).order_by('-total_appointments')[:3]
-        
-        # Faturamento total histórico
-        gross_revenue = Appointment.objects.filter(
-            barber=barber,
-            status=Appointment.Status.COMPLETED
-        ).aggregate(total=Sum('price'))['total'] or 0
-
-        # Estatísticas de avaliações
-        ratings = Rating.objects.filter(barber=barber)
-        total_ratings = ratings.count()
-        average_rating = Rating.get_average_rating(barber)
 
         return Response({
             "barber": barber.username,
             "last_30_days_stats": {
-                "total_appointments": appointments_last_30_days.count(),
-                "completed": completed_last_30.count(),
-                "canceled": canceled_last_30.count(),
+                "total_appointments": window['total'] or 0,
+                "completed": window['completed'] or 0,
+                "canceled": window['canceled'] or 0,
                 "revenue": float(revenue_last_30),
                 "status_distribution": status_counts,
             },
@@ -270,8 +314,8 @@ class BarberStatisticsAPIView(APIView):
                 "last_30_days_revenue": float(revenue_last_30)
             },
             "rating_metrics": {
-                "total_ratings": total_ratings,
-                "average_rating": float(average_rating)
+                "total_ratings": stats.rating_count,
+                "average_rating": float(stats.average_rating)
             }
         })
 
@@ -281,8 +325,26 @@ class ClientStatisticsAPIView(APIView):
 
     @swagger_auto_schema(
         operation_description="Retorna as estatísticas e a lista de agendamentos do cliente autenticado.",
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                description="Considera apenas agendamentos criados a partir desta data (AAAA-MM-DD)",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                description="Considera apenas agendamentos criados até esta data (AAAA-MM-DD)",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE
+            ),
+            *KeysetPagination.swagger_parameters
+        ],
         responses={
             200: "Estatísticas de agendamentos do cliente, incluindo lista detalhada dos agendamentos.",
+            400: "Parâmetros de data ou paginação inválidos.",
             403: "Usuário não autorizado. Necessário ser cliente autenticado.",
         }
     )
@@ -292,25 +354,66 @@ class ClientStatisticsAPIView(APIView):
         """
         client = request.user
         appointments = Appointment.objects.filter(client=client)
-        total_appointments = appointments.count()
+
+        for param, lookup in (('start_date', 'created_at__date__gte'), ('end_date', 'created_at__date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    appointments = appointments.filter(**{lookup: date.fromisoformat(value)})
+                except ValueError:
+                    return Response(
+                        {"error": f"Data inválida em {param}. Use o formato AAAA-MM-DD."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+        # Totais por status, gasto total e visitas gratuitas em uma única agregação
+        totals = appointments.aggregate(
+            total=Count('id'),
+            total_spent=Sum('price', filter=Q(status=Appointment.Status.COMPLETED)),
+            free_visits=Count('id', filter=Q(is_free=True)),
+            **{
+                f'status_{value}': Count('id', filter=Q(status=value))
+                for value, _ in Appointment.Status.choices
+            }
+        )
+
+        rows = appointments.values(
+            'id', 'service__name', 'status', 'time_slot__time', 'price', 'is_free', 'created_at'
+        )
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            rows = paginator.paginate_queryset(rows, request, view=self)
+
         appointment_list = [
             {
-                "id": appointment.id,
-                "service": appointment.service.name,
-                "status": appointment.status,
-                "time_slot": str(appointment.time_slot.time),
-                "price": appointment.price,
-                "is_free": appointment.is_free,
-                "created_at": appointment.created_at
+                "id": row['id'],
+                "service": row['service__name'],
+                "status": row['status'],
+                "time_slot": str(row['time_slot__time']),
+                "price": row['price'],
+                "is_free": row['is_free'],
+                "created_at": row['created_at']
             }
-            for appointment in appointments
+            for row in rows
         ]
 
-        return Response({
+        data = {
             "client": client.username,
-            "total_appointments": total_appointments,
+            "total_appointments": totals['total'],
+            "status_distribution": {
+                value: totals[f'status_{value}']
+                for value, _ in Appointment.Status.choices
+            },
+            "total_spent": float(totals['total_spent'] or 0),
+            "free_visits_redeemed": totals['free_visits'],
+            "loyalty": loyalty.reward_status(client.confirmed_appointments_count),
             "appointments": appointment_list
-        })
+        }
+        if paginator.is_requested(request):
+            data["next_cursor"] = paginator.next_cursor
+            data["has_more"] = paginator.has_more
+
+        return Response(data)
 
 
 class BarberAppointmentsListView(APIView):
@@ -339,7 +442,9 @@ class BarberAppointmentsListView(APIView):
                 description="Filtrar por dia da semana (monday, tuesday, etc)",
                 type=openapi.TYPE_STRING,
                 enum=[choice[0] for choice in WorkDay.Weekday.choices]
-            )
+            ),
+            *KeysetPagination.swagger_parameters,
+            *LIST_REPRESENTATION_PARAMETERS
         ],
         responses={
             200: AppointmentSerializer(many=True),
@@ -354,9 +459,14 @@ class BarberAppointmentsListView(APIView):
         day_filter = request.query_params.get('day', None)
         appointments = Appointment.objects.filter(
             barber=barber
-        ).select_related(
-            'client', 'service', 'time_slot__work_day'
         )
+        # Com ?fields= ou ?expand= a lista usa a representação leve baseada em values()
+        representation = None
+        if AppointmentListRepresentation.is_requested(request):
+            representation = AppointmentListRepresentation.from_request(request)
+            appointments = representation.values(appointments)
+        else:
+            appointments = AppointmentSerializer.setup_eager_loading(appointments)
 
         if status_filter:
             status_lower = status_filter.lower()
@@ -383,6 +493,12 @@ class BarberAppointmentsListView(APIView):
                 )
             appointments = appointments.filter(time_slot__work_day__day_of_week=day_lower)
 
+        # Paginação opcional por cursor, ordenada dos mais recentes para os mais antigos
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(appointments, request, view=self)
+            return paginator.get_paginated_response(serialize_appointments(page, representation))
+
         appointments = appointments.annotate(
             status_order=Case(
                 When(status='pending', then=Value(1)),
@@ -393,8 +509,7 @@ class BarberAppointmentsListView(APIView):
             day_of_week=F('time_slot__work_day__day_of_week')
         ).order_by('status_order', '-time_slot__time')
 
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serialize_appointments(appointments, representation), status=status.HTTP_200_OK)
 
 
 class ClientAppointmentsListView(APIView):
@@ -423,7 +538,9 @@ class ClientAppointmentsListView(APIView):
                 description="Filtrar por dia da semana (monday, tuesday, etc)",
                 type=openapi.TYPE_STRING,
                 enum=[choice[0] for choice in WorkDay.Weekday.choices]
-            )
+            ),
+            *KeysetPagination.swagger_parameters,
+            *LIST_REPRESENTATION_PARAMETERS
         ],
         responses={
             200: AppointmentSerializer(many=True),
@@ -438,9 +555,14 @@ class ClientAppointmentsListView(APIView):
         day_filter = request.query_params.get('day', None)
         appointments = Appointment.objects.filter(
             client=client
-        ).select_related(
-            'barber', 'service', 'time_slot__work_day'
         )
+        # Com ?fields= ou ?expand= a lista usa a representação leve baseada em values()
+        representation = None
+        if AppointmentListRepresentation.is_requested(request):
+            representation = AppointmentListRepresentation.from_request(request)
+            appointments = representation.values(appointments)
+        else:
+            appointments = AppointmentSerializer.setup_eager_loading(appointments)
 
         if status_filter:
             status_lower = status_filter.lower()
@@ -467,6 +589,12 @@ class ClientAppointmentsListView(APIView):
                 )
             appointments = appointments.filter(time_slot__work_day__day_of_week=day_lower)
 
+        # Paginação opcional por cursor, ordenada dos mais recentes para os mais antigos
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(appointments, request, view=self)
+            return paginator.get_paginated_response(serialize_appointments(page, representation))
+
         appointments = appointments.annotate(
             status_order=Case(
                 When(status='pending', then=Value(1)),
@@ -478,5 +606,4 @@ class ClientAppointmentsListView(APIView):
             day_of_week=F('time_slot__work_day__day_of_week')
         ).order_by('status_order', '-time_slot__time')
 
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serialize_appointments(appointments, representation), status=status.HTTP_200_OK)
@@ -0,0 +1,57 @@
+"""
+Benchmark da serialização das listas de agendamentos.
+
+Compara o AppointmentSerializer completo (serializers aninhados sobre instâncias
+com select_related) com a representação leve baseada em values(), nos campos
+usados pelo app do barbeiro, medindo linhas por segundo (consulta + serialização).
+
+Uso:
+    python benchmarks/appointment_serialization.py --sizes 1000 10000
+"""
+import argparse
+
+from common import measure, seed, setup_django
+
+
+def build_paths(barber_id):
+    from appointments.models import Appointment
+    from appointments.serializers import AppointmentListRepresentation, AppointmentSerializer
+
+    queryset = Appointment.objects.filter(barber_id=barber_id).order_by('-created_at', '-id')
+    barber_app = AppointmentListRepresentation(fields=['id', 'client_name', 'service_name', 'time', 'status'])
+    expanded = AppointmentListRepresentation(expand=list(AppointmentListRepresentation.EXPANDABLE))
+
+    return {
+        'AppointmentSerializer completo': lambda size: AppointmentSerializer(
+            AppointmentSerializer.setup_eager_loading(queryset)[:size], many=True
+        ).data,
+        'values() com ?fields= do barbeiro': lambda size: barber_app.to_representation(
+            barber_app.values(queryset)[:size]
+        ),
+        'values() com ?expand= de todas as relações': lambda size: expanded.to_representation(
+            expanded.values(queryset)[:size]
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    # Um único barbeiro concentra todos os agendamentos para que a lista tenha o tamanho pedido
+    barber_ids, _ = seed(1, 500, max(args.sizes))
+    paths = build_paths(barber_ids[0])
+
+    for size in args.sizes:
+        print(f'\n=== {size} linhas ===')
+        for name, serialize in paths.items():
+            assert len(serialize(size)) == size
+            median, p95 = measure(lambda: serialize(size), args.repeat)
+            print(f'{name}: mediana {median:.1f} ms, p95 {p95:.1f} ms, {size / (median / 1000):,.0f} linhas/s')
+
+
+if __name__ == '__main__':
+    main()
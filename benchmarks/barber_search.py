@@ -0,0 +1,114 @@
+"""
+Benchmark da busca de barbeiros por nome (BarberListView).
+
+Compara o filtro anterior (`username__icontains`, serializando todos os resultados)
+com a busca ranqueada e paginada de users.search: índice de trigramas (pg_trgm)
+no PostgreSQL ou o índice em memória nos demais bancos.
+
+Uso:
+    python benchmarks/barber_search.py --barbers 10000 50000
+"""
+import argparse
+import random
+import time
+
+from common import measure, setup_django
+
+FIRST_NAMES = [
+    'Carlos', 'Carla', 'João', 'Pedro', 'Paulo', 'Lucas', 'Marcos', 'Rafael', 'Bruno', 'Thiago',
+    'Gabriel', 'Felipe', 'André', 'Diego', 'Rodrigo', 'Gustavo', 'Leonardo', 'Mateus', 'Vinicius', 'Renato',
+]
+LAST_NAMES = [
+    'Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Ferreira', 'Costa', 'Rodrigues', 'Almeida',
+    'Nascimento', 'Carvalho', 'Gomes', 'Martins', 'Araújo', 'Ribeiro', 'Barbosa', 'Rocha', 'Mendes', 'Alves',
+]
+QUERIES = ['carlos', 'souza', 'rafa', 'nascimeto', 'barbearia do joao']
+
+
+def seed_barbers(total, start, rng):
+    from django.contrib.auth.hashers import make_password
+
+    from users.models import BarberStats, User
+
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+                email=f'busca{i}@bench.local', password=password,
+                profile_type=User.Perfil.BARBER, city=User.Cidade.SALINAS_MG
+            )
+            for i in range(start, start + total)
+        ],
+        batch_size=2000
+    )
+    barber_ids = User.objects.filter(email__startswith='busca', stats__isnull=True).values_list('id', flat=True)
+    BarberStats.objects.bulk_create(
+        [
+            BarberStats(barber_id=barber_id, rating_sum=rng.randint(1, 50), rating_count=rng.randint(1, 10))
+            for barber_id in barber_ids
+        ],
+        batch_size=2000
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--barbers', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.db import connection
+
+    from core.utils.cache import barber_search_version_key
+    from users.models import User
+    from users.search import barber_name_index, rank_barbers
+    from users.serializers import UserSerializer
+
+    rng = random.Random(42)
+    barbers = UserSerializer.setup_eager_loading(
+        User.objects.filter(profile_type=User.Perfil.BARBER, is_active=True, city=User.Cidade.SALINAS_MG)
+    )
+
+    seeded = 0
+    for total in sorted(args.barbers):
+        seed_barbers(total - seeded, seeded, rng)
+        seeded = total
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        print(f'\n=== {total} barbeiros ({connection.vendor}) ===')
+
+        if connection.vendor != 'postgresql':
+            cache.delete(barber_search_version_key())
+            start = time.perf_counter()
+            barber_name_index.refresh()
+            print(f'construção do índice em memória: {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        for query in QUERIES:
+            def legacy():
+                return UserSerializer(barbers.filter(username__icontains=query), many=True).data
+
+            def ranked():
+                page = rank_barbers(barbers, query)[:args.page_size + 1]
+                return UserSerializer(page[:args.page_size], many=True).data
+
+            legacy_median, _ = measure(legacy, args.repeat)
+            ranked_median, ranked_p95 = measure(ranked, args.repeat)
+            print(
+                f'"{query}": icontains {legacy_median:.1f} ms ({len(legacy())} resultados) | '
+                f'ranqueada {ranked_median:.1f} ms, p95 {ranked_p95:.1f} ms ({len(ranked())} na página)'
+            )
+            if connection.vendor == 'postgresql':
+                # O filtro (<% OR ILIKE) precisa ser atendido pelo índice GIN de trigramas
+                plan = rank_barbers(barbers, query).explain()
+                if 'users_barber_username_trgm_idx' in plan:
+                    print('    plano: índice users_barber_username_trgm_idx')
+                else:
+                    print(f'    ATENÇÃO: o plano não usa o índice de trigramas:\n{plan}')
+
+
+if __name__ == '__main__':
+    main()
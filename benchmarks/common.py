@@ -0,0 +1,157 @@
+"""
+Utilitários compartilhados pelos scripts de benchmark.
+
+Os scripts nunca usam o banco configurado em URL_PUBLICA_BD: o banco vem de
+BENCHMARK_DATABASE_URL ou, por padrão, de um SQLite temporário.
+"""
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """
+    Configura o Django apontando para o banco de benchmark e aplica as migrações.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    database_url = os.getenv('BENCHMARK_DATABASE_URL')
+    if not database_url:
+        database_url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark.sqlite3'}"
+    os.environ['URL_PUBLICA_BD'] = database_url
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+    print(f'Banco de benchmark: {database_url}')
+
+
+def seed(barbers, clients, appointments, work_days_per_barber=6, services_per_barber=4, seed_value=42):
+    """
+    Popula o banco com dados sintéticos usando bulk_create (sem passar pelos save()).
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from appointments.models import Appointment
+    from schedule.models import TimeSlot, WorkDay
+    from services.models import Services
+    from users.models import User
+
+    rng = random.Random(seed_value)
+    password = make_password(None)
+    weekdays = [value for value, _ in WorkDay.Weekday.choices]
+    statuses = [value for value, _ in Appointment.Status.choices]
+    now = timezone.now()
+
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'barbeiro {i}', email=f'barbeiro{i}@bench.local', password=password,
+                profile_type=User.Perfil.BARBER, city=User.Cidade.SALINAS_MG
+            )
+            for i in range(barbers)
+        ] + [
+            User(
+                username=f'cliente {i}', email=f'cliente{i}@bench.local', password=password,
+                profile_type=User.Perfil.CLIENT, city=User.Cidade.SALINAS_MG
+            )
+            for i in range(clients)
+        ],
+        batch_size=1000
+    )
+    barber_ids = list(User.objects.filter(profile_type=User.Perfil.BARBER).values_list('id', flat=True))
+    client_ids = list(User.objects.filter(profile_type=User.Perfil.CLIENT).values_list('id', flat=True))
+
+    Services.objects.bulk_create(
+        [
+            Services(barber_id=barber_id, name=f'Serviço {n}', description='Benchmark', price=20 + n * 5)
+            for barber_id in barber_ids for n in range(services_per_barber)
+        ],
+        batch_size=1000
+    )
+    WorkDay.objects.bulk_create(
+        [
+            WorkDay(
+                barber_id=barber_id, day_of_week=day, weekday_order=WorkDay.WEEKDAY_ORDER[day],
+                start_time='08:00', end_time='18:00', lunch_start_time='12:00', lunch_end_time='13:00'
+            )
+            for barber_id in barber_ids for day in weekdays[:work_days_per_barber]
+        ],
+        batch_size=1000
+    )
+    slot_times = [f'{hour:02d}:{minute:02d}' for hour in list(range(8, 12)) + list(range(13, 18)) for minute in (0, 30)]
+    # Cada dia de trabalho ganha os horários da próxima data do seu dia da semana
+    today = timezone.localdate()
+    next_date = {
+        day: today + timedelta(days=(WorkDay.WEEKDAY_ORDER[day] - 1 - today.weekday()) % 7)
+        for day in weekdays
+    }
+    TimeSlot.objects.bulk_create(
+        [
+            TimeSlot(
+                work_day_id=work_day_id, barber_id=barber_id, date=next_date[day], time=slot_time,
+                is_active=rng.random() < 0.5, is_available=rng.random() < 0.7
+            )
+            for work_day_id, barber_id, day in WorkDay.objects.values_list('id', 'barber_id', 'day_of_week')
+            for slot_time in slot_times
+        ],
+        batch_size=2000
+    )
+
+    services = {}
+    for service_id, barber_id, price in Services.objects.values_list('id', 'barber_id', 'price'):
+        services.setdefault(barber_id, []).append((service_id, price))
+    slots = {}
+    for slot_id, barber_id in TimeSlot.objects.values_list('id', 'work_day__barber_id'):
+        slots.setdefault(barber_id, []).append(slot_id)
+
+    batch = []
+    for _ in range(appointments):
+        barber_id = rng.choice(barber_ids)
+        service_id, price = rng.choice(services[barber_id])
+        batch.append(Appointment(
+            barber_id=barber_id,
+            client_id=rng.choice(client_ids),
+            service_id=service_id,
+            time_slot_id=rng.choice(slots[barber_id]),
+            status=rng.choice(statuses),
+            price=price,
+        ))
+        if len(batch) == 5000:
+            Appointment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Appointment.objects.bulk_create(batch)
+
+    # auto_now_add ignora valores explícitos: espalha as datas de criação em ~2 anos
+    for appointment_id in Appointment.objects.values_list('id', flat=True)[::50]:
+        Appointment.objects.filter(id__gte=appointment_id, id__lt=appointment_id + 50).update(
+            created_at=now - timedelta(days=rng.randint(0, 730))
+        )
+
+    return barber_ids, client_ids
+
+
+def measure(function, repeat):
+    """
+    Executa a função `repeat` vezes e retorna (mediana, p95) em milissegundos.
+    O p95 é o percentil por posição mais próxima (nearest-rank) das amostras ordenadas.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[math.ceil(len(samples) * 0.95) - 1]
@@ -0,0 +1,116 @@
+"""
+Benchmark dos índices compostos/parciais das consultas de agendamentos, horários e serviços.
+
+Popula um banco sintético, mede cada consulta sem os índices e depois com eles,
+exibindo o plano (EXPLAIN) e as latências (mediana/p95).
+
+Uso:
+    python benchmarks/indexes.py --barbers 500 --clients 5000 --appointments 200000
+"""
+import argparse
+import random
+
+from common import measure, seed, setup_django
+
+
+def build_queries(barber_ids, client_ids, work_day_ids):
+    from django.db.models import Sum
+    from django.utils import timezone
+
+    from appointments.models import Appointment
+    from schedule.models import TimeSlot
+    from services.models import Services
+
+    last_30_days = timezone.now() - timezone.timedelta(days=30)
+
+    return {
+        'estatísticas do barbeiro (barber, status, created_at)': lambda: Appointment.objects.filter(
+            barber_id=random.choice(barber_ids),
+            status=Appointment.Status.COMPLETED,
+            created_at__gte=last_30_days
+        ).aggregate(total=Sum('price')),
+        'agendamentos do cliente (client, status)': lambda: list(Appointment.objects.filter(
+            client_id=random.choice(client_ids),
+            status=Appointment.Status.PENDING
+        ).values_list('id', flat=True)),
+        'horários disponíveis (work_day, is_active, is_available)': lambda: list(TimeSlot.objects.filter(
+            work_day_id=random.choice(work_day_ids),
+            is_active=True,
+            is_available=True
+        ).values_list('id', flat=True)),
+        'serviços ativos (barber, is_active)': lambda: list(Services.objects.filter(
+            barber_id=random.choice(barber_ids),
+            is_active=True
+        ).values_list('id', flat=True)),
+    }
+
+
+def index_targets():
+    from appointments.models import Appointment
+    from schedule.models import TimeSlot
+    from services.models import Services
+
+    return [(model, index) for model in (Appointment, TimeSlot, Services) for index in model._meta.indexes]
+
+
+def run(queries, repeat, label):
+    print(f'\n=== {label} ===')
+    for name, query in queries.items():
+        median, p95 = measure(query, repeat)
+        print(f'{name}: mediana {median:.2f} ms, p95 {p95:.2f} ms')
+
+
+def show_plans(barber_ids, client_ids, work_day_ids):
+    from appointments.models import Appointment
+    from schedule.models import TimeSlot
+    from services.models import Services
+
+    querysets = {
+        'estatísticas do barbeiro': Appointment.objects.filter(
+            barber_id=barber_ids[0], status=Appointment.Status.COMPLETED
+        ).order_by('created_at'),
+        'agendamentos do cliente': Appointment.objects.filter(client_id=client_ids[0], status=Appointment.Status.PENDING),
+        'horários disponíveis': TimeSlot.objects.filter(work_day_id=work_day_ids[0], is_active=True, is_available=True),
+        'serviços ativos': Services.objects.filter(barber_id=barber_ids[0], is_active=True),
+    }
+    for name, queryset in querysets.items():
+        print(f'-- {name}\n{queryset.explain()}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--barbers', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from schedule.models import WorkDay
+
+    barber_ids, client_ids = seed(args.barbers, args.clients, args.appointments)
+    work_day_ids = list(WorkDay.objects.values_list('id', flat=True))
+    queries = build_queries(barber_ids, client_ids, work_day_ids)
+    targets = index_targets()
+
+    with connection.schema_editor() as editor:
+        for model, index in targets:
+            editor.remove_index(model, index)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    show_plans(barber_ids, client_ids, work_day_ids)
+    run(queries, args.repeat, 'Sem os índices')
+
+    with connection.schema_editor() as editor:
+        for model, index in targets:
+            editor.add_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    show_plans(barber_ids, client_ids, work_day_ids)
+    run(queries, args.repeat, 'Com os índices')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark da busca dos próximos horários livres entre todos os barbeiros da cidade.
+
+Compara a consulta única de TimeSlot.next_available (com e sem o índice parcial
+timeslot_open_idx) com o caminho anterior do app: consultar a disponibilidade de
+cada barbeiro e juntar os resultados em Python.
+
+Uso:
+    python benchmarks/next_available.py --barbers 5000 --limit 10
+"""
+import argparse
+import heapq
+
+from common import measure, seed, setup_django
+
+
+def per_barber(city, service_name, limit):
+    from django.utils.timezone import localtime
+
+    from schedule.models import TimeSlot
+    from services.models import Services
+
+    # Caminho anterior: uma consulta de disponibilidade por barbeiro que oferece o serviço
+    barber_ids = Services.objects.filter(
+        barber__city=city, barber__is_active=True, is_active=True, name__iexact=service_name
+    ).values_list('barber_id', flat=True).distinct()
+    now = localtime()
+    slots = []
+    for barber_id in barber_ids:
+        slots.extend(
+            TimeSlot.upcoming(TimeSlot.objects.filter(barber_id=barber_id))
+            .exclude(date=now.date(), time__lt=now.time())
+            .values_list('date', 'time', 'id')[:limit]
+        )
+    return heapq.nsmallest(limit, slots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--barbers', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from schedule.models import TimeSlot
+    from users.models import User
+
+    city = User.Cidade.SALINAS_MG
+    service_name = 'Serviço 2'
+    index = next(index for index in TimeSlot._meta.indexes if index.name == 'timeslot_open_idx')
+
+    def analyze():
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    seed(args.barbers, 0, 0)
+    analyze()
+    print(f'{args.barbers} barbeiros, {TimeSlot.objects.count()} horários')
+
+    def single_query():
+        return TimeSlot.next_available(city, service_name, limit=args.limit)
+
+    assert [row['id'] for row in single_query()] == [row[2] for row in per_barber(city, service_name, args.limit)]
+    print(TimeSlot.upcoming().order_by('date', 'time')[:args.limit].explain())
+
+    with connection.schema_editor() as editor:
+        editor.remove_index(TimeSlot, index)
+    analyze()
+    results = {'consulta única sem timeslot_open_idx': measure(single_query, args.repeat)}
+    with connection.schema_editor() as editor:
+        editor.add_index(TimeSlot, index)
+    analyze()
+    results['consulta única com timeslot_open_idx'] = measure(single_query, args.repeat)
+    results['uma consulta por barbeiro'] = measure(lambda: per_barber(city, service_name, args.limit), args.repeat)
+
+    for name, (median, p95) in results.items():
+        print(f'{name}: mediana {median:.2f} ms, p95 {p95:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
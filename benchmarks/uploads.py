@@ -0,0 +1,73 @@
+"""
+Benchmark dos uploads de imagens com o FileSystemStorage.
+
+Compara o envio antigo (`image_file.read()` do arquivo inteiro) com o streaming
+por chunks do StorageBackend, exibindo latência e pico de memória alocada.
+
+Uso:
+    python benchmarks/uploads.py --sizes 1 10 50
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from common import measure, setup_django
+
+
+def read_whole_file(destination, image_file):
+    # Comportamento anterior: carrega o arquivo inteiro em memória
+    with open(destination, 'wb') as output:
+        output.write(image_file.read())
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50], help='Tamanhos dos arquivos em MB.')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+
+    from core.utils.upload_images_firebase import FileSystemStorage
+
+    directory = tempfile.mkdtemp()
+    storage = FileSystemStorage()
+    try:
+        with override_settings(UPLOAD_STORAGE_ROOT=os.path.join(directory, 'storage')):
+            for size in args.sizes:
+                source = os.path.join(directory, f'imagem_{size}mb.png')
+                with open(source, 'wb') as output:
+                    output.write(os.urandom(size * 1024 * 1024))
+
+                def legacy():
+                    with open(source, 'rb') as image_file:
+                        read_whole_file(os.path.join(directory, 'legacy.png'), image_file)
+
+                def streaming():
+                    with open(source, 'rb') as image_file:
+                        storage.upload('services/streaming.png', image_file)
+
+                print(f'\n=== {size} MB ===')
+                for name, function in (('read() do arquivo inteiro', legacy), ('streaming por chunks', streaming)):
+                    median, p95 = measure(function, args.repeat)
+                    print(
+                        f'{name}: mediana {median:.1f} ms, p95 {p95:.1f} ms, '
+                        f'pico de memória {peak_memory(function):.2f} MB'
+                    )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
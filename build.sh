@@ -9,4 +9,8 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Materialize the dated time slots up to SLOT_HORIZON_WEEKS (idempotent).
+# Must also run daily (cron) to retire past dates and extend the horizon.
+python manage.py roll_slot_horizon
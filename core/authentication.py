@@ -0,0 +1,203 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_digest(key):
+    # O token nunca é usado diretamente como chave de cache
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_cache_key(digest):
+    return f'auth:token:{digest}'
+
+
+def user_token_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_generation_key(user_id):
+    # Trocada a cada invalidação: os LRUs dos processos comparam antes de usar um snapshot
+    return f'auth:generation:{user_id}'
+
+
+class TokenSnapshotCache:
+    """
+    LRU em memória do processo, limitado em tamanho e com TTL curto, com os
+    snapshots token → usuário. Mantém os contadores de acertos e falhas.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._user_digests = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            user_id, snapshot, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(digest)
+                return None
+            self._entries.move_to_end(digest)
+            self.local_hits += 1
+            return snapshot
+
+    def set(self, digest, user_id, snapshot):
+        with self._lock:
+            self._remove(digest)
+            self._entries[digest] = (user_id, snapshot, time.monotonic() + self.ttl)
+            self._user_digests[user_id] = digest
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard_user(self, user_id):
+        with self._lock:
+            digest = self._user_digests.get(user_id)
+            if digest:
+                self._remove(digest)
+
+    def record(self, shared_hit):
+        with self._lock:
+            if shared_hit:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry and self._user_digests.get(entry[0]) == digest:
+            del self._user_digests[entry[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_digests.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'local_ttl': self.ttl,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else None,
+            }
+
+
+token_cache = TokenSnapshotCache(settings.AUTH_TOKEN_LOCAL_MAX_ENTRIES, settings.AUTH_TOKEN_LOCAL_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que evita a consulta Token + User a cada requisição.
+
+    Procura o snapshot do usuário primeiro no LRU do processo e depois no cache
+    compartilhado do Django; só consulta o banco em caso de falha. Os snapshots
+    guardam apenas os valores dos campos, e cada requisição recebe instâncias novas.
+
+    Um acerto no LRU só vale se a geração do usuário no cache compartilhado não
+    mudou: logout, desativação e alterações do perfil em qualquer processo trocam
+    a geração (invalidate_user_token_cache) e descartam os snapshots dos demais.
+    O usuário restaurado pode estar levemente desatualizado; quem grava deve
+    recarregá-lo do banco ou salvar apenas os campos alterados.
+    """
+
+    # Campos que não vão para o cache compartilhado; ficam adiados (deferred) no usuário
+    # restaurado e só são lidos do banco se forem acessados
+    SNAPSHOT_EXCLUDED_FIELDS = ('password',)
+
+    @classmethod
+    def snapshot_fields(cls):
+        return [
+            field.attname for field in get_user_model()._meta.concrete_fields
+            if field.attname not in cls.SNAPSHOT_EXCLUDED_FIELDS
+        ]
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        snapshot = token_cache.get(digest)
+        if snapshot is None:
+            snapshot = cache.get(token_cache_key(digest))
+            token_cache.record(shared_hit=snapshot is not None)
+            if snapshot is not None:
+                token_cache.set(digest, snapshot['user']['id'], snapshot)
+
+        if snapshot is not None and snapshot.get('generation') != cache.get(user_generation_key(snapshot['user']['id'])):
+            # Invalidado em outro processo
+            token_cache.discard_user(snapshot['user']['id'])
+            snapshot = None
+
+        if snapshot is not None:
+            token = self.restore(key, snapshot)
+            if token is not None:
+                return token.user, token
+
+        user, token = super().authenticate_credentials(key)
+        snapshot = self.snapshot(token, cache.get(user_generation_key(user.pk)))
+        cache.set(token_cache_key(digest), snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        cache.set(user_token_cache_key(user.pk), digest, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        token_cache.set(digest, user.pk, snapshot)
+        return user, token
+
+    @classmethod
+    def snapshot(cls, token, generation=None):
+        return {
+            'user': {name: getattr(token.user, name) for name in cls.snapshot_fields()},
+            'created': token.created,
+            'generation': generation,
+        }
+
+    def restore(self, key, snapshot):
+        """
+        Recria o Token e o usuário a partir do snapshot; retorna None se os campos
+        do modelo mudaram desde que o snapshot foi gravado. Usuários inativos são
+        recusados como em TokenAuthentication.authenticate_credentials.
+        """
+        field_names = self.snapshot_fields()
+        if set(field_names) != set(snapshot['user']):
+            return None
+        if not snapshot['user']['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        user = get_user_model().from_db('default', field_names, [snapshot['user'][name] for name in field_names])
+        token = self.get_model()(key=key, user=user, created=snapshot['created'])
+        token._state.adding = False
+        token._state.db = 'default'
+        return token
+
+
+def invalidate_user_token_cache(user_id):
+    """
+    Remove o snapshot do usuário do cache compartilhado e do LRU deste processo
+    após o commit e troca a geração do usuário, para que os demais processos
+    descartem o snapshot no próximo acesso.
+    """
+    def invalidate():
+        digest = cache.get(user_token_cache_key(user_id))
+        if digest:
+            cache.delete_many([token_cache_key(digest), user_token_cache_key(user_id)])
+        cache.set(user_generation_key(user_id), uuid.uuid4().hex, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        token_cache.discard_user(user_id)
+
+    transaction.on_commit(invalidate)
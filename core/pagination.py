@@ -0,0 +1,159 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from drf_yasg import openapi
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class SizedPagination(BasePagination):
+    """
+    Base das paginações opcionais: tamanho da página por `page_size`, limitado a
+    PAGINATION_MAX_PAGE_SIZE.
+    """
+    page_size_query_param = 'page_size'
+    page_size = settings.PAGINATION_PAGE_SIZE
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Deve ser um número inteiro.'})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: 'Deve ser maior que zero.'})
+        return min(page_size, self.max_page_size)
+
+
+class KeysetPagination(SizedPagination):
+    """
+    Paginação por cursor (keyset) com chave estável (-created_at, -id).
+
+    Cada página é buscada com `WHERE (created_at, id) < cursor ... LIMIT page_size + 1`,
+    então o custo não cresce com a profundidade da página; a linha extra indica se
+    existe uma próxima página sem precisar de COUNT.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+
+    swagger_parameters = [
+        openapi.Parameter(
+            'cursor',
+            openapi.IN_QUERY,
+            description="Cursor retornado em `next_cursor` pela página anterior (ativa a paginação)",
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'page_size',
+            openapi.IN_QUERY,
+            description=f"Itens por página (ativa a paginação, máximo {settings.PAGINATION_MAX_PAGE_SIZE})",
+            type=openapi.TYPE_INTEGER
+        ),
+    ]
+
+    def is_requested(self, request):
+        """
+        A paginação é opcional: sem `cursor` ou `page_size` a rota mantém a lista completa.
+        """
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def encode_cursor(self, item):
+        # Aceita instâncias de modelo ou linhas de values()
+        if isinstance(item, dict):
+            position = [item['created_at'].isoformat(), item['id']]
+        else:
+            position = [item.created_at.isoformat(), item.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(value.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, int(pk)
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: 'Cursor inválido.'})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+        items = list(queryset[:page_size + 1])
+        self.has_more = len(items) > page_size
+        items = items[:page_size]
+        self.next_cursor = self.encode_cursor(items[-1]) if self.has_more else None
+        return items
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more,
+            'results': data,
+        })
+
+
+class PagePagination(SizedPagination):
+    """
+    Paginação por número de página para listas ordenadas por relevância, que não
+    têm uma chave estável para cursor. Aceita querysets ou qualquer sequência
+    fatiável; busca page_size + 1 itens para indicar a próxima página sem COUNT.
+    """
+    page_query_param = 'page'
+
+    swagger_parameters = [
+        openapi.Parameter(
+            'page',
+            openapi.IN_QUERY,
+            description="Número da página, a partir de 1 (ativa a paginação)",
+            type=openapi.TYPE_INTEGER
+        ),
+        openapi.Parameter(
+            'page_size',
+            openapi.IN_QUERY,
+            description=f"Itens por página (ativa a paginação, máximo {settings.PAGINATION_MAX_PAGE_SIZE})",
+            type=openapi.TYPE_INTEGER
+        ),
+    ]
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.page_query_param in params or self.page_size_query_param in params
+
+    def get_page_number(self, request):
+        value = request.query_params.get(self.page_query_param, '1')
+        if not value.isdigit() or int(value) < 1:
+            raise ValidationError({self.page_query_param: 'Deve ser um número inteiro maior que zero.'})
+        return int(value)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        self.page = self.get_page_number(request)
+        offset = (self.page - 1) * page_size
+
+        items = list(queryset[offset:offset + page_size + 1])
+        self.has_more = len(items) > page_size
+        return items[:page_size]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next_page': self.page + 1 if self.has_more else None,
+            'has_more': self.has_more,
+            'results': data,
+        })
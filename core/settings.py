@@ -49,6 +49,8 @@ INSTALLED_APPS = [
     'services',
     'schedule',
     'appointments',
+    'uploads',
+    'notifications',
     'corsheaders'
 ]
 
@@ -68,7 +70,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -122,6 +124,39 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Memória local por padrão; CACHE_BACKEND/CACHE_LOCATION permitem usar outro backend (ex.: Redis)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'agenda-barbe'),
+    }
+}
+
+# Tempo (segundos) que as respostas das rotas públicas ficam em cache
+PUBLIC_CACHE_TIMEOUT = int(os.getenv('PUBLIC_CACHE_TIMEOUT', 300))
+
+# Cache da autenticação por token (core.authentication.CachedTokenAuthentication):
+# tempo no cache compartilhado, TTL e tamanho máximo do LRU de cada processo
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_TTL', 30))
+AUTH_TOKEN_LOCAL_MAX_ENTRIES = int(os.getenv('AUTH_TOKEN_LOCAL_MAX_ENTRIES', 1024))
+
+# Semanas à frente em que os horários (TimeSlot) ficam materializados por data;
+# o comando roll_slot_horizon estende o horizonte e retira as datas passadas
+SLOT_HORIZON_WEEKS = int(os.getenv('SLOT_HORIZON_WEEKS', 4))
+
+# Índice de nomes em memória da busca de barbeiros (users.search) fora do PostgreSQL:
+# tempo máximo (segundos) até ser reconstruído
+BARBER_SEARCH_INDEX_TIMEOUT = int(os.getenv('BARBER_SEARCH_INDEX_TIMEOUT', 300))
+
+# Paginação (core.pagination)
+PAGINATION_PAGE_SIZE = int(os.getenv('PAGINATION_PAGE_SIZE', 20))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 100))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -185,8 +220,23 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 BUCKET_NAME = os.getenv('BUCKET_NAME')
 
+# Uploads em segundo plano (app uploads): os arquivos recebidos ficam no spool
+# local até o worker `process_uploads` enviá-los para o armazenamento
+UPLOAD_STORAGE_BACKEND = os.getenv('UPLOAD_STORAGE_BACKEND', 'core.utils.upload_images_firebase.SupabaseStorage')
+UPLOAD_STORAGE_ROOT = os.getenv('UPLOAD_STORAGE_ROOT', os.path.join(BASE_DIR, 'storage'))
+UPLOAD_STORAGE_URL = os.getenv('UPLOAD_STORAGE_URL', '/storage/')
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(BASE_DIR, 'spool'))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', 5))
+# Atraso inicial/máximo do backoff entre tentativas e prazo de um envio em andamento (segundos)
+UPLOAD_RETRY_DELAY = int(os.getenv('UPLOAD_RETRY_DELAY', 30))
+UPLOAD_MAX_RETRY_DELAY = int(os.getenv('UPLOAD_MAX_RETRY_DELAY', 3600))
+UPLOAD_PROCESSING_TIMEOUT = int(os.getenv('UPLOAD_PROCESSING_TIMEOUT', 300))
+# Formato (WEBP ou JPEG) e qualidade das variantes thumbnail/card/full (requer Pillow)
+UPLOAD_IMAGE_FORMAT = os.getenv('UPLOAD_IMAGE_FORMAT', 'WEBP')
+UPLOAD_IMAGE_QUALITY = int(os.getenv('UPLOAD_IMAGE_QUALITY', 82))
+
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -194,5 +244,14 @@ EMAIL_HOST_USER = 'msg2@aluno.ifnmg.edu.br'
 EMAIL_HOST_PASSWORD = 'lozz pdfs vvhm eaii' 
 DEFAULT_FROM_EMAIL = 'Agenda Barbe <msg2@aluno.ifnmg.edu.br>'
 
+# Outbox de emails (app notifications), enviado pelo worker `send_outbox`:
+# tentativas máximas, atraso inicial/máximo do backoff e prazo de um envio em andamento (segundos),
+# e por quantos dias os emails enviados ou que falharam são mantidos
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 30))
+OUTBOX_MAX_RETRY_DELAY = int(os.getenv('OUTBOX_MAX_RETRY_DELAY', 3600))
+OUTBOX_SENDING_TIMEOUT = int(os.getenv('OUTBOX_SENDING_TIMEOUT', 300))
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 7))
+
 # Frontend URL for password reset
 FRONTEND_URL = 'agenda-barber-psi.vercel.app'
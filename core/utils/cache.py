@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+def public_work_days_key(barber_id):
+    return f'public:work_days:{barber_id}'
+
+
+def public_services_key(barber_id):
+    return f'public:services:{barber_id}'
+
+
+def available_slots_key(work_day_id):
+    return f'public:available_slots:{work_day_id}'
+
+
+def barber_search_version_key():
+    return 'search:barbers:version'
+
+
+def barber_public_keys(barber_id):
+    """
+    Chaves das páginas públicas que exibem os dados do barbeiro (perfil e avaliações).
+    """
+    return [public_work_days_key(barber_id), public_services_key(barber_id)]
+
+
+def invalidate_public_cache(*keys):
+    """
+    Remove as chaves do cache após o commit da transação atual, para que
+    nenhuma requisição concorrente volte a armazenar os dados antigos.
+    """
+    keys = [key for key in keys if key]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def is_not_modified(request, entry):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or entry['etag'] in etags or f"W/{entry['etag']}" in etags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and entry['last_modified'] <= if_modified_since
+
+
+def cached_public_response(request, key, build_data):
+    """
+    Retorna a resposta de uma rota pública a partir do cache, calculando-a
+    com `build_data()` quando ausente. Inclui ETag/Last-Modified e responde
+    304 quando o cliente já possui a versão atual.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        data = build_data()
+        content = JSONRenderer().render(data)
+        entry = {
+            'data': data,
+            'etag': quote_etag(hashlib.md5(content).hexdigest()),
+            'last_modified': int(time.time()),
+        }
+        cache.set(key, entry, settings.PUBLIC_CACHE_TIMEOUT)
+
+    if is_not_modified(request, entry):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(entry['data'])
+
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
@@ -0,0 +1,109 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow é opcional: sem ele apenas o original é enviado
+    Image = None
+
+
+# Variantes geradas para cada imagem: (largura, altura) máximas e recorte quadrado
+IMAGE_VARIANTS = {
+    'thumbnail': ((150, 150), True),
+    'card': ((600, 600), False),
+    'full': ((1600, 1600), False),
+}
+
+
+def generate_content_hash(image_file):
+    """
+    Calcula o SHA-256 do conteúdo lendo o arquivo em chunks.
+    """
+    image_file = image_file if isinstance(image_file, File) else File(image_file)
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def is_image(image_file):
+    """
+    Indica se o arquivo enviado é uma imagem. Com o Pillow o conteúdo é verificado;
+    sem ele vale o content type informado no upload.
+    """
+    if Image is None:
+        return (getattr(image_file, 'content_type', None) or '').startswith('image/')
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            image.verify()
+    except Exception:
+        return False
+    finally:
+        image_file.seek(0)
+    return True
+
+
+def image_upload_error(files, field):
+    """
+    Retorna o erro de validação do campo de imagem, ou None quando o arquivo
+    é uma imagem ou não foi enviado.
+    """
+    image_file = files.get(field)
+    if image_file and not is_image(image_file):
+        return {field: ['Envie uma imagem válida.']}
+    return None
+
+
+def variant_format():
+    """
+    Retorna (formato do Pillow, extensão) das variantes: WebP quando suportado, senão JPEG.
+    """
+    if settings.UPLOAD_IMAGE_FORMAT.upper() == 'WEBP' and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def build_variant_paths(folder, digest, file_name):
+    """
+    Caminhos de cada variante no armazenamento, endereçados pelo hash do conteúdo.
+    Sem Pillow existe apenas a variante `full`, com a extensão original.
+    """
+    if Image is None:
+        extension = os.path.splitext(file_name)[1].lower() or '.bin'
+        return {'full': f'{folder}/{digest}/full{extension}'}
+    _, extension = variant_format()
+    return {variant: f'{folder}/{digest}/{variant}.{extension}' for variant in IMAGE_VARIANTS}
+
+
+def render_variants(image_file):
+    """
+    Gera as variantes redimensionadas da imagem, já corrigindo a rotação EXIF.
+    Retorna {variante: BytesIO}; sem Pillow retorna o arquivo original como `full`.
+    """
+    if Image is None:
+        return {'full': image_file}
+
+    image_format, _ = variant_format()
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original)
+        if image_format == 'JPEG' or original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGB')
+
+        variants = {}
+        for variant, (size, crop) in IMAGE_VARIANTS.items():
+            if crop:
+                resized = ImageOps.fit(original, size, Image.LANCZOS)
+            else:
+                resized = original.copy()
+                resized.thumbnail(size, Image.LANCZOS)
+            output = BytesIO()
+            resized.save(output, image_format, quality=settings.UPLOAD_IMAGE_QUALITY)
+            output.seek(0)
+            variants[variant] = output
+    return variants
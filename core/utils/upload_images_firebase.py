@@ -1,61 +1,155 @@
-from supabase import create_client, Client
-from core import settings
-import hashlib
+import mimetypes
+import os
+import threading
+from abc import ABC, abstractmethod
+from io import BufferedReader, FileIO
+
+from django.conf import settings
+from django.core.files import File
+from django.utils.module_loading import import_string
+from storage3.utils import StorageException
+from supabase import create_client
+
+from core.utils.images import build_variant_paths, generate_content_hash, render_variants
+
+
+_client = None
+_client_lock = threading.Lock()
 
-BUCKET = settings.BUCKET_NAME
 
 def get_supabase_client():
     """
-    Função para criar e retornar o cliente Supabase,
-    abrindo a conexão somente quando necessário.
+    Retorna o cliente Supabase do processo, criado na primeira chamada.
+
+    O cliente (e sua sessão HTTP) é compartilhado entre as threads, então as
+    conexões são reaproveitadas em vez de abrir um novo handshake por upload.
     """
-    url = settings.SUPABASE_URL
-    key = settings.SUPABASE_KEY
-    return create_client(url, key)
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _client
 
 
-def generate_image_hash(image_name):
+class StorageBackend(ABC):
     """
-    Gera um hash SHA-256 único para o nome do arquivo.
+    Interface dos backends de armazenamento de imagens.
     """
-    hash_object = hashlib.sha256(image_name.encode())
-    return hash_object.hexdigest()
 
-def upload_avatar_to_supabase(image_file, image_name):
+    @abstractmethod
+    def upload(self, file_path, image_file):
+        """
+        Envia o arquivo para `file_path` e retorna a URL pública.
+        """
+
+    @abstractmethod
+    def exists(self, file_path):
+        """
+        Indica se já existe um objeto em `file_path`.
+        """
+
+    @abstractmethod
+    def url(self, file_path):
+        """
+        Retorna a URL pública de `file_path`.
+        """
+
+    @staticmethod
+    def as_file(image_file):
+        # Aceita UploadedFile do Django ou um arquivo aberto em modo binário
+        return image_file if isinstance(image_file, File) else File(image_file)
+
+
+class SupabaseStorage(StorageBackend):
     """
-    Faz o upload do arquivo de imagem na pasta 'avatars' no Supabase.
+    Envia os arquivos para o bucket do Supabase e retorna a URL pública.
     """
-    try:
-        supabase: Client = get_supabase_client()
 
-        unique_image_name = f"{generate_image_hash(image_name)}_{image_name}"
-        file_path = f"avatar/{unique_image_name}"
-        file_content = image_file.read()
-        response = supabase.storage.from_(BUCKET).upload(file_path, file_content)
+    @staticmethod
+    def bucket():
+        return get_supabase_client().storage.from_(settings.BUCKET_NAME)
+
+    def upload(self, file_path, image_file):
+        image_file = self.as_file(image_file)
+        bucket = self.bucket()
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        response = bucket.upload(file_path, self.stream(image_file), {'content-type': content_type})
         if response.path:
-            public_url = supabase.storage.from_(BUCKET).get_public_url(response.path)
-            return public_url
-        else:
-            raise Exception("Erro no upload: caminho não encontrado na resposta")
+            return bucket.get_public_url(response.path)
+        raise Exception("Erro no upload: caminho não encontrado na resposta")
+
+    def exists(self, file_path):
+        try:
+            return self.bucket().exists(file_path)
+        except StorageException:
+            return False
 
-    except Exception as e:
-        raise Exception(f"Erro no upload do avatar: {str(e)}")
+    def url(self, file_path):
+        return self.bucket().get_public_url(file_path)
 
+    @staticmethod
+    def stream(image_file):
+        """
+        Arquivos em disco são enviados por streaming pelo cliente HTTP; os que estão
+        em memória (limitados por FILE_UPLOAD_MAX_MEMORY_SIZE) são juntados pelos chunks.
+        """
+        image_file.seek(0)
+        if isinstance(image_file.file, (BufferedReader, FileIO)):
+            return image_file.file
+        return b''.join(image_file.chunks())
 
-def upload_services_to_supabase(image_file, image_name):
+
+class FileSystemStorage(StorageBackend):
     """
-    Faz o upload do arquivo de imagem na pasta 'services' no Supabase.
+    Substituto local do Supabase: grava os arquivos em UPLOAD_STORAGE_ROOT.
+    Usado nos testes, benchmarks e em desenvolvimento sem acesso ao bucket.
     """
-    try:
-        supabase: Client = get_supabase_client()
-        unique_image_name = f"{generate_image_hash(image_name)}_{image_name}"
-        file_path = f"services/{unique_image_name}"
-        file_content = image_file.read()
-        response = supabase.storage.from_(BUCKET).upload(file_path, file_content)
-        if response.path:
-            public_url = supabase.storage.from_(BUCKET).get_public_url(response.path)
-            return public_url
-        else:
-            raise Exception("Erro no upload: caminho não encontrado na resposta")
-    except Exception as e:
-        raise Exception(f"Erro no upload dos serviços: {str(e)}")
+
+    def upload(self, file_path, image_file):
+        destination = os.path.join(settings.UPLOAD_STORAGE_ROOT, file_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, 'wb') as output:
+            for chunk in self.as_file(image_file).chunks():
+                output.write(chunk)
+        return self.url(file_path)
+
+    def exists(self, file_path):
+        return os.path.exists(os.path.join(settings.UPLOAD_STORAGE_ROOT, file_path))
+
+    def url(self, file_path):
+        return f"{settings.UPLOAD_STORAGE_URL.rstrip('/')}/{file_path}"
+
+
+_storages = {}
+
+
+def get_storage():
+    """
+    Retorna a instância do processo do backend configurado em UPLOAD_STORAGE_BACKEND.
+    """
+    backend = settings.UPLOAD_STORAGE_BACKEND
+    storage = _storages.get(backend)
+    if storage is None:
+        with _client_lock:
+            storage = _storages.setdefault(backend, import_string(backend)())
+    return storage
+
+
+def upload_image_variants(folder, image_file, file_name, storage=None):
+    """
+    Envia as variantes (thumbnail, card, full) da imagem e retorna {variante: URL}.
+
+    As chaves são derivadas do hash do conteúdo: imagens idênticas reaproveitam os
+    objetos já existentes e nada é reprocessado nem reenviado.
+    """
+    storage = storage or get_storage()
+    digest = generate_content_hash(image_file)
+    paths = build_variant_paths(folder, digest, file_name)
+    missing = {variant: path for variant, path in paths.items() if not storage.exists(path)}
+    urls = {variant: storage.url(path) for variant, path in paths.items() if variant not in missing}
+
+    if missing:
+        variants = render_variants(image_file)
+        urls.update({variant: storage.upload(path, variants[variant]) for variant, path in missing.items()})
+    return urls
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from notifications.models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    # O corpo pode conter links de recuperação de senha: não é exibido no admin
+    exclude = ('body',)
+    list_display = ('subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('subject', 'from_email', 'to', 'attempts', 'last_error', 'created_at', 'sent_at')
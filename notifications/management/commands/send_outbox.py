@@ -0,0 +1,69 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from notifications.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia os emails pendentes do outbox em lotes, reaproveitando uma única conexão SMTP. "
+        "Falhas são reagendadas com backoff exponencial e emails finalizados há mais de "
+        "OUTBOX_RETENTION_DAYS dias são apagados. Use --loop para manter o worker em execução."
+    )
+
+    # Intervalo em segundos entre as limpezas de emails antigos no modo --loop
+    PURGE_INTERVAL = 3600
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Quantidade de emails buscados por lote.')
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novos emails.')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Pausa em segundos quando não há emails devidos.')
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        sent = failed = 0
+        purged = OutboxEmail.purge_finished()
+        last_purge = time.monotonic()
+
+        try:
+            while True:
+                batch = list(OutboxEmail.due()[:options['batch_size']])
+                for email in batch:
+                    # Outro worker pode ter pego o mesmo email
+                    if not email.claim():
+                        continue
+                    try:
+                        connection.open()
+                        connection.send_messages([email.as_message(connection)])
+                    except Exception as e:
+                        email.mark_failed(e)
+                        failed += 1
+                        self.stderr.write(f'Email {email.id} falhou (tentativa {email.attempts}): {e}')
+                        # A conexão pode ter ficado inutilizável: reabre no próximo envio
+                        self.close_quietly(connection)
+                    else:
+                        email.mark_sent()
+                        sent += 1
+
+                if not batch:
+                    if not options['loop']:
+                        break
+                    # Fecha a conexão ociosa para o servidor não derrubá-la por timeout
+                    self.close_quietly(connection)
+                    if time.monotonic() - last_purge >= self.PURGE_INTERVAL:
+                        purged += OutboxEmail.purge_finished()
+                        last_purge = time.monotonic()
+                    time.sleep(options['sleep'])
+        finally:
+            self.close_quietly(connection)
+
+        self.stdout.write(self.style.SUCCESS(f'{sent} email(s) enviado(s), {failed} falha(s), {purged} antigo(s) apagado(s).'))
+
+    @staticmethod
+    def close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
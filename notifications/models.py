@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class OutboxEmail(models.Model):
+    """
+    Email transacional enfileirado pela requisição e enviado pelo worker `send_outbox`.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendente'
+        SENDING = 'sending', 'Enviando'
+        SENT = 'sent', 'Enviado'
+        FAILED = 'failed', 'Falhou'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # O worker busca os emails devidos em ordem de chegada
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)} ({self.get_status_display()})'
+
+    @classmethod
+    def enqueue(cls, subject, body, to, from_email=None):
+        return cls.objects.create(
+            subject=subject,
+            body=body,
+            to=list(to),
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        )
+
+    @classmethod
+    def due(cls):
+        """
+        Emails prontos para envio, incluindo os que ficaram em `sending` além do
+        prazo (worker interrompido no meio do envio).
+        """
+        return cls.objects.filter(
+            status__in=[cls.Status.PENDING, cls.Status.SENDING],
+            next_attempt_at__lte=timezone.now()
+        ).order_by('id')
+
+    def claim(self):
+        """
+        Reserva o email para este worker por OUTBOX_SENDING_TIMEOUT segundos;
+        retorna False se outro worker já o pegou.
+        """
+        lease = timezone.now() + timedelta(seconds=settings.OUTBOX_SENDING_TIMEOUT)
+        claimed = OutboxEmail.objects.filter(pk=self.pk, status=self.status, attempts=self.attempts).update(
+            status=self.Status.SENDING,
+            attempts=F('attempts') + 1,
+            next_attempt_at=lease
+        )
+        if claimed:
+            self.status = self.Status.SENDING
+            self.attempts += 1
+        return bool(claimed)
+
+    @classmethod
+    def purge_finished(cls):
+        """
+        Apaga os emails enviados ou que falharam há mais de OUTBOX_RETENTION_DAYS dias.
+        """
+        cutoff = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+        deleted, _ = cls.objects.filter(
+            status__in=[cls.Status.SENT, cls.Status.FAILED],
+            created_at__lt=cutoff
+        ).delete()
+        return deleted
+
+    def as_message(self, connection):
+        return EmailMessage(self.subject, self.body, self.from_email, self.to, connection=connection)
+
+    def mark_sent(self):
+        # O corpo pode conter links e tokens (recuperação de senha): não fica guardado após o envio
+        self.status = self.Status.SENT
+        self.sent_at = timezone.now()
+        self.last_error = ''
+        self.body = ''
+        self.save(update_fields=['status', 'sent_at', 'last_error', 'body'])
+
+    def mark_failed(self, error):
+        """
+        Reagenda com backoff exponencial ou desiste após OUTBOX_MAX_ATTEMPTS tentativas,
+        descartando o corpo.
+        """
+        self.last_error = str(error)
+        if self.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            self.status = self.Status.FAILED
+            self.body = ''
+        else:
+            self.status = self.Status.PENDING
+            delay = min(settings.OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1), settings.OUTBOX_MAX_RETRY_DELAY)
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['status', 'last_error', 'next_attempt_at', 'body'])
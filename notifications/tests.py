@@ -0,0 +1,105 @@
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from appointments.tests import create_client
+from .models import OutboxEmail
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('servidor SMTP indisponível')
+
+
+class OutboxEmailTest(TestCase):
+    def test_password_reset_enqueues_instead_of_sending(self):
+        user = create_client()
+
+        response = APIClient().post('/api/v1/auth/password-reset/', {'email': user.email})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, [user.email])
+        self.assertIn('/reset-password/', email.body)
+
+    def test_worker_sends_batch_over_one_connection(self):
+        for i in range(3):
+            OutboxEmail.enqueue('Assunto', 'Corpo', [f'cliente{i}@teste.com'])
+
+        with mock.patch('notifications.management.commands.send_outbox.get_connection',
+                        wraps=mail.get_connection) as get_connection:
+            call_command('send_outbox', '--batch-size', '2', stdout=StringIO())
+
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists())
+        # O corpo já enviado não fica guardado
+        self.assertFalse(OutboxEmail.objects.exclude(body='').exists())
+        self.assertEqual(mail.outbox[0].body, 'Corpo')
+
+    @override_settings(
+        EMAIL_BACKEND='notifications.tests.FailingEmailBackend',
+        OUTBOX_MAX_ATTEMPTS=2,
+        OUTBOX_RETRY_DELAY=30,
+    )
+    def test_failures_are_retried_with_backoff(self):
+        email = OutboxEmail.enqueue('Assunto', 'Corpo', ['cliente@teste.com'])
+
+        call_command('send_outbox', stdout=StringIO(), stderr=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=25))
+        self.assertIn('indisponível', email.last_error)
+
+        # Ainda não está devido: a próxima execução não tenta novamente
+        call_command('send_outbox', stdout=StringIO(), stderr=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        call_command('send_outbox', stdout=StringIO(), stderr=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(email.body, '')
+
+    def test_expired_sending_lease_is_reclaimed(self):
+        email = OutboxEmail.enqueue('Assunto', 'Corpo', ['cliente@teste.com'])
+        self.assertTrue(email.claim())
+        self.assertFalse(OutboxEmail.due().exists())
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        call_command('send_outbox', stdout=StringIO())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.SENT)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(OUTBOX_RETENTION_DAYS=7)
+    def test_worker_purges_finished_emails_after_retention(self):
+        old_sent = OutboxEmail.enqueue('Assunto', 'Corpo', ['a@teste.com'])
+        old_failed = OutboxEmail.enqueue('Assunto', 'Corpo', ['b@teste.com'])
+        old_pending = OutboxEmail.enqueue('Assunto', 'Corpo', ['c@teste.com'])
+        recent_sent = OutboxEmail.enqueue('Assunto', 'Corpo', ['d@teste.com'])
+        OutboxEmail.objects.filter(pk=old_sent.pk).update(status=OutboxEmail.Status.SENT)
+        OutboxEmail.objects.filter(pk=old_failed.pk).update(status=OutboxEmail.Status.FAILED)
+        OutboxEmail.objects.filter(pk=recent_sent.pk).update(status=OutboxEmail.Status.SENT)
+        OutboxEmail.objects.filter(pk__in=[old_sent.pk, old_failed.pk, old_pending.pk]).update(
+            created_at=timezone.now() - timezone.timedelta(days=8)
+        )
+
+        call_command('send_outbox', stdout=StringIO())
+
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list('pk', flat=True)), {old_pending.pk, recent_sent.pk}
+        )
+        # O email pendente antigo foi enviado nesta execução, não apagado
+        self.assertEqual(len(mail.outbox), 1)
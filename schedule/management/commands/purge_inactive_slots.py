@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from appointments.models import Appointment
+from schedule.models import TimeSlot
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove em lotes os horários (TimeSlot) inativos que não são referenciados por nenhum "
+        "agendamento. Percorre os ids em ordem crescente; use --after-id para retomar uma execução."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantidade de horários examinados por lote.')
+        parser.add_argument('--sleep', type=float, default=0.5, help='Pausa em segundos entre os lotes.')
+        parser.add_argument('--after-id', type=int, default=0, help='Retoma a partir dos ids maiores que este.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Interrompe após este número de lotes.')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta os horários que seriam removidos.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = options['after_id']
+        referenced = Appointment.objects.filter(time_slot=OuterRef('pk'))
+        batches = 0
+        total = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            window = list(
+                TimeSlot.objects.filter(is_active=False, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not window:
+                break
+
+            purgeable = TimeSlot.objects.filter(id__in=window).filter(~Exists(referenced))
+            if options['dry_run']:
+                removed = purgeable.count()
+            else:
+                removed, _ = purgeable.delete()
+
+            batches += 1
+            total += removed
+            last_id = window[-1]
+            self.stdout.write(f'Lote {batches}: {removed} horário(s) removido(s), último id {last_id}.')
+
+            if len(window) < batch_size:
+                break
+            time.sleep(options['sleep'])
+
+        action = 'seriam removidos' if options['dry_run'] else 'removidos'
+        self.stdout.write(self.style.SUCCESS(f'{total} horário(s) inativo(s) {action}. Último id: {last_id}.'))
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils.timezone import localdate
+
+from appointments.models import Appointment
+from core.utils.cache import available_slots_key, invalidate_public_cache, public_work_days_key
+from schedule.models import TimeSlot, WorkDay
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantém o calendário de horários: retira em lotes os horários de datas passadas (e os "
+        "antigos sem data, quando livres) e materializa os que faltam até o fim do horizonte. "
+        "Deve ser executado diariamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks', type=int, default=settings.SLOT_HORIZON_WEEKS,
+            help='Semanas à frente a materializar (padrão: SLOT_HORIZON_WEEKS).'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantidade de horários por lote.')
+
+    def handle(self, *args, **options):
+        today = localdate()
+        end = today + timedelta(weeks=options['weeks'])
+        touched = set()
+
+        retired = self.retire(today, options['batch_size'], touched)
+        created = self.extend(today, end, options['batch_size'], touched)
+
+        keys = [
+            key for work_day_id, barber_id in touched
+            for key in (available_slots_key(work_day_id), public_work_days_key(barber_id))
+        ]
+        invalidate_public_cache(*keys)
+        self.stdout.write(self.style.SUCCESS(
+            f'{retired} horário(s) retirado(s), {created} criado(s) até {end:%d/%m/%Y}.'
+        ))
+
+    def retire(self, today, batch_size, touched):
+        """
+        Desativa os horários de datas passadas e os do modelo semanal antigo que não
+        têm agendamento em andamento, em lotes por id.
+        """
+        live = Appointment.objects.filter(
+            time_slot=OuterRef('pk'),
+            status__in=TimeSlot.LIVE_APPOINTMENT_STATUSES
+        )
+        retirable = TimeSlot.objects.alias(has_live=Exists(live)).filter(
+            Q(date__lt=today) | Q(date__isnull=True, has_live=False),
+            is_active=True
+        )
+        total = 0
+        while True:
+            batch = list(
+                retirable.order_by('id')
+                .values_list('id', 'work_day_id', 'work_day__barber_id')[:batch_size]
+            )
+            if not batch:
+                return total
+            total += TimeSlot.objects.filter(id__in=[row[0] for row in batch]).update(
+                is_active=False, is_available=False
+            )
+            touched.update((work_day_id, barber_id) for _, work_day_id, barber_id in batch)
+
+    def extend(self, today, end, batch_size, touched):
+        """
+        Cria os horários das datas ainda não materializadas de cada dia de trabalho ativo.
+        """
+        last_dates = dict(
+            TimeSlot.objects.filter(date__isnull=False)
+            .values('work_day_id')
+            .annotate(last=Max('date'))
+            .values_list('work_day_id', 'last')
+        )
+        work_days = WorkDay.objects.filter(
+            is_active=True,
+            day_of_week__isnull=False,
+            start_time__isnull=False,
+            end_time__isnull=False,
+            lunch_start_time__isnull=False,
+            lunch_end_time__isnull=False,
+        )
+        total = 0
+        pending = []
+        for work_day in work_days.iterator():
+            last = last_dates.get(work_day.id)
+            start = max(today, last + timedelta(days=1)) if last else today
+            slots = work_day.build_slots(work_day.slot_dates(start, end))
+            if slots:
+                pending.extend(slots)
+                touched.add((work_day.id, work_day.barber_id))
+            if len(pending) >= batch_size:
+                total += self.flush(pending)
+                pending = []
+        return total + self.flush(pending)
+
+    @staticmethod
+    def flush(slots):
+        """
+        Insere o lote e retorna quantos horários foram de fato criados. A restrição
+        única de (work_day, date, time) ativos torna a execução idempotente: os que já
+        existem são ignorados pelo bulk_create e não entram na contagem.
+        """
+        if not slots:
+            return 0
+        scope = TimeSlot.objects.filter(
+            work_day_id__in={slot.work_day_id for slot in slots},
+            date__in={slot.date for slot in slots},
+            is_active=True,
+        )
+        with transaction.atomic():
+            before = scope.count()
+            TimeSlot.objects.bulk_create(slots, ignore_conflicts=True)
+            return scope.count() - before
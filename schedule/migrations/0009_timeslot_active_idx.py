@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_remove_timeslot_unique_time_slot_per_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['work_day', 'is_available', 'time'], name='timeslot_active_idx'),
+        ),
+    ]
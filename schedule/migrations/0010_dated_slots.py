@@ -0,0 +1,52 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_slot_barber(apps, schema_editor):
+    """
+    Copia o barbeiro do dia de trabalho para os horários existentes. As datas são
+    materializadas pelo comando roll_slot_horizon.
+    """
+    TimeSlot = apps.get_model('schedule', 'TimeSlot')
+    WorkDay = apps.get_model('schedule', 'WorkDay')
+    TimeSlot.objects.update(
+        barber_id=Subquery(WorkDay.objects.filter(pk=OuterRef('work_day_id')).values('barber_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schedule', '0009_timeslot_active_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='timeslot',
+            options={'ordering': ['date', 'time']},
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='barber',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='time_slots', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_slot_barber, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_available', True)), fields=['barber', 'date', 'time'], name='timeslot_calendar_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeslot',
+            constraint=models.UniqueConstraint(condition=models.Q(('date__isnull', False), ('is_active', True)), fields=('work_day', 'date', 'time'), name='timeslot_unique_active_date'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0010_dated_slots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_available', True)), fields=['date', 'time'], name='timeslot_open_idx'),
+        ),
+    ]
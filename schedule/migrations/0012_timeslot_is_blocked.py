@@ -0,0 +1,34 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:53
+
+from django.db import migrations, models
+from django.utils.timezone import localdate
+
+
+def backfill_blocked_slots(apps, schema_editor):
+    """
+    Marca como bloqueados os horários ativos indisponíveis sem agendamento em
+    andamento: até aqui o bloqueio era guardado apenas em is_available=False.
+    """
+    TimeSlot = apps.get_model('schedule', 'TimeSlot')
+    Appointment = apps.get_model('appointments', 'Appointment')
+    live = Appointment.objects.filter(status__in=('pending', 'confirmed')).values('time_slot_id')
+    TimeSlot.objects.filter(is_active=True, is_available=False).exclude(date__lt=localdate()).exclude(
+        id__in=live
+    ).update(is_blocked=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_recent_indexes'),
+        ('schedule', '0011_open_slots_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslot',
+            name='is_blocked',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_blocked_slots, migrations.RunPython.noop),
+    ]
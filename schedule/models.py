@@ -1,4 +1,9 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.utils.timezone import localdate, localtime
+from core.utils.cache import available_slots_key, invalidate_public_cache, public_work_days_key
+from services.models import Services
 from users.models import User
 from datetime import datetime, timedelta, time
 
@@ -50,59 +55,412 @@ class WorkDay(models.Model):
     def get_weekday_order(self):
         return self.WEEKDAY_ORDER.get(self.day_of_week, 8)
     
+    SCHEDULE_FIELDS = ('start_time', 'end_time', 'lunch_start_time', 'lunch_end_time', 'slot_duration')
+
+    # Limites da duração de cada horário, em minutos
+    MIN_SLOT_DURATION = 5
+    MAX_SLOT_DURATION = 240
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if len(values) == len(cls._meta.concrete_fields):
+            instance._loaded_schedule = instance.get_slot_source()
+        return instance
+
+    def get_slot_source(self):
+        """
+        Tudo de que os horários gerados dependem: o dia da semana (que define as
+        datas) e o expediente. Mudar qualquer um deles exige regenerar os horários.
+        """
+        return (self.day_of_week, self.get_schedule())
+
+    def get_schedule(self):
+        """
+        Campos que definem os horários do dia, com os horários normalizados para `time`.
+        """
+        return tuple(
+            time.fromisoformat(value) if isinstance(value, str) else value
+            for value in (getattr(self, field) for field in self.SCHEDULE_FIELDS)
+        )
+
+    def build_slot_times(self):
+        """
+        Calcula os horários desejados a partir do expediente e do intervalo de almoço.
+        Os passos param na meia-noite: um horário nunca avança para o dia seguinte.
+        """
+        self.start_time, self.end_time, self.lunch_start_time, self.lunch_end_time, _ = self.get_schedule()
+
+        times = []
+        step = timedelta(minutes=self.slot_duration)
+        day = datetime.today().date()
+
+        for first, until in ((self.start_time, self.lunch_start_time), (self.lunch_end_time, self.end_time)):
+            current = datetime.combine(day, first)
+            while current.date() == day and current.time() < until:
+                times.append(current.time())
+                current += step
+
+        return times
+
+    @classmethod
+    def schedule_error(cls, start_time, end_time, lunch_start_time, lunch_end_time, slot_duration):
+        """
+        Valida um expediente: retorna a mensagem de erro ou None.
+
+        Os horários devem estar em ordem e o último horário de cada período (antes e
+        depois do almoço) precisa terminar até a meia-noite.
+        """
+        if not cls.MIN_SLOT_DURATION <= slot_duration <= cls.MAX_SLOT_DURATION:
+            return (
+                f"A duração de cada horário deve ficar entre {cls.MIN_SLOT_DURATION} "
+                f"e {cls.MAX_SLOT_DURATION} minutos."
+            )
+        if not start_time <= lunch_start_time <= lunch_end_time <= end_time or start_time == end_time:
+            return "Os horários devem seguir a ordem: início, início do almoço, fim do almoço e fim do expediente."
+
+        def minutes(value):
+            return value.hour * 60 + value.minute
+
+        for first, until in ((start_time, lunch_start_time), (lunch_end_time, end_time)):
+            span = minutes(until) - minutes(first)
+            steps = -(-span // slot_duration)
+            if minutes(first) + steps * slot_duration > 24 * 60:
+                return "O último horário do expediente não pode passar da meia-noite."
+        return None
+
+    def slot_dates(self, start=None, end=None):
+        """
+        Datas deste dia da semana em [start, end), por padrão de hoje até o fim do
+        horizonte de SLOT_HORIZON_WEEKS semanas.
+        """
+        if self.day_of_week not in self.WEEKDAY_ORDER:
+            return []
+        start = start or localdate()
+        end = end or localdate() + timedelta(weeks=settings.SLOT_HORIZON_WEEKS)
+        weekday = self.WEEKDAY_ORDER[self.day_of_week] - 1
+        current = start + timedelta(days=(weekday - start.weekday()) % 7)
+        dates = []
+        while current < end:
+            dates.append(current)
+            current += timedelta(weeks=1)
+        return dates
+
+    def build_slots(self, dates):
+        """
+        Horários (não salvos) de cada data informada.
+        """
+        times = self.build_slot_times()
+        return [
+            TimeSlot(work_day=self, barber_id=self.barber_id, date=slot_date, time=slot_time, is_available=True)
+            for slot_date in dates for slot_time in times
+        ]
+
     def generate_time_slots(self):
         """
-        Gera os horários baseados nos horários de início, fim e almoço definidos para o dia
+        Gera os horários de cada data do horizonte a partir do expediente e do almoço do dia.
+
+        Compara os horários (data, hora) desejados com os ativos a partir de hoje: cria
+        apenas os que faltam, desativa os que saíram do expediente e mantém os demais.
+        Horários com agendamentos em andamento nunca são desativados. Os horários
+        antigos sem data (modelo semanal) são desativados da mesma forma.
         """
+        today = localdate()
+        current = TimeSlot.objects.filter(work_day=self, is_active=True).filter(
+            Q(date__isnull=True) | Q(date__gte=today)
+        )
+        active_slots = list(current)
+        live_slot_ids, held_slot_ids = TimeSlot.appointment_holds(current)
+        kept, to_deactivate, to_reopen, new_slots = self.plan_time_slots(
+            active_slots, live_slot_ids, held_slot_ids, today
+        )
+
+        if to_deactivate:
+            TimeSlot.objects.filter(id__in=to_deactivate).update(is_active=False, is_available=False)
+        if to_reopen:
+            TimeSlot.objects.filter(id__in=to_reopen).update(is_available=True)
+        if new_slots:
+            TimeSlot.objects.bulk_create(new_slots)
+
+        self.clear_public_cache()
+        return sorted(
+            kept + new_slots,
+            key=lambda slot: (slot.date is not None, slot.date or today, slot.time)
+        )
 
-        if isinstance(self.start_time, str):
-            self.start_time = time.fromisoformat(self.start_time)
-        if isinstance(self.lunch_start_time, str):
-            self.lunch_start_time = time.fromisoformat(self.lunch_start_time)
-        if isinstance(self.lunch_end_time, str):
-            self.lunch_end_time = time.fromisoformat(self.lunch_end_time)
-        if isinstance(self.end_time, str):
-            self.end_time = time.fromisoformat(self.end_time)
+    def plan_time_slots(self, active_slots, live_slot_ids, held_slot_ids, today):
+        """
+        Compara os horários ativos do dia com os desejados, sem gravar nada.
+        `live_slot_ids` e `held_slot_ids` vêm de TimeSlot.appointment_holds.
 
-        # Apaga(desativa) os horários antigos para evitar duplicação
-        TimeSlot.objects.filter(work_day=self).update(is_active=False, is_available=False)
+        Retorna (mantidos, ids a desativar, ids a reabrir, novos horários não salvos).
+        """
+        desired = {
+            (slot_date, slot_time)
+            for slot_date in self.slot_dates(today)
+            for slot_time in self.build_slot_times()
+        }
 
-        slots = []
-        slot_duration = self.slot_duration
-        current_time = self.start_time  
-        end_of_work = self.end_time
+        # Horários ocupados primeiro, para que prevaleçam sobre duplicatas
+        active_slots = sorted(active_slots, key=lambda slot: slot.id not in live_slot_ids)
 
-        while current_time < self.lunch_start_time:
-            slots.append(TimeSlot(work_day=self, time=current_time, is_available=True))
-            current_time = (datetime.combine(datetime.today(), current_time) + timedelta(minutes=slot_duration)).time()
+        kept = {}
+        to_deactivate = []
+        to_reopen = []
+        for slot in active_slots:
+            key = (slot.date, slot.time)
+            if slot.id in live_slot_ids:
+                kept.setdefault(key, slot)
+            elif key in desired and key not in kept:
+                kept[key] = slot
+                # Horários bloqueados pelo barbeiro ou já atendidos continuam indisponíveis
+                if not slot.is_available and not slot.is_blocked and slot.id not in held_slot_ids:
+                    to_reopen.append(slot.id)
+                    slot.is_available = True
+            else:
+                to_deactivate.append(slot.id)
 
-        current_time = self.lunch_end_time
-        while current_time < end_of_work:
-            slots.append(TimeSlot(work_day=self, time=current_time, is_available=True))
-            current_time = (datetime.combine(datetime.today(), current_time) + timedelta(minutes=slot_duration)).time()
+        new_slots = [
+            TimeSlot(work_day=self, barber_id=self.barber_id, date=slot_date, time=slot_time, is_available=True)
+            for slot_date, slot_time in sorted(desired - set(kept))
+        ]
+        return list(kept.values()), to_deactivate, to_reopen, new_slots
 
-        if slots:
-            TimeSlot.objects.bulk_create(slots)
+    @classmethod
+    def apply_weekly_template(cls, barber, days):
+        """
+        Cria ou atualiza de uma vez os dias de trabalho do barbeiro a partir de um
+        modelo semanal (lista de dias com `day_of_week` e os campos de SCHEDULE_FIELDS).
 
-        return slots
+        Tudo ocorre em uma transação: os dias ativos são lidos em uma consulta, criados
+        com um bulk_create e atualizados com um bulk_update; os horários dos dias
+        alterados são comparados como em generate_time_slots e todos os novos horários
+        são inseridos em um único bulk_create. Dias com o mesmo expediente não mudam.
+        """
+        today = localdate()
+        with transaction.atomic():
+            existing = {}
+            for work_day in cls.objects.select_for_update().filter(
+                barber=barber, is_active=True, day_of_week__in=[day['day_of_week'] for day in days]
+            ).order_by('id'):
+                existing.setdefault(work_day.day_of_week, work_day)
+
+            to_create, to_update, results = [], [], []
+            for day in days:
+                work_day = existing.get(day['day_of_week'])
+                if work_day is None:
+                    work_day = cls(barber=barber, **day)
+                    work_day.weekday_order = work_day.get_weekday_order()
+                    to_create.append(work_day)
+                    results.append((work_day, 'created'))
+                    continue
+                for field in cls.SCHEDULE_FIELDS:
+                    setattr(work_day, field, day[field])
+                if work_day.get_slot_source() == getattr(work_day, '_loaded_schedule', None):
+                    results.append((work_day, 'unchanged'))
+                else:
+                    to_update.append(work_day)
+                    results.append((work_day, 'updated'))
+
+            cls.objects.bulk_create(to_create)
+            if to_update:
+                cls.objects.bulk_update(to_update, cls.SCHEDULE_FIELDS)
+
+            new_slots = [slot for work_day in to_create for slot in work_day.build_slots(work_day.slot_dates(today))]
+            to_deactivate, to_reopen = [], []
+            if to_update:
+                current = TimeSlot.objects.filter(work_day__in=to_update, is_active=True).filter(
+                    Q(date__isnull=True) | Q(date__gte=today)
+                )
+                active_slots = {}
+                for slot in current:
+                    active_slots.setdefault(slot.work_day_id, []).append(slot)
+                live_slot_ids, held_slot_ids = TimeSlot.appointment_holds(current)
+                for work_day in to_update:
+                    _, deactivate, reopen, slots = work_day.plan_time_slots(
+                        active_slots.get(work_day.pk, []), live_slot_ids, held_slot_ids, today
+                    )
+                    to_deactivate += deactivate
+                    to_reopen += reopen
+                    new_slots += slots
+
+            if to_deactivate:
+                TimeSlot.objects.filter(id__in=to_deactivate).update(is_active=False, is_available=False)
+            if to_reopen:
+                TimeSlot.objects.filter(id__in=to_reopen).update(is_available=True)
+            if new_slots:
+                TimeSlot.objects.bulk_create(new_slots)
+
+            for work_day in to_create + to_update:
+                work_day._loaded_schedule = work_day.get_slot_source()
+            if to_create or to_update:
+                invalidate_public_cache(
+                    public_work_days_key(barber.pk),
+                    *(available_slots_key(work_day.pk) for work_day in to_create + to_update)
+                )
+
+        return {
+            'work_days': [
+                {'id': work_day.pk, 'day_of_week': work_day.day_of_week, 'result': result}
+                for work_day, result in results
+            ],
+            'slots_created': len(new_slots),
+            'slots_deactivated': len(to_deactivate),
+        }
+
+    def clear_public_cache(self):
+        """
+        Invalida as respostas públicas em cache que exibem este dia de trabalho.
+        """
+        invalidate_public_cache(public_work_days_key(self.barber_id), available_slots_key(self.pk))
     
     def save(self, *args, **kwargs):
         self.weekday_order = self.WEEKDAY_ORDER.get(self.day_of_week, 8)
+        schedule = self.get_slot_source()
+        schedule_changed = schedule != getattr(self, '_loaded_schedule', None)
         super().save(*args, **kwargs)
-        if self and self.is_active or self.pk:
+        if self.is_active and schedule_changed:
             self.generate_time_slots()
+        self._loaded_schedule = schedule
+        self.clear_public_cache()
 
 
 class TimeSlot(models.Model):
+    # Status (de appointments.Appointment) que mantêm o horário ocupado
+    LIVE_APPOINTMENT_STATUSES = ('pending', 'confirmed')
+    # Status que mantêm o horário indisponível (agendamentos não cancelados)
+    HELD_APPOINTMENT_STATUSES = LIVE_APPOINTMENT_STATUSES + ('completed',)
+
     work_day = models.ForeignKey(WorkDay, on_delete=models.CASCADE, related_name='time_slots')
+    # Barbeiro e data materializados a partir do WorkDay; horários antigos sem data
+    # pertencem ao modelo semanal anterior
+    barber = models.ForeignKey(User, on_delete=models.CASCADE, related_name='time_slots', null=True, blank=True)
+    date = models.DateField(null=True, blank=True)
     time = models.TimeField()
     is_available = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
+    # Bloqueado pelo barbeiro (set_blocked): fica indisponível até ser desbloqueado,
+    # inclusive quando os horários do dia são regenerados
+    is_blocked = models.BooleanField(default=False)
 
     class Meta:
-        ordering = ["time"]
+        ordering = ["date", "time"]
+        indexes = [
+            # Índice parcial: as consultas de horários ignoram as linhas inativas
+            models.Index(
+                fields=['work_day', 'is_available', 'time'],
+                condition=models.Q(is_active=True),
+                name='timeslot_active_idx'
+            ),
+            # Disponibilidade do barbeiro: varredura por faixa de (data, hora) nos horários livres
+            models.Index(
+                fields=['barber', 'date', 'time'],
+                condition=models.Q(is_active=True, is_available=True),
+                name='timeslot_calendar_idx'
+            ),
+            # Busca entre barbeiros: os horários livres em ordem de início
+            models.Index(
+                fields=['date', 'time'],
+                condition=models.Q(is_active=True, is_available=True),
+                name='timeslot_open_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['work_day', 'date', 'time'],
+                condition=models.Q(is_active=True, date__isnull=False),
+                name='timeslot_unique_active_date'
+            ),
+        ]
 
     def __str__(self):
+        if self.date:
+            return f"{self.work_day} - {self.date:%d/%m/%Y} {self.time}"
         return f"{self.work_day} - {self.time}"
 
+    @staticmethod
+    def upcoming(queryset=None):
+        """
+        Horários livres com data a partir de hoje.
+        """
+        queryset = TimeSlot.objects.all() if queryset is None else queryset
+        return queryset.filter(is_active=True, is_available=True, date__gte=localdate())
+
+    @staticmethod
+    def appointment_holds(queryset):
+        """
+        Em uma consulta, os ids do queryset com agendamento em andamento e os ids com
+        qualquer agendamento não cancelado (em andamento ou atendido).
+        """
+        live, held = set(), set()
+        for slot_id, status in queryset.filter(
+            appointment__status__in=TimeSlot.HELD_APPOINTMENT_STATUSES
+        ).values_list('id', 'appointment__status'):
+            held.add(slot_id)
+            if status in TimeSlot.LIVE_APPOINTMENT_STATUSES:
+                live.add(slot_id)
+        return live, held
 
+    @staticmethod
+    def set_blocked(queryset, blocked):
+        """
+        Bloqueia (ou desbloqueia) os horários ativos do queryset a partir de hoje com um
+        único UPDATE. Horários com agendamento não cancelado (em andamento ou atendido)
+        são recusados no próprio UPDATE e nunca mudam de estado. O bloqueio fica em
+        `is_blocked` (além de `is_available=False`), para que a regeneração dos
+        horários não o desfaça.
+
+        Retorna as contagens: selecionados, alterados e recusados por agendamento.
+        """
+        queryset = queryset.filter(is_active=True).exclude(date__lt=localdate())
+        live = TimeSlot.objects.filter(appointment__status__in=TimeSlot.HELD_APPOINTMENT_STATUSES).values('id')
+        summary = list(
+            queryset.values('work_day_id', 'work_day__barber_id')
+            .annotate(matched=Count('id'), held=Count('id', filter=Q(id__in=live)))
+            .order_by()
+        )
+        updated = queryset.exclude(id__in=live).filter(is_blocked=not blocked).update(
+            is_blocked=blocked, is_available=not blocked
+        )
+
+        invalidate_public_cache(*{
+            key for row in summary
+            for key in (public_work_days_key(row['work_day__barber_id']), available_slots_key(row['work_day_id']))
+        })
+        return {
+            'matched': sum(row['matched'] for row in summary),
+            'updated': updated,
+            'refused': sum(row['held'] for row in summary),
+        }
+
+    @staticmethod
+    def next_available(city, service_name=None, after=None, limit=10):
+        """
+        Primeiros horários livres entre todos os barbeiros ativos da cidade, em ordem
+        de início, a partir de `after` (padrão: agora). Com `service_name`, apenas os
+        barbeiros que oferecem um serviço ativo com esse nome, anotando o mais barato.
+
+        Resolvido em uma única consulta que percorre o índice parcial (date, time) dos
+        horários livres e para ao encontrar `limit` linhas.
+        """
+        after = localtime(after) if after else localtime()
+        queryset = TimeSlot.upcoming().filter(
+            Q(date__gt=after.date()) | Q(date=after.date(), time__gte=after.time()),
+            barber__city=city,
+            barber__is_active=True,
+            barber__profile_type=User.Perfil.BARBER,
+        )
+        fields = ['id', 'date', 'time', 'barber_id', 'barber__username', 'barber__address', 'barber__avatar_thumbnail']
+        if service_name:
+            services = Services.objects.filter(
+                barber=OuterRef('barber_id'),
+                is_active=True,
+                name__iexact=service_name.strip()
+            ).order_by('price', 'id')
+            queryset = queryset.filter(Exists(services)).annotate(
+                service_id=Subquery(services.values('id')[:1]),
+                service_name=Subquery(services.values('name')[:1]),
+                service_price=Subquery(services.values('price')[:1], output_field=Services._meta.get_field('price')),
+            )
+            fields += ['service_id', 'service_name', 'service_price']
+        return list(queryset.order_by('date', 'time', 'id').values(*fields)[:limit])
@@ -1,3 +1,5 @@
+from django.db.models import Prefetch, Q
+from django.utils.timezone import localdate
 from rest_framework import serializers
 
 from users.serializers import UserSerializer
@@ -7,7 +9,7 @@ from .models import TimeSlot, WorkDay
 class TimeSlotSerializer(serializers.ModelSerializer):
     class Meta:
         model = TimeSlot
-        fields = ["id", "work_day", "time", "is_available"]
+        fields = ["id", "work_day", "date", "time", "is_available", "is_blocked"]
 
 
 class WorkDaySerializer(serializers.ModelSerializer):
@@ -24,13 +26,38 @@ class WorkDaySerializer(serializers.ModelSerializer):
             'lunch_start_time', 'lunch_end_time', 'slot_duration', 'free_time_count', 'busy_time_count', 'time_slots'
         ]
         extra_kwargs = {
-            'day_of_week': {'required': False} 
+            'day_of_week': {'required': False},
+            'slot_duration': {'min_value': WorkDay.MIN_SLOT_DURATION, 'max_value': WorkDay.MAX_SLOT_DURATION},
         }
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Carrega o barbeiro com seu consolidado de avaliações e, em uma segunda
+        consulta, os horários ativos de todos os dias de trabalho.
+        """
+        return queryset.select_related('barber__stats').prefetch_related(
+            Prefetch(
+                'time_slots',
+                queryset=TimeSlot.objects.filter(WorkDaySerializer.current_slots_q(), is_active=True),
+                to_attr='active_time_slots'
+            )
+        )
+
+    @staticmethod
+    def current_slots_q():
+        # Horários de hoje em diante; os antigos sem data seguem até serem retirados
+        return Q(date__isnull=True) | Q(date__gte=localdate())
+
+    def active_slots(self, obj):
+        """Horários ativos pré-carregados ou, se ausentes, buscados uma única vez"""
+        if not hasattr(obj, 'active_time_slots'):
+            obj.active_time_slots = list(obj.time_slots.filter(self.current_slots_q(), is_active=True))
+        return obj.active_time_slots
+
     def get_time_slots(self, obj):
         """Filtra slots ativos e serializa"""
-        active_slots = obj.time_slots.filter(is_active=True)
-        return TimeSlotSerializer(active_slots, many=True).data
+        return TimeSlotSerializer(self.active_slots(obj), many=True).data
 
     def validate(self, data):
         request = self.context.get('request')
@@ -60,6 +87,15 @@ class WorkDaySerializer(serializers.ModelSerializer):
                             'day_of_week': 'Você já possui esse dia de trabalho registrado.'
                         })
 
+        # Expediente resultante (campos enviados sobre os do dia existente)
+        schedule = [data.get(field, getattr(instance, field, None)) for field in WorkDay.SCHEDULE_FIELDS]
+        if schedule[-1] is None:
+            schedule[-1] = WorkDay._meta.get_field('slot_duration').default
+        if None not in schedule:
+            error = WorkDay.schedule_error(*schedule)
+            if error:
+                raise serializers.ValidationError(error)
+
         return data
     
     def get_day_of_week_display(self, obj):
@@ -75,8 +111,87 @@ class WorkDaySerializer(serializers.ModelSerializer):
         return DIAS_DA_SEMANA.get(obj.day_of_week, obj.day_of_week)
 
     def get_free_time_count(self, obj):
-        return obj.time_slots.filter(is_available=True, is_active=True).count()
+        return sum(1 for slot in self.active_slots(obj) if slot.is_available)
 
     def get_busy_time_count(self, obj):
-        return obj.time_slots.filter(is_available=False, is_active=True).count()
+        return sum(1 for slot in self.active_slots(obj) if not slot.is_available)
+
+
+class SlotBlockSerializer(serializers.Serializer):
+    """
+    Seleção dos horários a bloquear/desbloquear: uma lista de ids ou um intervalo
+    [start_time, end_time) de um dia de trabalho e/ou de uma data.
+    """
+    MAX_SLOT_IDS = 500
+
+    action = serializers.ChoiceField(choices=[('block', 'Bloquear'), ('unblock', 'Desbloquear')])
+    time_slot_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_SLOT_IDS
+    )
+    work_day_id = serializers.IntegerField(required=False, min_value=1)
+    date = serializers.DateField(required=False)
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+
+    def validate(self, data):
+        by_ids = 'time_slot_ids' in data
+        by_range = any(field in data for field in ('work_day_id', 'date', 'start_time', 'end_time'))
+        if by_ids == by_range:
+            raise serializers.ValidationError(
+                "Informe time_slot_ids ou um intervalo (work_day_id e/ou date, com start_time e end_time opcionais)."
+            )
+        if by_range and 'work_day_id' not in data and 'date' not in data:
+            raise serializers.ValidationError("O intervalo precisa de work_day_id ou date.")
+        if data.get('start_time') and data.get('end_time') and data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("O horário de término deve ser após o de início.")
+        return data
+
+    def filter_queryset(self, queryset):
+        """
+        Aplica a seleção validada ao queryset (já restrito ao barbeiro).
+        """
+        data = self.validated_data
+        if 'time_slot_ids' in data:
+            return queryset.filter(id__in=data['time_slot_ids'])
+        lookups = {
+            'work_day_id': data.get('work_day_id'),
+            'date': data.get('date'),
+            'time__gte': data.get('start_time'),
+            'time__lt': data.get('end_time'),
+        }
+        return queryset.filter(**{lookup: value for lookup, value in lookups.items() if value is not None})
+
+
+class WeeklyTemplateDaySerializer(serializers.Serializer):
+    day_of_week = serializers.ChoiceField(choices=WorkDay.Weekday.choices)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    lunch_start_time = serializers.TimeField()
+    lunch_end_time = serializers.TimeField()
+    slot_duration = serializers.IntegerField(
+        min_value=WorkDay.MIN_SLOT_DURATION, max_value=WorkDay.MAX_SLOT_DURATION, default=30
+    )
+
+    def validate(self, data):
+        error = WorkDay.schedule_error(*(data[field] for field in WorkDay.SCHEDULE_FIELDS))
+        if error:
+            raise serializers.ValidationError(error)
+        return data
+
+
+class WeeklyTemplateSerializer(serializers.Serializer):
+    """
+    Modelo semanal: até um registro por dia da semana, validados em conjunto.
+    """
+    days = WeeklyTemplateDaySerializer(many=True, allow_empty=False, max_length=len(WorkDay.WEEKDAY_ORDER))
 
+    def validate_days(self, days):
+        seen = set()
+        for day in days:
+            if day['day_of_week'] in seen:
+                raise serializers.ValidationError(f"O dia \"{day['day_of_week']}\" aparece mais de uma vez.")
+            seen.add(day['day_of_week'])
+        return days
@@ -1,3 +1,581 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.utils.timezone import localdate
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from appointments.tests import TEST_WEEKDAY, create_barber, create_client, create_service, create_work_day
+from appointments.booking import book_time_slot
+from appointments.models import Appointment
+from .management.commands.roll_slot_horizon import Command as RollSlotHorizon
+from .models import TimeSlot, WorkDay
+
+
+# Uma semana de horizonte: uma única data por dia de trabalho
+@override_settings(SLOT_HORIZON_WEEKS=1)
+class WorkDayPublicListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.barber = create_barber()
+        self.api = APIClient()
+
+    def get_public_list(self):
+        return self.api.get('/api/v1/schedule/public/', {'barber_id': self.barber.id})
+
+    def test_counts_come_from_active_slots(self):
+        work_day = create_work_day(self.barber)
+        work_day.time_slots.filter(time='08:00').update(is_available=False)
+
+        response = self.get_public_list()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['free_time_count'], 6)
+        self.assertEqual(response.data[0]['busy_time_count'], 1)
+        self.assertEqual(len(response.data[0]['time_slots']), 7)
+
+    def test_query_count_is_constant(self):
+        create_work_day(self.barber, WorkDay.Weekday.MONDAY)
+        with self.assertNumQueries(2):
+            self.get_public_list()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (WorkDay.Weekday.TUESDAY, WorkDay.Weekday.WEDNESDAY, WorkDay.Weekday.FRIDAY):
+                create_work_day(self.barber, day)
+        with self.assertNumQueries(2):
+            response = self.get_public_list()
+
+        self.assertEqual(len(response.data), 4)
+
+
+@override_settings(SLOT_HORIZON_WEEKS=1)
+class PublicCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.barber = create_barber()
+        self.work_day = create_work_day(self.barber)
+        self.api = APIClient()
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first = self.api.get('/api/v1/schedule/public/', {'barber_id': self.barber.id})
+
+        with self.assertNumQueries(0):
+            second = self.api.get('/api/v1/schedule/public/', {'barber_id': self.barber.id})
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_conditional_requests_return_not_modified(self):
+        first = self.api.get('/api/v1/services/public/', {'barber_id': self.barber.id})
+
+        by_etag = self.api.get(
+            '/api/v1/services/public/', {'barber_id': self.barber.id}, HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        by_date = self.api.get(
+            '/api/v1/services/public/', {'barber_id': self.barber.id}, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_booking_invalidates_work_day_and_slot_keys(self):
+        client = create_client()
+        service = create_service(self.barber)
+        self.api.force_authenticate(client)
+        slots_url = f'/api/v1/schedule/available-time-slot/{self.work_day.id}/'
+        before = self.api.get(slots_url)
+        work_days = self.api.get('/api/v1/schedule/public/', {'barber_id': self.barber.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post('/api/v1/appointments/create/', {
+                'barber_id': self.barber.id,
+                'client_id': client.id,
+                'service_id': service.id,
+                'time_slot_id': before.data[0]['id'],
+            }, format='json')
+
+        after = self.api.get(slots_url)
+        self.assertEqual(len(after.data), len(before.data) - 1)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        work_days_after = self.api.get('/api/v1/schedule/public/', {'barber_id': self.barber.id})
+        self.assertEqual(work_days_after.data[0]['busy_time_count'], work_days.data[0]['busy_time_count'] + 1)
+
+    def test_service_changes_invalidate_public_services(self):
+        self.api.get('/api/v1/services/public/', {'barber_id': self.barber.id})
+        self.api.force_authenticate(self.barber)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post('/api/v1/services/', {'name': 'Barba', 'description': 'Barba', 'price': '20.00'})
+
+        response = self.api.get('/api/v1/services/public/', {'barber_id': self.barber.id})
+        self.assertEqual([service['name'] for service in response.data], ['Barba'])
+
+
+@override_settings(SLOT_HORIZON_WEEKS=1)
+class GenerateTimeSlotsTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.work_day = create_work_day(self.barber)
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def active_slots(self):
+        return dict(TimeSlot.objects.filter(work_day=self.work_day, is_active=True).values_list('time', 'id'))
+
+    def put(self, **changes):
+        data = {
+            'start_time': '08:00',
+            'end_time': '12:00',
+            'lunch_start_time': '10:00',
+            'lunch_end_time': '10:30',
+            'slot_duration': 30,
+            **changes
+        }
+        return self.api.put(f'/api/v1/schedule/{self.work_day.id}/', data, format='json')
+
+    def test_unchanged_schedule_skips_regeneration(self):
+        before = self.active_slots()
+
+        with self.assertNumQueries(1):
+            self.work_day.save()
+        response = self.put()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.active_slots(), before)
+        self.assertEqual(TimeSlot.objects.count(), len(before))
+
+    def test_only_changed_slots_are_created_or_deactivated(self):
+        before = self.active_slots()
+
+        self.put(start_time='08:30', end_time='12:30')
+
+        after = self.active_slots()
+        kept = set(before) & set(after)
+        self.assertEqual({before[slot_time] for slot_time in kept}, {after[slot_time] for slot_time in kept})
+        self.assertNotIn(time(8, 0), after)
+        self.assertIn(time(12, 0), after)
+        self.assertEqual(TimeSlot.objects.count(), len(before) + 1)
+
+    def test_slots_with_completed_appointments_are_not_reopened(self):
+        completed = TimeSlot.objects.get(work_day=self.work_day, time=time(8, 0))
+        appointment = book_time_slot(
+            client=create_client(), barber=self.barber, service=create_service(self.barber), time_slot=completed
+        )
+        Appointment.objects.filter(pk=appointment.pk).update(status=Appointment.Status.COMPLETED)
+
+        self.put(end_time='12:30')
+
+        completed.refresh_from_db()
+        self.assertTrue(completed.is_active)
+        self.assertFalse(completed.is_available)
+
+    def test_weekday_change_moves_slots_to_the_new_weekday(self):
+        new_day = next(day for day in WorkDay.WEEKDAY_ORDER if day != TEST_WEEKDAY)
+        response = self.put(day_of_week=new_day)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dates = TimeSlot.objects.filter(work_day=self.work_day, is_active=True).values_list('date', flat=True)
+        self.assertEqual({slot_date.weekday() for slot_date in dates}, {WorkDay.WEEKDAY_ORDER[new_day] - 1})
+        self.assertEqual(len(dates), 7)
+
+    def test_rejects_schedules_crossing_midnight(self):
+        for changes in (
+            {'slot_duration': 24 * 60},
+            {'slot_duration': 0},
+            {'start_time': '20:00', 'lunch_start_time': '22:00', 'lunch_end_time': '22:00', 'end_time': '23:50',
+             'slot_duration': 45},
+        ):
+            self.assertEqual(self.put(**changes).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.put(end_time='23:30', slot_duration=30)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(time(23, 0), self.active_slots())
+
+    def test_slots_with_live_appointments_are_kept(self):
+        booked = TimeSlot.objects.get(work_day=self.work_day, time=time(8, 0))
+        booked.is_available = False
+        booked.save()
+        Appointment.objects.create(
+            barber=self.barber,
+            client=create_client(),
+            service=create_service(self.barber),
+            time_slot=booked,
+        )
+
+        self.put(start_time='09:00')
+
+        booked.refresh_from_db()
+        self.assertTrue(booked.is_active)
+        self.assertFalse(booked.is_available)
+        self.assertFalse(TimeSlot.objects.filter(work_day=self.work_day, time=time(8, 30), is_active=True).exists())
+
+
+class PurgeInactiveSlotsCommandTest(TestCase):
+    def test_purges_only_unreferenced_inactive_slots(self):
+        barber = create_barber()
+        work_day = create_work_day(barber)
+        referenced = TimeSlot.objects.filter(work_day=work_day).first()
+        Appointment.objects.create(
+            barber=barber,
+            client=create_client(),
+            service=create_service(barber),
+            time_slot=referenced,
+            status=Appointment.Status.COMPLETED,
+        )
+        TimeSlot.objects.filter(work_day=work_day).update(is_active=False)
+        active = TimeSlot.objects.create(work_day=work_day, time=time(13, 0))
+
+        call_command('purge_inactive_slots', batch_size=2, sleep=0, stdout=StringIO())
+
+        self.assertEqual(set(TimeSlot.objects.values_list('id', flat=True)), {referenced.id, active.id})
+
+    def test_dry_run_and_resume_keep_rows(self):
+        work_day = create_work_day(create_barber())
+        slot_ids = sorted(TimeSlot.objects.filter(work_day=work_day).values_list('id', flat=True))
+        TimeSlot.objects.update(is_active=False)
+
+        call_command('purge_inactive_slots', dry_run=True, sleep=0, stdout=StringIO())
+        self.assertEqual(TimeSlot.objects.count(), len(slot_ids))
+
+        call_command('purge_inactive_slots', after_id=slot_ids[2], sleep=0, stdout=StringIO())
+        self.assertEqual(sorted(TimeSlot.objects.values_list('id', flat=True)), slot_ids[:3])
+
+
+class DatedSlotCalendarTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.barber = create_barber()
+        self.work_day = create_work_day(self.barber)
+        self.api = APIClient()
+
+    def test_slots_are_materialized_per_date_over_the_horizon(self):
+        dates = sorted(set(TimeSlot.objects.filter(work_day=self.work_day).values_list('date', flat=True)))
+
+        self.assertEqual(len(dates), settings.SLOT_HORIZON_WEEKS)
+        self.assertTrue(all(slot_date.weekday() == WorkDay.WEEKDAY_ORDER[TEST_WEEKDAY] - 1 for slot_date in dates))
+        self.assertGreaterEqual(dates[0], localdate())
+        self.assertFalse(TimeSlot.objects.exclude(barber=self.barber).exists())
+
+    def test_booking_one_date_keeps_other_weeks_available(self):
+        first, *others = TimeSlot.objects.filter(work_day=self.work_day, time=time(8, 0)).order_by('date')
+        Appointment.objects.create(
+            barber=self.barber,
+            client=create_client(),
+            service=create_service(self.barber),
+            time_slot=first,
+        )
+        TimeSlot.objects.filter(pk=first.pk).update(is_available=False)
+
+        available = TimeSlot.upcoming(TimeSlot.objects.filter(work_day=self.work_day, time=time(8, 0)))
+
+        self.assertEqual(set(available), set(others))
+
+    def test_availability_is_a_date_range_query(self):
+        dates = sorted(set(TimeSlot.objects.filter(work_day=self.work_day).values_list('date', flat=True)))
+
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/v1/schedule/availability/', {
+                'barber_id': self.barber.id,
+                'start_date': dates[0].isoformat(),
+                'end_date': dates[0].isoformat(),
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual({slot['date'] for slot in response.data}, {dates[0].isoformat()})
+
+    def test_availability_rejects_invalid_dates(self):
+        response = self.api.get('/api/v1/schedule/availability/', {'barber_id': self.barber.id, 'start_date': 'amanhã'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RollSlotHorizonCommandTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        with override_settings(SLOT_HORIZON_WEEKS=1):
+            self.work_day = create_work_day(self.barber)
+
+    def test_extends_horizon_idempotently(self):
+        call_command('roll_slot_horizon', weeks=3, stdout=StringIO())
+        count = TimeSlot.objects.filter(is_active=True).count()
+        call_command('roll_slot_horizon', weeks=3, stdout=StringIO())
+
+        self.assertEqual(count, 3 * 7)
+        self.assertEqual(TimeSlot.objects.filter(is_active=True).count(), count)
+
+    def test_flush_counts_only_inserted_slots(self):
+        dates = self.work_day.slot_dates(localdate(), localdate() + timedelta(weeks=2))
+        # A primeira data já existe: só a segunda semana é criada
+        self.assertEqual(RollSlotHorizon.flush(self.work_day.build_slots(dates)), 7)
+        self.assertEqual(RollSlotHorizon.flush(self.work_day.build_slots(dates)), 0)
+
+    def test_retires_past_dates_and_free_legacy_slots(self):
+        past = TimeSlot.objects.create(
+            work_day=self.work_day, barber=self.barber, date=localdate() - timedelta(days=7), time=time(8, 0)
+        )
+        legacy_free = TimeSlot.objects.create(work_day=self.work_day, barber=self.barber, time=time(8, 0))
+        legacy_booked = TimeSlot.objects.create(
+            work_day=self.work_day, barber=self.barber, time=time(8, 30), is_available=False
+        )
+        Appointment.objects.create(
+            barber=self.barber,
+            client=create_client(),
+            service=create_service(self.barber),
+            time_slot=legacy_booked,
+        )
+
+        call_command('roll_slot_horizon', weeks=1, batch_size=1, stdout=StringIO())
+
+        active = set(TimeSlot.objects.filter(is_active=True).values_list('id', flat=True))
+        self.assertNotIn(past.id, active)
+        self.assertNotIn(legacy_free.id, active)
+        self.assertIn(legacy_booked.id, active)
+
+
+@override_settings(SLOT_HORIZON_WEEKS=2)
+class NextAvailableSlotsTest(TestCase):
+    def setUp(self):
+        self.monday = create_barber('segunda@teste.com', username='segunda')
+        self.tuesday = create_barber('terca@teste.com', username='terca')
+        beard_only = create_barber('barba@teste.com', username='barba')
+        elsewhere = create_barber('fora@teste.com', username='fora', city=None)
+        create_service(self.monday, price='40.00')
+        create_service(self.monday, price='30.00', name='corte')
+        create_service(self.tuesday)
+        create_service(beard_only, name='Barba')
+        create_service(elsewhere)
+        create_work_day(self.monday)
+        create_work_day(self.tuesday, WorkDay.Weekday.TUESDAY)
+        create_work_day(beard_only)
+        create_work_day(elsewhere)
+
+        self.api = APIClient()
+        self.api.force_authenticate(create_client())
+
+    def test_returns_earliest_slots_across_barbers_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/v1/schedule/next-available/', {'service': 'Corte', 'limit': 20})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 20)
+        starts = [(slot['date'], slot['time']) for slot in response.data]
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual({slot['barber']['id'] for slot in response.data}, {self.monday.id, self.tuesday.id})
+        cheapest = next(slot['service'] for slot in response.data if slot['barber']['id'] == self.monday.id)
+        self.assertEqual((cheapest['name'], cheapest['price']), ('corte', '30.00'))
+
+    def test_after_skips_earlier_slots(self):
+        first = TimeSlot.upcoming(TimeSlot.objects.filter(barber=self.monday)).first()
+
+        response = self.api.get('/api/v1/schedule/next-available/', {
+            'service': 'corte',
+            'after': f'{first.date.isoformat()}T09:00',
+            'limit': 1,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['barber']['id'], self.monday.id)
+        self.assertEqual((response.data[0]['date'], response.data[0]['time']), (first.date, time(9, 0)))
+
+    def test_without_service_lists_every_barber_in_the_city(self):
+        response = self.api.get('/api/v1/schedule/next-available/', {'limit': 50})
+
+        self.assertEqual(len({slot['barber']['id'] for slot in response.data}), 3)
+        self.assertIsNone(response.data[0]['service'])
+
+    def test_rejects_invalid_parameters(self):
+        for params in ({'limit': 0}, {'limit': 51}, {'after': 'amanhã'}):
+            response = self.api.get('/api/v1/schedule/next-available/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SLOT_HORIZON_WEEKS=1)
+class SlotBlockTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.work_day = create_work_day(self.barber)
+        self.booked = TimeSlot.objects.get(work_day=self.work_day, time=time(8, 30))
+        book_time_slot(
+            client=create_client(), barber=self.barber, service=create_service(self.barber), time_slot=self.booked
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def post(self, payload):
+        return self.api.post('/api/v1/schedule/slots/block/', payload, format='json')
+
+    def test_block_range_in_one_update_and_refuse_booked_slots(self):
+        payload = {'action': 'block', 'work_day_id': self.work_day.id, 'start_time': '08:00', 'end_time': '09:30'}
+        with self.assertNumQueries(2):
+            response = self.post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['matched'], response.data['updated'], response.data['refused']), (3, 2, 1))
+        available = set(TimeSlot.objects.filter(work_day=self.work_day, is_available=True).values_list('time', flat=True))
+        self.assertEqual(available, {time(9, 30), time(10, 30), time(11, 0), time(11, 30)})
+
+        response = self.post({**payload, 'action': 'unblock'})
+
+        self.assertEqual((response.data['updated'], response.data['refused']), (2, 1))
+        self.booked.refresh_from_db()
+        self.assertFalse(self.booked.is_available)
+
+    def test_block_survives_regeneration(self):
+        self.post({'action': 'block', 'work_day_id': self.work_day.id, 'start_time': '11:00', 'end_time': '12:00'})
+
+        self.api.put(f'/api/v1/schedule/{self.work_day.id}/', {
+            'start_time': '08:00', 'end_time': '12:00', 'lunch_start_time': '09:30', 'lunch_end_time': '10:00',
+            'slot_duration': 30,
+        }, format='json')
+        self.api.post('/api/v1/schedule/weekly-template/', {'days': [{
+            'day_of_week': TEST_WEEKDAY, 'start_time': '08:00', 'end_time': '12:00', 'lunch_start_time': '10:00',
+            'lunch_end_time': '10:30', 'slot_duration': 30,
+        }]}, format='json')
+
+        blocked = TimeSlot.objects.filter(work_day=self.work_day, is_active=True, time__gte=time(11, 0))
+        self.assertEqual(blocked.count(), 2)
+        self.assertFalse(blocked.filter(Q(is_available=True) | Q(is_blocked=False)).exists())
+
+        response = self.post({'action': 'unblock', 'work_day_id': self.work_day.id, 'start_time': '11:00'})
+
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(blocked.filter(is_available=True, is_blocked=False).count(), 2)
+
+    def test_unblock_keeps_completed_slots_unavailable(self):
+        Appointment.objects.filter(time_slot=self.booked).update(status=Appointment.Status.COMPLETED)
+        payload = {'action': 'block', 'time_slot_ids': [self.booked.id]}
+
+        self.post(payload)
+        response = self.post({**payload, 'action': 'unblock'})
+
+        self.assertEqual((response.data['updated'], response.data['refused']), (0, 1))
+        self.booked.refresh_from_db()
+        self.assertFalse(self.booked.is_available)
+
+    def test_delete_refuses_slot_with_live_appointment(self):
+        response = self.api.delete(f'/api/v1/schedule/delete-time-slot/{self.booked.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.booked.refresh_from_db()
+        self.assertTrue(self.booked.is_active)
+
+        free = TimeSlot.objects.get(work_day=self.work_day, time=time(9, 0))
+        response = self.api.delete(f'/api/v1/schedule/delete-time-slot/{free.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        free.refresh_from_db()
+        self.assertFalse(free.is_active)
+
+    def test_only_own_slots_are_affected(self):
+        other = create_barber('outro@teste.com', username='outro')
+        self.api.force_authenticate(other)
+        slot_ids = list(TimeSlot.objects.filter(work_day=self.work_day).values_list('id', flat=True))
+
+        response = self.post({'action': 'block', 'time_slot_ids': slot_ids})
+
+        self.assertEqual(response.data['matched'], 0)
+        self.assertEqual(TimeSlot.objects.filter(work_day=self.work_day, is_available=True).count(), 6)
+        response = self.api.delete(f'/api/v1/schedule/delete-time-slot/{slot_ids[0]}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rejects_ambiguous_selection(self):
+        for payload in (
+            {'action': 'block', 'time_slot_ids': [self.booked.id], 'work_day_id': self.work_day.id},
+            {'action': 'block', 'start_time': '08:00'},
+            {'action': 'block', 'work_day_id': self.work_day.id, 'start_time': '10:00', 'end_time': '09:00'},
+        ):
+            self.assertEqual(self.post(payload).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SLOT_HORIZON_WEEKS=1)
+class WeeklyTemplateTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def day(self, day_of_week, **changes):
+        return {
+            'day_of_week': day_of_week,
+            'start_time': '08:00',
+            'end_time': '12:00',
+            'lunch_start_time': '10:00',
+            'lunch_end_time': '10:30',
+            'slot_duration': 30,
+            **changes
+        }
+
+    def post(self, days):
+        return self.api.post('/api/v1/schedule/weekly-template/', {'days': days}, format='json')
+
+    def test_creates_the_whole_week_with_one_slot_insert(self):
+        days = [self.day(day_of_week) for day_of_week in WorkDay.WEEKDAY_ORDER]
+
+        # Leitura dos dias, um INSERT dos dias e um dos horários (mais o savepoint)
+        with self.assertNumQueries(5):
+            response = self.post(days)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['result'] for item in response.data['work_days']], ['created'] * 7)
+        self.assertEqual(response.data['slots_created'], 7 * 7)
+        work_days = WorkDay.objects.filter(barber=self.barber, is_active=True)
+        self.assertEqual(
+            sorted(work_days.values_list('weekday_order', flat=True)), list(range(1, 8))
+        )
+        for work_day in work_days:
+            self.assertEqual(work_day.time_slots.filter(is_active=True, date__gte=localdate()).count(), 7)
+
+    def test_updates_existing_days_and_keeps_booked_slots(self):
+        second_day, third_day = [day for day in WorkDay.WEEKDAY_ORDER if day != TEST_WEEKDAY][:2]
+        work_day = create_work_day(self.barber)
+        booked = TimeSlot.objects.get(work_day=work_day, time=time(8, 0))
+        book_time_slot(client=create_client(), barber=self.barber, service=create_service(self.barber), time_slot=booked)
+        unchanged = create_work_day(self.barber, day_of_week=second_day)
+
+        response = self.post([
+            self.day(TEST_WEEKDAY, start_time='09:00'),
+            self.day(second_day),
+            self.day(third_day),
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {item['day_of_week']: (item['id'], item['result']) for item in response.data['work_days']}
+        self.assertEqual(results[TEST_WEEKDAY], (work_day.id, 'updated'))
+        self.assertEqual(results[second_day], (unchanged.id, 'unchanged'))
+        self.assertEqual(results[third_day][1], 'created')
+        # 08:30 sai do expediente; 08:00 continua por causa do agendamento
+        self.assertEqual(response.data['slots_deactivated'], 1)
+        self.assertEqual(response.data['slots_created'], 7)
+        booked.refresh_from_db()
+        self.assertTrue(booked.is_active)
+        self.assertFalse(TimeSlot.objects.filter(work_day=work_day, time=time(8, 30), is_active=True).exists())
+        work_day.refresh_from_db()
+        self.assertEqual(work_day.start_time, time(9, 0))
+
+    def test_invalid_template_writes_nothing(self):
+        for days in (
+            [self.day('monday'), self.day('monday', start_time='09:00')],
+            [self.day('monday'), self.day('tuesday', lunch_start_time='13:00')],
+            [self.day('funday')],
+            [self.day('monday', slot_duration=24 * 60)],
+            [self.day('monday', start_time='20:00', lunch_start_time='22:00', lunch_end_time='22:00', end_time='23:50',
+                      slot_duration=45)],
+            [],
+        ):
+            self.assertEqual(self.post(days).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(WorkDay.objects.filter(barber=self.barber).exists())
+
+    def test_slot_steps_stop_at_midnight(self):
+        work_day = WorkDay(
+            start_time=time(23, 0), lunch_start_time=time(23, 30), lunch_end_time=time(23, 30), end_time=time(23, 59),
+            slot_duration=45
+        )
+
+        self.assertEqual(work_day.build_slot_times(), [time(23, 0), time(23, 30)])
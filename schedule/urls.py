@@ -1,12 +1,16 @@
 from django.urls import path
-from .views import AvailableTimeSlotsView, DeleteSlotsView, DeleteTimeSlotView, GenerateSlotsView, WorkDayListCreateView, WorkDayDetailAPIView, WorkDayPublicListView
+from .views import AvailableTimeSlotsView, BarberAvailabilityView, DeleteSlotsView, DeleteTimeSlotView, GenerateSlotsView, NextAvailableSlotsView, SlotBlockView, WeeklyTemplateView, WorkDayListCreateView, WorkDayDetailAPIView, WorkDayPublicListView
 
 urlpatterns = [
     path('', WorkDayListCreateView.as_view(), name='workday-list-create'),
+    path('weekly-template/', WeeklyTemplateView.as_view(), name='workday-weekly-template'),
     path('public/', WorkDayPublicListView.as_view(), name='workday-public-list'),
     path('<int:pk>/', WorkDayDetailAPIView.as_view(), name='workday-detail'),
     path('generate-slots/<int:work_day_id>/', GenerateSlotsView.as_view(), name='generate-slots'),
     path('delete-slots/<int:work_day_id>/', DeleteSlotsView.as_view(), name='delete-slots'),
     path('available-time-slot/<int:work_day_id>/', AvailableTimeSlotsView.as_view(), name='available_time_slots'),
+    path('availability/', BarberAvailabilityView.as_view(), name='barber_availability'),
+    path('next-available/', NextAvailableSlotsView.as_view(), name='next_available_slots'),
+    path('slots/block/', SlotBlockView.as_view(), name='slot_block'),
     path('delete-time-slot/<int:time_slot_id>/', DeleteTimeSlotView.as_view(), name='delete_time_slot'),
 ]
\ No newline at end of file
@@ -1,10 +1,15 @@
+from datetime import date, timedelta
+
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, localdate, make_aware
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
 from core.permissions import IsBarber
+from core.utils.cache import available_slots_key, cached_public_response, public_work_days_key
 from schedule.models import TimeSlot, WorkDay
-from schedule.serializers import TimeSlotSerializer, WorkDaySerializer
+from schedule.serializers import SlotBlockSerializer, TimeSlotSerializer, WeeklyTemplateSerializer, WorkDaySerializer
 from rest_framework.exceptions import NotFound
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -24,7 +29,9 @@ class WorkDayListCreateView(APIView):
         }
     )
     def get(self, request):
-        work_day = WorkDay.objects.filter(barber=request.user, is_active=True)
+        work_day = WorkDaySerializer.setup_eager_loading(
+            WorkDay.objects.filter(barber=request.user, is_active=True)
+        )
         serializer = WorkDaySerializer(work_day, many=True)
         return Response(serializer.data)
 
@@ -44,6 +51,53 @@ class WorkDayListCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class WeeklyTemplateView(APIView):
+    """
+    Cria ou atualiza todos os dias de trabalho do barbeiro em uma única chamada.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsBarber]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Aplica um modelo semanal: cada item de `days` cria o dia de trabalho ou atualiza o dia ativo "
+            "existente. Os dias são validados em conjunto e gravados, com seus horários, em uma transação; "
+            "dias fora do modelo não são alterados."
+        ),
+        request_body=WeeklyTemplateSerializer,
+        responses={
+            200: openapi.Response(
+                description="Resumo da operação.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'work_days': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'day_of_week': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'result': openapi.Schema(
+                                        type=openapi.TYPE_STRING, enum=['created', 'updated', 'unchanged']
+                                    ),
+                                }
+                            )
+                        ),
+                        'slots_created': openapi.Schema(type=openapi.TYPE_INTEGER, description="Horários criados."),
+                        'slots_deactivated': openapi.Schema(type=openapi.TYPE_INTEGER, description="Horários desativados."),
+                    }
+                )
+            ),
+            400: "Erro de validação",
+        }
+    )
+    def post(self, request):
+        serializer = WeeklyTemplateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(WorkDay.apply_weekly_template(request.user, serializer.validated_data['days']))
+
+
 class WorkDayDetailAPIView(APIView):
     """
     Recupera, atualiza ou deleta um WorkDay específico.
@@ -119,9 +173,16 @@ class WorkDayPublicListView(APIView):
     )
     def get(self, request):
         barber_id = request.query_params.get('barber_id')
-        work_day = WorkDay.objects.filter(barber_id=barber_id, is_active=True)
-        serializer = WorkDaySerializer(work_day, many=True)
-        return Response(serializer.data)
+
+        def list_work_days():
+            work_day = WorkDaySerializer.setup_eager_loading(
+                WorkDay.objects.filter(barber_id=barber_id, is_active=True)
+            )
+            return WorkDaySerializer(work_day, many=True).data
+
+        if not str(barber_id).isdigit():
+            return Response(list_work_days())
+        return cached_public_response(request, public_work_days_key(int(barber_id)), list_work_days)
 
 
 class GenerateSlotsView(APIView):
@@ -196,6 +257,7 @@ class DeleteSlotsView(APIView):
             is_active=False, 
             is_available=False  
         )
+        work_day.clear_public_cache()
 
         return Response(
             {"message": "Todos os horários foram deletados com sucesso."},
@@ -205,7 +267,7 @@ class DeleteSlotsView(APIView):
 
 class AvailableTimeSlotsView(APIView):
     """
-    Retorna os horários disponíveis para um determinado dia de trabalho (`WorkDay`).
+    Retorna os horários disponíveis, de hoje em diante, para um determinado dia de trabalho (`WorkDay`).
     """
 
     @swagger_auto_schema(
@@ -228,13 +290,164 @@ class AvailableTimeSlotsView(APIView):
         }
     )
     def get(self, request, work_day_id):
-        try:
+        def list_available_slots():
             work_day = WorkDay.objects.get(id=work_day_id, is_active=True)
+            available_slots = TimeSlot.upcoming(TimeSlot.objects.filter(work_day=work_day))
+            return TimeSlotSerializer(available_slots, many=True).data
+
+        try:
+            return cached_public_response(request, available_slots_key(work_day_id), list_available_slots)
         except WorkDay.DoesNotExist:
             return Response({"error": "WorkDay não encontrado"}, status=404)
-        available_slots = TimeSlot.objects.filter(work_day=work_day, is_available=True, is_active=True)
-        serializer = TimeSlotSerializer(available_slots, many=True)
-        return Response(serializer.data)
+
+
+class BarberAvailabilityView(APIView):
+    """
+    Retorna os horários livres de um barbeiro em um intervalo de datas.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Retorna os horários livres de um barbeiro entre duas datas (padrão: próximos 7 dias).",
+        manual_parameters=[
+            openapi.Parameter('barber_id', openapi.IN_QUERY, description="ID do barbeiro", type=openapi.TYPE_INTEGER, required=True),
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="Data inicial (AAAA-MM-DD)", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('end_date', openapi.IN_QUERY, description="Data final, inclusiva (AAAA-MM-DD)", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        ],
+        responses={
+            200: TimeSlotSerializer(many=True),
+            400: "Parâmetros inválidos",
+        }
+    )
+    def get(self, request):
+        barber_id = request.query_params.get('barber_id')
+        if not str(barber_id).isdigit():
+            return Response({"error": "Informe o barber_id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start_date = date.fromisoformat(request.query_params.get('start_date') or localdate().isoformat())
+            end_date = date.fromisoformat(
+                request.query_params.get('end_date') or (start_date + timedelta(days=6)).isoformat()
+            )
+        except ValueError:
+            return Response({"error": "Datas inválidas. Use o formato AAAA-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date:
+            return Response({"error": "end_date deve ser posterior a start_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Varredura por faixa no índice (barber, date, time) dos horários livres
+        slots = TimeSlot.upcoming(TimeSlot.objects.filter(
+            barber_id=barber_id,
+            date__range=(start_date, end_date)
+        ))
+        return Response(TimeSlotSerializer(slots, many=True).data)
+
+
+class NextAvailableSlotsView(APIView):
+    """
+    Retorna os primeiros horários livres entre todos os barbeiros da cidade do cliente.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_LIMIT = 50
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Retorna os primeiros horários livres na cidade do usuário autenticado, em ordem de início, "
+            "opcionalmente apenas dos barbeiros que oferecem o serviço informado e a partir de uma data/hora."
+        ),
+        manual_parameters=[
+            openapi.Parameter('service', openapi.IN_QUERY, description="Nome do serviço (ex.: Corte)", type=openapi.TYPE_STRING),
+            openapi.Parameter('after', openapi.IN_QUERY, description="Data/hora inicial (AAAA-MM-DDTHH:MM, padrão: agora)", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Quantidade de horários (padrão 10, máximo 50)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: "Lista de horários com barbeiro e serviço",
+            400: "Parâmetros inválidos",
+            401: "Não autorizado",
+        }
+    )
+    def get(self, request):
+        limit = request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= self.MAX_LIMIT:
+            return Response({"error": f"limit deve estar entre 1 e {self.MAX_LIMIT}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        after = request.query_params.get('after')
+        if after:
+            try:
+                after = parse_datetime(after)
+            except ValueError:
+                after = None
+            if after is None:
+                return Response({"error": "after inválido. Use o formato AAAA-MM-DDTHH:MM."}, status=status.HTTP_400_BAD_REQUEST)
+            if is_naive(after):
+                after = make_aware(after)
+
+        slots = TimeSlot.next_available(
+            request.user.city,
+            service_name=request.query_params.get('service'),
+            after=after,
+            limit=int(limit)
+        )
+        return Response([self.represent(slot) for slot in slots])
+
+    @staticmethod
+    def represent(slot):
+        item = {
+            'id': slot['id'],
+            'date': slot['date'],
+            'time': slot['time'],
+            'barber': {
+                'id': slot['barber_id'],
+                'username': slot['barber__username'],
+                'address': slot['barber__address'],
+                'avatar_thumbnail': slot['barber__avatar_thumbnail'],
+            },
+            'service': None,
+        }
+        if 'service_id' in slot:
+            item['service'] = {
+                'id': slot['service_id'],
+                'name': slot['service_name'],
+                'price': f"{slot['service_price']:.2f}",
+            }
+        return item
+
+
+class SlotBlockView(APIView):
+    """
+    Bloqueia ou desbloqueia vários horários do barbeiro autenticado de uma vez.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsBarber]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Bloqueia (action=block) ou desbloqueia (action=unblock) os horários informados por `time_slot_ids` "
+            "ou por intervalo: `work_day_id` e/ou `date`, entre `start_time` (inclusivo) e `end_time` (exclusivo). "
+            "Apenas horários do barbeiro autenticado são afetados; horários com agendamento não cancelado são recusados."
+        ),
+        request_body=SlotBlockSerializer,
+        responses={
+            200: openapi.Response(
+                description="Contagens da operação.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'matched': openapi.Schema(type=openapi.TYPE_INTEGER, description="Horários selecionados."),
+                        'updated': openapi.Schema(type=openapi.TYPE_INTEGER, description="Horários alterados."),
+                        'refused': openapi.Schema(type=openapi.TYPE_INTEGER, description="Horários com agendamento não cancelado."),
+                    }
+                )
+            ),
+            400: "Parâmetros inválidos",
+        }
+    )
+    def post(self, request):
+        serializer = SlotBlockSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        slots = serializer.filter_queryset(TimeSlot.objects.filter(barber=request.user))
+        result = TimeSlot.set_blocked(slots, blocked=serializer.validated_data['action'] == 'block')
+        return Response({'action': serializer.validated_data['action'], **result})
 
 
 class DeleteTimeSlotView(APIView):
@@ -259,14 +472,23 @@ class DeleteTimeSlotView(APIView):
                     }
                 )
             ),
+            409: openapi.Response(description="Horário com agendamento em andamento."),
         }
     )
     def delete(self, request, time_slot_id):
         try:
-            time_slot = TimeSlot.objects.get(id=time_slot_id)
-            time_slot.is_available = False
-            time_slot.is_active = False
-            time_slot.save()
-            return Response({"message": "Horário excluído com sucesso"}, status=status.HTTP_204_NO_CONTENT)
+            time_slot = TimeSlot.objects.select_related('work_day').get(id=time_slot_id, barber=request.user)
         except TimeSlot.DoesNotExist:
             return Response({"error": "Horário não encontrado"}, status=status.HTTP_404_NOT_FOUND)
+
+        # O UPDATE recusa o horário se houver agendamento em andamento, inclusive um criado agora
+        live = TimeSlot.objects.filter(appointment__status__in=TimeSlot.LIVE_APPOINTMENT_STATUSES).values('id')
+        deleted = TimeSlot.objects.filter(pk=time_slot.pk).exclude(id__in=live).update(
+            is_available=False, is_active=False
+        )
+        if not deleted:
+            return Response(
+                {"error": "O horário tem um agendamento em andamento."}, status=status.HTTP_409_CONFLICT
+            )
+        time_slot.work_day.clear_public_cache()
+        return Response({"message": "Horário excluído com sucesso"}, status=status.HTTP_204_NO_CONTENT)
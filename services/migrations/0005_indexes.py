@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_services_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['barber', 'is_active'], name='services_barber_active_idx'),
+        ),
+    ]
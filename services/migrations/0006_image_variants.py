@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='services',
+            name='image_card',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Imagem (card)'),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='image_thumbnail',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Imagem (miniatura)'),
+        ),
+    ]
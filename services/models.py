@@ -12,6 +12,13 @@ class Services(models.Model):
 
     created_by = models.DateTimeField(auto_now_add=True, null=True)
     image = models.CharField(max_length=255, blank=True, null=True, verbose_name="Imagens")
+    image_thumbnail = models.CharField(max_length=255, blank=True, null=True, verbose_name="Imagem (miniatura)")
+    image_card = models.CharField(max_length=255, blank=True, null=True, verbose_name="Imagem (card)")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['barber', 'is_active'], name='services_barber_active_idx'),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -16,9 +16,18 @@ class ServicoSerializer(serializers.ModelSerializer):
             'description',
             'price',
             'image',
+            'image_thumbnail',
+            'image_card',
             'barber',
         ]
-        read_only_fields = ['barber', 'created_by']
+        read_only_fields = ['barber', 'created_by', 'image_thumbnail', 'image_card']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Carrega o barbeiro e seu consolidado de avaliações na mesma consulta.
+        """
+        return queryset.select_related('barber__stats')
 
     def validate_price(self, value):
         if value <= 0:
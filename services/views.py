@@ -3,7 +3,9 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 
 from core.permissions import IsBarber
-from core.utils.upload_images_firebase import upload_services_to_supabase
+from core.utils.cache import cached_public_response, invalidate_public_cache, public_services_key
+from core.utils.images import image_upload_error
+from uploads.models import PendingUpload
 from .models import Services
 from .serializers import ServicoSerializer
 from rest_framework.exceptions import NotFound
@@ -12,6 +14,17 @@ from drf_yasg import openapi
 from rest_framework.parsers import MultiPartParser, FormParser
 
 
+def with_pending_image(request, servico, data):
+    """
+    Enfileira a imagem enviada em `service_img` e inclui o upload pendente na resposta.
+    """
+    image_file = request.FILES.get('service_img')
+    if not image_file:
+        return data
+    upload = PendingUpload.enqueue(PendingUpload.Kind.SERVICE_IMAGE, servico.id, image_file)
+    return {**data, 'image_upload': upload.as_pending_state()}
+
+
 class ServicoListCreateView(APIView):
     """
     Lista todos os Serviços de um barbeiro ou cria um novo.
@@ -40,7 +53,9 @@ class ServicoListCreateView(APIView):
         }
     )
     def get(self, request):
-        servicos = Services.objects.filter(barber=request.user, is_active=True)
+        servicos = ServicoSerializer.setup_eager_loading(
+            Services.objects.filter(barber=request.user, is_active=True)
+        )
         serializer = ServicoSerializer(servicos, many=True)
         return Response(serializer.data)
 
@@ -49,18 +64,18 @@ class ServicoListCreateView(APIView):
         request_body=ServicoSerializer,
         responses={
             201: "Serviço criado com sucesso.",
-            400: "Erro de validação, dados inválidos.",
+            400: "Erro de validação, dados inválidos ou imagem inválida.",
         }
     )
     def post(self, request):
-        image_file = request.FILES.get('service_img')
-        if image_file:
-            avatar_url = upload_services_to_supabase(image_file, image_file.name)
-            request.data['image'] = avatar_url
+        image_error = image_upload_error(request.FILES, 'service_img')
+        if image_error:
+            return Response(image_error, status=status.HTTP_400_BAD_REQUEST)
         serializer = ServicoSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(barber=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            servico = serializer.save(barber=request.user)
+            invalidate_public_cache(public_services_key(request.user.id))
+            return Response(with_pending_image(request, servico, serializer.data), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -94,19 +109,19 @@ class ServicoDetailView(APIView):
         request_body=ServicoSerializer,
         responses={
             200: ServicoSerializer,
-            400: "Erro de validação, dados inválidos.",
+            400: "Erro de validação, dados inválidos ou imagem inválida.",
         }
     )
     def put(self, request, pk):
         servico = self.get_object(pk)
-        image_file = request.FILES.get('service_img')
-        if image_file:
-            avatar_url = upload_services_to_supabase(image_file, image_file.name)
-            servico.image = avatar_url
+        image_error = image_upload_error(request.FILES, 'service_img')
+        if image_error:
+            return Response(image_error, status=status.HTTP_400_BAD_REQUEST)
         serializer = ServicoSerializer(servico, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            invalidate_public_cache(public_services_key(request.user.id))
+            return Response(with_pending_image(request, servico, serializer.data))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
@@ -114,20 +129,19 @@ class ServicoDetailView(APIView):
         request_body=ServicoSerializer,
         responses={
             200: ServicoSerializer,
-            400: "Erro de validação, dados inválidos.",
+            400: "Erro de validação, dados inválidos ou imagem inválida.",
         }
     )
     def patch(self, request, pk):
         servico = self.get_object(pk)
-        image_file = request.FILES.get('service_img')
-        if image_file:
-            avatar_url = upload_services_to_supabase(
-                image_file, image_file.name)
-            servico.image = avatar_url
+        image_error = image_upload_error(request.FILES, 'service_img')
+        if image_error:
+            return Response(image_error, status=status.HTTP_400_BAD_REQUEST)
         serializer = ServicoSerializer(servico, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            invalidate_public_cache(public_services_key(request.user.id))
+            return Response(with_pending_image(request, servico, serializer.data))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -141,6 +155,7 @@ class ServicoDetailView(APIView):
         servico = self.get_object(pk)
         servico.is_active = False
         servico.save()
+        invalidate_public_cache(public_services_key(request.user.id))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -162,6 +177,13 @@ class ServicoPublicListView(APIView):
     )
     def get(self, request):
         barber_id = request.query_params.get('barber_id')
-        servicos = Services.objects.filter(barber_id=barber_id, is_active=True)
-        serializer = ServicoSerializer(servicos, many=True)
-        return Response(serializer.data)
+
+        def list_services():
+            servicos = ServicoSerializer.setup_eager_loading(
+                Services.objects.filter(barber_id=barber_id, is_active=True)
+            )
+            return ServicoSerializer(servicos, many=True).data
+
+        if not str(barber_id).isdigit():
+            return Response(list_services())
+        return cached_public_response(request, public_services_key(int(barber_id)), list_services)
@@ -0,0 +1,13 @@
+#!/usr/bin/env bash
+# Exit on error
+set -o errexit
+
+# Background workers run in the same service as the web process: uploads are
+# spooled to the local disk (UPLOAD_SPOOL_DIR), so that worker must share it.
+# The outbox worker sends queued emails (password reset) and purges old ones.
+# Each worker is restarted if it exits.
+(while true; do python manage.py process_uploads --loop || true; sleep 5; done) &
+(while true; do python manage.py send_outbox --loop || true; sleep 5; done) &
+
+# Serve the application (gunicorn binds to 0.0.0.0:$PORT when PORT is set)
+exec gunicorn core.wsgi:application
@@ -0,0 +1,5 @@
+from django.contrib import admin
+from uploads.models import PendingUpload
+
+# Register your models here.
+admin.site.register(PendingUpload)
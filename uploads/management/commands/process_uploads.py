@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils.upload_images_firebase import get_storage
+from uploads.models import PendingUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia ao armazenamento as imagens pendentes no spool e atualiza User.avatar / Services.image. "
+        "Falhas são reagendadas com backoff exponencial. Use --loop para manter o worker em execução."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Quantidade de uploads buscados por lote.')
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novos uploads.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Pausa em segundos quando não há pendentes.')
+
+    def handle(self, *args, **options):
+        storage = get_storage()
+        sent = failed = 0
+
+        while True:
+            # Falhas são reagendadas com backoff e não voltam na mesma passada
+            batch = list(PendingUpload.due()[:options['batch_size']])
+            for upload in batch:
+                # Outro worker pode ter pego o mesmo upload
+                if not upload.claim():
+                    continue
+                if upload.process(storage):
+                    sent += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Upload {upload.id} falhou (tentativa {upload.attempts}): {upload.last_error}')
+
+            if not batch:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'{sent} upload(s) enviado(s), {failed} falha(s).'))
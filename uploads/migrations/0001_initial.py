@@ -0,0 +1,34 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('avatar', 'Avatar do usuário'), ('service_image', 'Imagem do serviço')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('file_name', models.CharField(max_length=255)),
+                ('spool_path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Enviando'), ('done', 'Concluído'), ('failed', 'Falhou'), ('canceled', 'Substituído')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('url', models.CharField(blank=True, default='', max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='upload_status_idx'), models.Index(fields=['kind', 'object_id'], name='upload_target_idx')],
+            },
+        ),
+    ]
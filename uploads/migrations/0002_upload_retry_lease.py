@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pendingupload',
+            name='upload_status_idx',
+        ),
+        migrations.AddField(
+            model_name='pendingupload',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='pendingupload',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='upload_due_idx'),
+        ),
+    ]
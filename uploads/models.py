@@ -0,0 +1,172 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.authentication import invalidate_user_token_cache
+from core.utils.cache import barber_public_keys, invalidate_public_cache, public_services_key
+from core.utils.upload_images_firebase import upload_image_variants
+from services.models import Services
+from users.models import User
+
+
+class PendingUpload(models.Model):
+    """
+    Imagem recebida em uma requisição e guardada no spool local, aguardando o
+    worker `process_uploads` enviá-la ao armazenamento e atualizar o registro.
+    """
+    class Kind(models.TextChoices):
+        AVATAR = 'avatar', 'Avatar do usuário'
+        SERVICE_IMAGE = 'service_image', 'Imagem do serviço'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendente'
+        PROCESSING = 'processing', 'Enviando'
+        DONE = 'done', 'Concluído'
+        FAILED = 'failed', 'Falhou'
+        CANCELED = 'canceled', 'Substituído'
+
+    # Pasta no armazenamento, modelo e campo atualizado por variante para cada tipo
+    TARGETS = {
+        Kind.AVATAR: ('avatar', User, {'full': 'avatar', 'card': 'avatar_card', 'thumbnail': 'avatar_thumbnail'}),
+        Kind.SERVICE_IMAGE: ('services', Services, {'full': 'image', 'card': 'image_card', 'thumbnail': 'image_thumbnail'}),
+    }
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    file_name = models.CharField(max_length=255)
+    spool_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    url = models.CharField(max_length=500, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # O worker busca os uploads devidos em ordem de chegada
+            models.Index(fields=['status', 'next_attempt_at'], name='upload_due_idx'),
+            models.Index(fields=['kind', 'object_id'], name='upload_target_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.object_id} - {self.get_status_display()}'
+
+    @classmethod
+    def enqueue(cls, kind, object_id, image_file):
+        """
+        Grava o arquivo no spool e registra o upload pendente. Uploads ainda
+        pendentes do mesmo registro são substituídos pelo novo.
+        """
+        os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+        file_name = os.path.basename(image_file.name)
+        spool_path = os.path.join(settings.UPLOAD_SPOOL_DIR, f'{uuid.uuid4().hex}_{file_name}')
+        with open(spool_path, 'wb') as output:
+            for chunk in image_file.chunks():
+                output.write(chunk)
+
+        with transaction.atomic():
+            superseded = cls.objects.filter(kind=kind, object_id=object_id, status=cls.Status.PENDING)
+            for upload in superseded.select_for_update():
+                upload.discard_spool_file()
+            superseded.update(status=cls.Status.CANCELED)
+            return cls.objects.create(kind=kind, object_id=object_id, file_name=file_name, spool_path=spool_path)
+
+    def as_pending_state(self):
+        return {'id': self.id, 'status': self.status}
+
+    @classmethod
+    def due(cls):
+        """
+        Uploads prontos para envio, incluindo os que ficaram em `processing` além do
+        prazo (worker interrompido no meio do envio).
+        """
+        return cls.objects.filter(
+            status__in=[cls.Status.PENDING, cls.Status.PROCESSING],
+            next_attempt_at__lte=timezone.now()
+        ).order_by('id')
+
+    def claim(self):
+        """
+        Reserva o upload para este worker por UPLOAD_PROCESSING_TIMEOUT segundos;
+        retorna False se outro worker já o pegou.
+        """
+        lease = timezone.now() + timedelta(seconds=settings.UPLOAD_PROCESSING_TIMEOUT)
+        # O upload precisa estar como foi lido (status e tentativas) e ainda em aberto
+        claimed = PendingUpload.objects.filter(
+            pk=self.pk,
+            status__in=[self.Status.PENDING, self.Status.PROCESSING],
+            status=self.status,
+            attempts=self.attempts
+        ).update(
+            status=self.Status.PROCESSING,
+            attempts=F('attempts') + 1,
+            next_attempt_at=lease
+        )
+        if claimed:
+            self.status = self.Status.PROCESSING
+            self.attempts += 1
+        return bool(claimed)
+
+    def process(self, storage=None):
+        """
+        Envia as variantes do arquivo do spool e aplica as URLs ao registro de destino.
+        Em caso de erro volta para pendente com backoff exponencial até atingir
+        UPLOAD_MAX_ATTEMPTS.
+        """
+        folder, model, variant_fields = self.TARGETS[self.kind]
+        try:
+            with open(self.spool_path, 'rb') as image_file:
+                urls = upload_image_variants(folder, image_file, self.file_name, storage)
+        except Exception as e:
+            self.last_error = str(e)
+            if self.attempts >= settings.UPLOAD_MAX_ATTEMPTS:
+                self.status = self.Status.FAILED
+            else:
+                self.status = self.Status.PENDING
+                delay = min(settings.UPLOAD_RETRY_DELAY * 2 ** (self.attempts - 1), settings.UPLOAD_MAX_RETRY_DELAY)
+                self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            self.save(update_fields=['status', 'last_error', 'next_attempt_at', 'updated_at'])
+            if self.status == self.Status.FAILED:
+                self.discard_spool_file()
+            return False
+
+        with transaction.atomic():
+            # Um upload mais novo já aplicado ao mesmo registro prevalece
+            newer = PendingUpload.objects.filter(
+                kind=self.kind, object_id=self.object_id, id__gt=self.id, status=self.Status.DONE
+            )
+            if not newer.exists():
+                # Sem Pillow só existe a variante full, usada também nas demais
+                model.objects.filter(pk=self.object_id).update(**{
+                    field: urls.get(variant, urls['full']) for variant, field in variant_fields.items()
+                })
+            self.url = urls['full']
+            self.status = self.Status.DONE
+            self.last_error = ''
+            self.save(update_fields=['url', 'status', 'last_error', 'updated_at'])
+            self.clear_target_caches(model)
+
+        self.discard_spool_file()
+        return True
+
+    def clear_target_caches(self, model):
+        if model is User:
+            invalidate_user_token_cache(self.object_id)
+            invalidate_public_cache(*barber_public_keys(self.object_id))
+        else:
+            barber_id = Services.objects.filter(pk=self.object_id).values_list('barber_id', flat=True).first()
+            invalidate_public_cache(public_services_key(barber_id) if barber_id else None)
+
+    def discard_spool_file(self):
+        try:
+            os.remove(self.spool_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from unittest import skipIf
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.utils import images, upload_images_firebase
+from core.utils.upload_images_firebase import FileSystemStorage, StorageBackend, get_storage, get_supabase_client
+from appointments.tests import create_barber, create_service
+from services.models import Services
+from users.models import User
+from .models import PendingUpload
+
+
+def image_content(color='red', size=(800, 600)):
+    """
+    PNG válido quando o Pillow está instalado; caso contrário, bytes quaisquer.
+    """
+    if images.Image is None:
+        return f'imagem {color}'.encode()
+    output = BytesIO()
+    images.Image.new('RGB', size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class FailingStorage(StorageBackend):
+    def upload(self, file_path, image_file):
+        raise Exception('armazenamento indisponível')
+
+    def exists(self, file_path):
+        return False
+
+    def url(self, file_path):
+        return file_path
+
+
+class CountingStorage(FileSystemStorage):
+    def __init__(self):
+        self.uploaded = []
+
+    def upload(self, file_path, image_file):
+        self.uploaded.append(file_path)
+        return super().upload(file_path, image_file)
+
+
+class PendingUploadTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(
+            UPLOAD_STORAGE_BACKEND='core.utils.upload_images_firebase.FileSystemStorage',
+            UPLOAD_STORAGE_ROOT=os.path.join(self.directory, 'storage'),
+            UPLOAD_STORAGE_URL='/storage/',
+            UPLOAD_SPOOL_DIR=os.path.join(self.directory, 'spool'),
+            UPLOAD_MAX_ATTEMPTS=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.barber = create_barber()
+        self.service = create_service(self.barber)
+        self.api = APIClient()
+        self.api.force_authenticate(self.barber)
+
+    def image(self, name='foto.png', color='red'):
+        return SimpleUploadedFile(name, image_content(color), content_type='image/png')
+
+    def test_profile_patch_returns_pending_upload(self):
+        response = self.api.patch('/api/v1/auth/profile/', {'avatar_file': self.image()}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['avatar_upload']['status'], PendingUpload.Status.PENDING)
+        self.assertIsNone(User.objects.get(pk=self.barber.pk).avatar)
+        upload = PendingUpload.objects.get()
+        self.assertTrue(os.path.exists(upload.spool_path))
+
+    def test_non_image_is_rejected_before_enqueue(self):
+        document = SimpleUploadedFile('contrato.pdf', b'%PDF-1.4 nada de imagem', content_type='application/pdf')
+        response = self.api.patch('/api/v1/auth/profile/', {'avatar_file': document}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('avatar_file', response.data)
+
+        document.seek(0)
+        response = self.api.patch(
+            f'/api/v1/services/{self.service.pk}/', {'service_img': document}, format='multipart'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('service_img', response.data)
+        self.assertFalse(PendingUpload.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'spool')))
+
+    def test_worker_uploads_and_patches_target(self):
+        response = self.api.patch(
+            f'/api/v1/services/{self.service.pk}/', {'service_img': self.image()}, format='multipart'
+        )
+        self.assertEqual(response.data['image_upload']['status'], PendingUpload.Status.PENDING)
+
+        call_command('process_uploads', stdout=StringIO())
+
+        upload = PendingUpload.objects.get()
+        image = Services.objects.get(pk=self.service.pk).image
+        self.assertEqual(upload.status, PendingUpload.Status.DONE)
+        self.assertTrue(image.startswith('/storage/services/'))
+        self.assertTrue(Services.objects.get(pk=self.service.pk).image_thumbnail.startswith('/storage/services/'))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'storage', image[len('/storage/'):])))
+        self.assertFalse(os.path.exists(upload.spool_path))
+
+    def test_new_upload_supersedes_pending_one(self):
+        first = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image('a.png'))
+        PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image('b.png'))
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, PendingUpload.Status.CANCELED)
+        self.assertFalse(os.path.exists(first.spool_path))
+
+    def test_failed_upload_is_retried_until_max_attempts(self):
+        upload = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image())
+
+        for expected in (PendingUpload.Status.PENDING, PendingUpload.Status.FAILED):
+            upload.refresh_from_db()
+            self.assertTrue(upload.claim())
+            self.assertFalse(upload.process(FailingStorage()))
+            upload.refresh_from_db()
+            self.assertEqual(upload.status, expected)
+
+        self.assertEqual(upload.attempts, 2)
+        self.assertIn('indisponível', upload.last_error)
+        self.assertFalse(upload.claim())
+
+    def test_failed_upload_waits_for_backoff(self):
+        upload = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image())
+
+        with mock.patch('uploads.management.commands.process_uploads.get_storage', return_value=FailingStorage()):
+            call_command('process_uploads', stdout=StringIO(), stderr=StringIO())
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), (PendingUpload.Status.PENDING, 1))
+        self.assertGreater(upload.next_attempt_at, timezone.now())
+        self.assertFalse(PendingUpload.due().exists())
+
+    def test_stale_processing_upload_is_reclaimed(self):
+        upload = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image())
+        self.assertTrue(upload.claim())
+        self.assertFalse(PendingUpload.due().exists())
+
+        # Worker interrompido: o prazo do envio expira e o upload volta a ser devido
+        PendingUpload.objects.filter(pk=upload.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        call_command('process_uploads', stdout=StringIO())
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), (PendingUpload.Status.DONE, 2))
+        self.assertTrue(User.objects.get(pk=self.barber.pk).avatar.startswith('/storage/avatar/'))
+
+    def test_identical_content_is_uploaded_once(self):
+        storage = CountingStorage()
+        first = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image('a.png'))
+        second = PendingUpload.enqueue(PendingUpload.Kind.SERVICE_IMAGE, self.service.pk, self.image('b.png'))
+        other = PendingUpload.enqueue(PendingUpload.Kind.SERVICE_IMAGE, self.service.pk + 1, self.image('a.png', 'blue'))
+        uploads = (first, second, other)
+        for upload in uploads:
+            upload.claim()
+            upload.process(storage)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        other.refresh_from_db()
+        variants = len(images.build_variant_paths('avatar', 'x', 'a.png'))
+        # Mesmo nome com conteúdo diferente gera outra chave; mesmo conteúdo reaproveita
+        self.assertEqual(len(storage.uploaded), 2 * variants + variants)
+        self.assertNotEqual(first.url.split('/')[-2], other.url.split('/')[-2])
+        self.assertEqual(first.url.split('/')[-2], second.url.split('/')[-2])
+
+    @skipIf(images.Image is None, 'Pillow não instalado')
+    def test_variants_are_resized(self):
+        upload = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, self.barber.pk, self.image())
+        upload.claim()
+        upload.process()
+
+        user = User.objects.get(pk=self.barber.pk)
+        root = os.path.join(self.directory, 'storage')
+        sizes = {}
+        for field in ('avatar_thumbnail', 'avatar_card', 'avatar'):
+            with images.Image.open(os.path.join(root, getattr(user, field)[len('/storage/'):])) as image:
+                sizes[field] = image.size
+        self.assertEqual(sizes, {'avatar_thumbnail': (150, 150), 'avatar_card': (600, 450), 'avatar': (800, 600)})
+
+
+class StorageBackendTest(TestCase):
+    def test_backend_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            StorageBackend()
+
+    @override_settings(UPLOAD_STORAGE_BACKEND='core.utils.upload_images_firebase.FileSystemStorage')
+    def test_storage_instance_is_reused(self):
+        self.assertIs(get_storage(), get_storage())
+        self.assertIsInstance(get_storage(), FileSystemStorage)
+
+    def test_supabase_client_is_created_once_across_threads(self):
+        self.addCleanup(setattr, upload_images_firebase, '_client', None)
+        upload_images_firebase._client = None
+        clients = []
+        with mock.patch.object(upload_images_firebase, 'create_client', return_value=object()) as create_client:
+            threads = [threading.Thread(target=lambda: clients.append(get_supabase_client())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        create_client.assert_called_once()
+        self.assertEqual(len(set(map(id, clients))), 1)
+
+    def test_filesystem_storage_copies_file_in_chunks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        content = os.urandom(3 * 64 * 1024 + 17)
+        source = os.path.join(directory, 'origem.png')
+        with open(source, 'wb') as output:
+            output.write(content)
+
+        with override_settings(UPLOAD_STORAGE_ROOT=os.path.join(directory, 'storage'), UPLOAD_STORAGE_URL='/storage/'):
+            with open(source, 'rb') as image_file:
+                url = FileSystemStorage().upload('services/destino.png', image_file)
+
+        self.assertEqual(url, '/storage/services/destino.png')
+        with open(os.path.join(directory, 'storage', 'services', 'destino.png'), 'rb') as stored:
+            self.assertEqual(stored.read(), content)
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from users.models import User, Rating
+from users.models import User, Rating, BarberStats
 
 # Register your models here.
 admin.site.register(User)
 admin.site.register(Rating)
+admin.site.register(BarberStats)
@@ -0,0 +1,63 @@
+"""
+Programa de fidelidade: a cada REWARD_THRESHOLD atendimentos pagos o cliente ganha
+um agendamento gratuito.
+
+O saldo fica em User.confirmed_appointments_count e só é alterado por UPDATEs com
+expressões F() que tocam apenas essa coluna, então atendimentos e resgates
+simultâneos do mesmo cliente não perdem incrementos nem resgatam duas vezes.
+"""
+from django.db.models import F
+
+from core.authentication import invalidate_user_token_cache
+from users.models import User
+
+REWARD_THRESHOLD = 5
+
+
+def add_visits(client_id, count=1):
+    """
+    Soma `count` atendimentos ao saldo do cliente.
+    """
+    if not count:
+        return
+    User.objects.filter(pk=client_id).update(confirmed_appointments_count=F('confirmed_appointments_count') + count)
+    invalidate_user_token_cache(client_id)
+
+
+def remove_visit(client_id):
+    """
+    Desfaz um atendimento (agendamento que deixou de estar atendido), sem deixar o saldo negativo.
+    """
+    if User.objects.filter(pk=client_id, confirmed_appointments_count__gt=0).update(
+        confirmed_appointments_count=F('confirmed_appointments_count') - 1
+    ):
+        invalidate_user_token_cache(client_id)
+
+
+def redeem_reward(client_id):
+    """
+    Resgata um agendamento gratuito se o saldo alcançou o limite.
+
+    O UPDATE condicional só afeta a linha enquanto houver saldo, então entre
+    resgates concorrentes apenas um consome a recompensa. Atendimentos além do
+    limite continuam no saldo.
+    """
+    redeemed = User.objects.filter(pk=client_id, confirmed_appointments_count__gte=REWARD_THRESHOLD).update(
+        confirmed_appointments_count=F('confirmed_appointments_count') - REWARD_THRESHOLD
+    )
+    if redeemed:
+        invalidate_user_token_cache(client_id)
+    return bool(redeemed)
+
+
+def reward_status(count):
+    """
+    Situação do programa para um saldo de atendimentos.
+    """
+    reward_available = count >= REWARD_THRESHOLD
+    return {
+        "completed_appointments": count,
+        "reward_threshold": REWARD_THRESHOLD,
+        "reward_available": reward_available,
+        "remaining_for_next_reward": 0 if reward_available else REWARD_THRESHOLD - count,
+    }
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from appointments.models import Appointment
+from users.models import BarberDailyStats, BarberStats, Rating
+
+COUNTER_FIELDS = ('pending_count', 'confirmed_count', 'canceled_count', 'completed_count', 'revenue')
+RATING_FIELDS = ('rating_sum', 'rating_count')
+
+
+def empty_counters(fields=COUNTER_FIELDS):
+    return {field: Decimal('0') if field == 'revenue' else 0 for field in fields}
+
+
+def live_aggregates():
+    """
+    Calcula os consolidados diretamente dos agendamentos e avaliações.
+    Retorna os totais por barbeiro e os totais por (barbeiro, dia).
+    """
+    lifetime = defaultdict(lambda: empty_counters(COUNTER_FIELDS + RATING_FIELDS))
+    daily = defaultdict(empty_counters)
+
+    rows = Appointment.objects.annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    ).values('barber_id', 'day', 'status').annotate(
+        total=Count('id'),
+        revenue=Sum('price', filter=Q(status=Appointment.Status.COMPLETED))
+    ).order_by()
+
+    for row in rows:
+        for counters in (lifetime[row['barber_id']], daily[(row['barber_id'], row['day'])]):
+            counters[f"{row['status']}_count"] += row['total']
+            counters['revenue'] += row['revenue'] or 0
+
+    ratings = Rating.objects.values('barber_id').annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id')
+    ).order_by()
+
+    for row in ratings:
+        lifetime[row['barber_id']]['rating_sum'] = row['rating_sum']
+        lifetime[row['barber_id']]['rating_count'] = row['rating_count']
+
+    return lifetime, daily
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói do zero o consolidado de estatísticas dos barbeiros (BarberStats e "
+        "BarberDailyStats) e confere o resultado com os agregados atuais. Execute em "
+        "horário de pouco movimento: agendamentos salvos durante a reconstrução podem divergir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Apenas compara o consolidado com os agregados atuais, sem reescrevê-lo.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            self.rebuild()
+
+        mismatches = self.verify()
+        if mismatches:
+            for mismatch in mismatches:
+                self.stderr.write(mismatch)
+            raise CommandError(f'{len(mismatches)} divergência(s) encontrada(s) no consolidado.')
+
+        self.stdout.write(self.style.SUCCESS('Consolidado confere com os agregados atuais.'))
+
+    def rebuild(self):
+        lifetime, daily = live_aggregates()
+
+        with transaction.atomic():
+            BarberDailyStats.objects.all().delete()
+            BarberStats.objects.all().delete()
+            BarberStats.objects.bulk_create(
+                [BarberStats(barber_id=barber_id, **counters) for barber_id, counters in lifetime.items()],
+                batch_size=1000
+            )
+            BarberDailyStats.objects.bulk_create(
+                [
+                    BarberDailyStats(barber_id=barber_id, day=day, **counters)
+                    for (barber_id, day), counters in daily.items()
+                ],
+                batch_size=1000
+            )
+
+        self.stdout.write(
+            f'Consolidado reconstruído: {len(lifetime)} barbeiro(s), {len(daily)} balde(s) diário(s).'
+        )
+
+    def verify(self):
+        lifetime, daily = live_aggregates()
+        mismatches = []
+
+        stored = {
+            row['barber_id']: row
+            for row in BarberStats.objects.values('barber_id', *COUNTER_FIELDS, *RATING_FIELDS)
+        }
+        for barber_id in set(stored) | set(lifetime):
+            expected = lifetime.get(barber_id, empty_counters(COUNTER_FIELDS + RATING_FIELDS))
+            actual = stored.get(barber_id, empty_counters(COUNTER_FIELDS + RATING_FIELDS))
+            for field, value in expected.items():
+                if actual[field] != value:
+                    mismatches.append(f'Barbeiro {barber_id}: {field} = {actual[field]}, esperado {value}')
+
+        stored_daily = {
+            (row['barber_id'], row['day']): row
+            for row in BarberDailyStats.objects.values('barber_id', 'day', *COUNTER_FIELDS)
+        }
+        for key in set(stored_daily) | set(daily):
+            expected = daily.get(key, empty_counters())
+            actual = stored_daily.get(key, empty_counters())
+            for field, value in expected.items():
+                if actual[field] != value:
+                    mismatches.append(f'Barbeiro {key[0]} em {key[1]}: {field} = {actual[field]}, esperado {value}')
+
+        return mismatches
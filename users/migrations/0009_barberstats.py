@@ -0,0 +1,47 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_alter_rating_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarberStats',
+            fields=[
+                ('pending_count', models.IntegerField(default=0, verbose_name='Pendentes')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Confirmados')),
+                ('canceled_count', models.IntegerField(default=0, verbose_name='Cancelados')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Atendidos')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+                ('barber', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Soma das avaliações')),
+                ('rating_count', models.IntegerField(default=0, verbose_name='Total de avaliações')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='BarberDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pending_count', models.IntegerField(default=0, verbose_name='Pendentes')),
+                ('confirmed_count', models.IntegerField(default=0, verbose_name='Confirmados')),
+                ('canceled_count', models.IntegerField(default=0, verbose_name='Cancelados')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Atendidos')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+                ('day', models.DateField(verbose_name='Dia')),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+            ],
+            options={
+                'unique_together': {('barber', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_barber_stats(apps, schema_editor):
+    """
+    Popula o consolidado de estatísticas a partir dos agendamentos e avaliações existentes.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Rating = apps.get_model('users', 'Rating')
+    BarberStats = apps.get_model('users', 'BarberStats')
+    BarberDailyStats = apps.get_model('users', 'BarberDailyStats')
+
+    lifetime = defaultdict(lambda: defaultdict(int))
+    daily = defaultdict(lambda: defaultdict(int))
+
+    rows = Appointment.objects.annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    ).values('barber_id', 'day', 'status').annotate(
+        total=Count('id'),
+        revenue=Sum('price', filter=Q(status='completed'))
+    ).order_by()
+
+    for row in rows:
+        for counters in (lifetime[row['barber_id']], daily[(row['barber_id'], row['day'])]):
+            counters[f"{row['status']}_count"] += row['total']
+            counters['revenue'] += row['revenue'] or 0
+
+    ratings = Rating.objects.values('barber_id').annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id')
+    ).order_by()
+
+    for row in ratings:
+        lifetime[row['barber_id']]['rating_sum'] = row['rating_sum']
+        lifetime[row['barber_id']]['rating_count'] = row['rating_count']
+
+    BarberStats.objects.bulk_create(
+        [BarberStats(barber_id=barber_id, **counters) for barber_id, counters in lifetime.items()],
+        batch_size=1000
+    )
+    BarberDailyStats.objects.bulk_create(
+        [BarberDailyStats(barber_id=barber_id, day=day, **counters) for (barber_id, day), counters in daily.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_barberstats'),
+        ('appointments', '0003_alter_appointment_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_barber_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-17 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_backfill_barberstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_card',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Avatar (card)'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Avatar (miniatura)'),
+        ),
+    ]
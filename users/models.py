@@ -1,5 +1,11 @@
+from collections import Counter, defaultdict
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.utils.cache import barber_public_keys, invalidate_public_cache
 
 class User(AbstractUser):
     class Perfil(models.TextChoices):
@@ -16,6 +22,8 @@ class User(AbstractUser):
 
     whatsapp = models.CharField(max_length=20, blank=True, null=True, verbose_name="WhatsApp")
     avatar = models.CharField(max_length=255, blank=True, null=True, verbose_name="Avatar")
+    avatar_thumbnail = models.CharField(max_length=255, blank=True, null=True, verbose_name="Avatar (miniatura)")
+    avatar_card = models.CharField(max_length=255, blank=True, null=True, verbose_name="Avatar (card)")
     pix_key = models.CharField(max_length=100, blank=True, null=True, verbose_name="Chave Pix")
     city = models.CharField(max_length=20, choices=Cidade.choices,blank=True,null=True,verbose_name="Cidade")
     confirmed_appointments_count = models.PositiveIntegerField(default=0, verbose_name="Agendamentos Confirmados para recompensa")
@@ -48,7 +56,18 @@ class Rating(models.Model):
         if self.barber.profile_type != User.Perfil.BARBER:
             raise ValueError('Apenas barbeiros podem ser avaliados')
 
-        super().save(*args, **kwargs)
+        previous_rating = None
+        if self.pk:
+            previous_rating = Rating.objects.filter(pk=self.pk).values_list('rating', flat=True).first()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_rating is None:
+                BarberStats.increment({'barber_id': self.barber_id}, rating_sum=self.rating, rating_count=1)
+            elif previous_rating != self.rating:
+                BarberStats.increment({'barber_id': self.barber_id}, rating_sum=self.rating - previous_rating)
+
+        invalidate_public_cache(*barber_public_keys(self.barber_id))
 
     @staticmethod
     def get_average_rating(barber):
@@ -56,9 +75,111 @@ class Rating(models.Model):
         Retorna a média de avaliações de um barbeiro
         O valor retornado será entre 0 e 5
         """
-        ratings = Rating.objects.filter(barber=barber)
-        if not ratings.exists():
+        return BarberStats.for_barber(barber).average_rating
+
+
+class BarberStatsBase(models.Model):
+    """
+    Contadores por status e faturamento compartilhados pelos consolidados do barbeiro.
+    """
+    pending_count = models.IntegerField(default=0, verbose_name='Pendentes')
+    confirmed_count = models.IntegerField(default=0, verbose_name='Confirmados')
+    canceled_count = models.IntegerField(default=0, verbose_name='Cancelados')
+    completed_count = models.IntegerField(default=0, verbose_name='Atendidos')
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Faturamento')
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def increment(cls, lookup, **deltas):
+        """
+        Soma os deltas às colunas com expressões F(), criando a linha caso ainda não exista.
+        """
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+
+        if cls.objects.filter(**lookup).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**lookup)
+        except IntegrityError:
+            # Outra transação criou a linha primeiro
+            pass
+        cls.objects.filter(**lookup).update(**changes)
+
+
+class BarberStats(BarberStatsBase):
+    """
+    Consolidado histórico do barbeiro, mantido incrementalmente pelos métodos
+    save() de Appointment e Rating para que o painel seja uma leitura O(1).
+    """
+    barber = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name='Barbeiro')
+    rating_sum = models.IntegerField(default=0, verbose_name='Soma das avaliações')
+    rating_count = models.IntegerField(default=0, verbose_name='Total de avaliações')
+
+    def __str__(self):
+        return f'Estatísticas de {self.barber_id}'
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
             return 0.00
+        return round(self.rating_sum / self.rating_count, 2)
 
-        average = ratings.aggregate(models.Avg('rating'))['rating__avg']
-        return round(average, 2)
+    @staticmethod
+    def for_barber(barber):
+        """
+        Retorna o consolidado do barbeiro ou um consolidado zerado (não salvo).
+        """
+        try:
+            return barber.stats
+        except BarberStats.DoesNotExist:
+            return BarberStats(barber_id=barber.pk)
+
+    @staticmethod
+    def record_appointment_change(barber_id, created_at, previous_status, status, revenue_delta):
+        """
+        Aplica a transição de status de um agendamento ao consolidado histórico
+        e ao balde diário correspondente à data de criação do agendamento.
+        """
+        BarberStats.record_appointment_changes([(barber_id, created_at, previous_status, status, revenue_delta)])
+
+    @staticmethod
+    def record_appointment_changes(changes):
+        """
+        Aplica várias transições de uma vez, somando os deltas por barbeiro e por dia:
+        um UPDATE por consolidado e por balde diário, independente da quantidade.
+        `changes` são tuplas (barber_id, created_at, previous_status, status, revenue_delta).
+        """
+        lifetime = defaultdict(Counter)
+        daily = defaultdict(Counter)
+        for barber_id, created_at, previous_status, status, revenue_delta in changes:
+            deltas = {'revenue': revenue_delta}
+            if previous_status != status:
+                if previous_status:
+                    deltas[f'{previous_status}_count'] = -1
+                deltas[f'{status}_count'] = 1
+            lifetime[barber_id].update(deltas)
+            daily[(barber_id, timezone.localdate(created_at))].update(deltas)
+
+        for barber_id, deltas in lifetime.items():
+            BarberStats.increment({'barber_id': barber_id}, **deltas)
+        for (barber_id, day), deltas in daily.items():
+            BarberDailyStats.increment({'barber_id': barber_id, 'day': day}, **deltas)
+
+
+class BarberDailyStats(BarberStatsBase):
+    """
+    Balde diário das estatísticas do barbeiro, usado na janela móvel de 30 dias.
+    """
+    barber = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats', verbose_name='Barbeiro')
+    day = models.DateField(verbose_name='Dia')
+
+    class Meta:
+        unique_together = ['barber', 'day']
+
+    def __str__(self):
+        return f'Estatísticas de {self.barber_id} em {self.day}'
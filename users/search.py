@@ -0,0 +1,234 @@
+import re
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Lookup, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from core.utils.cache import barber_search_version_key
+from users.models import User
+
+
+# Mesmo limite padrão do operador <% (pg_trgm.word_similarity_threshold)
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """
+    Trigramas no formato do pg_trgm: cada palavra em minúsculas, com dois espaços
+    antes e um depois.
+    """
+    grams = set()
+    for word in WORD_PATTERN.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def substring_rank(name, query):
+    """
+    Posição do trecho buscado no nome: 2 no início de uma palavra, 1 no meio de uma
+    palavra e 0 quando o nome não contém o trecho (mesma regra de `substring_rank_expression`).
+    """
+    name, query = (name or '').lower(), query.lower()
+    if name.startswith(query) or f' {query}' in name:
+        return 2
+    return 1 if query in name else 0
+
+
+class ILike(Lookup):
+    """
+    `lhs ILIKE rhs` sem o UPPER() do icontains do Django, para que o índice GIN
+    gin_trgm_ops de users_user.username atenda o filtro (PostgreSQL).
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def substring_rank_expression(query):
+    return Case(
+        When(Q(username__istartswith=query) | Q(username__icontains=f' {query}'), then=Value(2)),
+        When(username__icontains=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def with_rating(queryset):
+    """
+    Anota a média de avaliações a partir do consolidado BarberStats (0 sem avaliações).
+    """
+    return queryset.annotate(
+        rating=Coalesce(
+            Cast(F('stats__rating_sum'), FloatField()) / NullIf(F('stats__rating_count'), 0),
+            Value(0.0)
+        )
+    )
+
+
+class BarberNameIndex:
+    """
+    Índice invertido de trigramas dos nomes dos barbeiros, mantido em memória no
+    processo. Substitui o pg_trgm quando o banco não é PostgreSQL.
+
+    O índice é reconstruído quando a versão publicada no cache muda (cadastro ou
+    alteração de barbeiro) ou expira (BARBER_SEARCH_INDEX_TIMEOUT).
+    """
+
+    def __init__(self):
+        self.version = None
+        self.postings = {}
+        self.names = {}
+        self.lock = threading.Lock()
+
+    def build(self, rows):
+        postings = {}
+        names = {}
+        for barber_id, username in rows:
+            names[barber_id] = (username or '').lower()
+            for gram in trigrams(username):
+                postings.setdefault(gram, []).append(barber_id)
+        self.postings = postings
+        self.names = names
+
+    def current_version(self):
+        key = barber_search_version_key()
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, settings.BARBER_SEARCH_INDEX_TIMEOUT)
+            version = cache.get(key)
+        return version
+
+    def refresh(self):
+        version = self.current_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(
+                        User.objects.filter(profile_type=User.Perfil.BARBER)
+                        .values_list('id', 'username')
+                        .iterator(chunk_size=2000)
+                    )
+                    self.version = version
+
+    def search(self, query):
+        """
+        Retorna {barber_id: (posição do trecho, similaridade)} dos nomes que contêm o
+        trecho buscado (ver `substring_rank`) ou cuja similaridade passa do limite. A
+        similaridade é a fração dos trigramas da busca presentes no nome, aproximando
+        word_similarity; buscas curtas demais para trigramas contam só com o trecho.
+        """
+        query = query.strip().lower()
+        if not query:
+            return {}
+        self.refresh()
+        grams = trigrams(query)
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        results = {
+            barber_id: (0, count / len(grams))
+            for barber_id, count in hits.items()
+            if count / len(grams) >= WORD_SIMILARITY_THRESHOLD
+        }
+        for barber_id in self.substring_candidates(query):
+            rank = substring_rank(self.names[barber_id], query)
+            if rank:
+                results[barber_id] = (rank, hits[barber_id] / len(grams) if grams else 0.0)
+        return results
+
+    def substring_candidates(self, query):
+        """
+        Barbeiros cujos nomes podem conter o trecho, a partir das listas de trigramas:
+        cada palavra do trecho com 3+ letras exige todos os seus trigramas internos;
+        palavras menores aparecem dentro de algum trigrama. O trecho ainda é
+        conferido no nome (`substring_rank`).
+        """
+        candidates = None
+        for word in WORD_PATTERN.findall(query):
+            if len(word) >= 3:
+                grams = {word[i:i + 3] for i in range(len(word) - 2)}
+                ids = set.intersection(*(set(self.postings.get(gram, ())) for gram in grams))
+            else:
+                ids = {barber_id for gram, posting in self.postings.items() if word in gram for barber_id in posting}
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return candidates or set()
+
+
+barber_name_index = BarberNameIndex()
+
+
+class RankedBarbers:
+    """
+    Resultado da busca do índice em memória: ids já ordenados, carregando do banco
+    apenas os barbeiros da fatia pedida.
+    """
+
+    def __init__(self, queryset, ids):
+        self.queryset = queryset
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        # Iteração completa (listagem sem paginação): um único in_bulk
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        ids = self.ids[index] if isinstance(index, slice) else [self.ids[index]]
+        barbers = self.queryset.in_bulk(ids)
+        items = [barbers[barber_id] for barber_id in ids if barber_id in barbers]
+        return items if isinstance(index, slice) else items[0]
+
+
+def rank_barbers(queryset, query):
+    """
+    Ordena os barbeiros por relevância do nome e, em seguida, pela média de avaliações.
+
+    Nomes que contêm o trecho buscado vêm primeiro (início de palavra antes do meio),
+    como no antigo filtro icontains; em seguida os parecidos, tolerando erros de
+    digitação. No PostgreSQL a busca usa o índice GIN de trigramas (operador <% e
+    ILIKE) e a ordenação fica no banco; nos demais bancos os candidatos vêm do
+    BarberNameIndex.
+    """
+    query = (query or '').strip()
+    if not query:
+        return with_rating(queryset).order_by('-rating', 'id')
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        pattern = f'%{connection.ops.prep_for_like_query(query)}%'
+        return with_rating(queryset).filter(
+            Q(TrigramWordSimilar(F('username'), Value(query))) | Q(ILike(F('username'), Value(pattern)))
+        ).annotate(
+            substring=substring_rank_expression(query),
+            similarity=TrigramWordSimilarity(query, 'username'),
+        ).order_by('-substring', '-similarity', '-rating', 'id')
+
+    scores = barber_name_index.search(query)
+    ratings = {}
+    candidates = list(scores)
+    for start in range(0, len(candidates), 500):
+        ratings.update(
+            with_rating(queryset.filter(id__in=candidates[start:start + 500])).values_list('id', 'rating')
+        )
+    ids = sorted(
+        ratings,
+        key=lambda barber_id: (-scores[barber_id][0], -scores[barber_id][1], -ratings[barber_id], barber_id)
+    )
+    return RankedBarbers(queryset, ids)
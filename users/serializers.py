@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.core.validators import MinLengthValidator
-from .models import User, Rating
+from .models import BarberStats, User
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -38,22 +38,31 @@ class UserSerializer(serializers.ModelSerializer):
             'raw_city',
             'whatsapp',
             'avatar',
+            'avatar_thumbnail',
+            'avatar_card',
             'pix_key',
             'address',
             'confirmed_appointments_count',
             'average_rating',
             'total_ratings'
         )
-        read_only_fields = ('id', 'confirmed_appointments_count')
+        read_only_fields = ('id', 'confirmed_appointments_count', 'avatar_thumbnail', 'avatar_card')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Carrega o consolidado de avaliações na mesma consulta dos usuários.
+        """
+        return queryset.select_related('stats')
 
     def get_average_rating(self, obj):
         if obj.profile_type == User.Perfil.BARBER:
-            return Rating.get_average_rating(obj)
+            return BarberStats.for_barber(obj).average_rating
         return None
 
     def get_total_ratings(self, obj):
         if obj.profile_type == User.Perfil.BARBER:
-            return Rating.objects.filter(barber=obj).count()
+            return BarberStats.for_barber(obj).rating_count
         return None
 
 
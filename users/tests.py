@@ -1,3 +1,338 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment
+from appointments.tests import create_barber, create_client, create_service, create_work_day
+from appointments.transitions import transition_appointment
+from core.authentication import token_cache, token_cache_key, token_digest, user_generation_key
+from users import loyalty
+from users.models import BarberDailyStats, BarberStats, Rating, User
+
+
+class BarberStatsTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+        self.service = create_service(self.barber)
+        self.time_slot = create_work_day(self.barber).time_slots.first()
+
+    def create_appointment(self, **kwargs):
+        return Appointment.objects.create(
+            barber=self.barber,
+            client=self.client_user,
+            service=self.service,
+            time_slot=self.time_slot,
+            price=self.service.price,
+            **kwargs
+        )
+
+    def test_appointment_transitions_update_rollup(self):
+        appointment = self.create_appointment()
+        stats = BarberStats.objects.get(barber=self.barber)
+        self.assertEqual(stats.pending_count, 1)
+
+        appointment.status = Appointment.Status.CONFIRMED
+        appointment.save()
+        appointment.status = Appointment.Status.COMPLETED
+        appointment.save()
+
+        stats.refresh_from_db()
+        self.assertEqual((stats.pending_count, stats.confirmed_count, stats.completed_count), (0, 0, 1))
+        self.assertEqual(stats.revenue, Decimal('30.00'))
+        daily = BarberDailyStats.objects.get(barber=self.barber)
+        self.assertEqual(daily.completed_count, 1)
+        self.assertEqual(daily.revenue, Decimal('30.00'))
+
+        appointment.status = Appointment.Status.CANCELED
+        appointment.save()
+
+        stats.refresh_from_db()
+        self.assertEqual((stats.completed_count, stats.canceled_count), (0, 1))
+        self.assertEqual(stats.revenue, Decimal('0.00'))
+
+    def test_ratings_update_rollup(self):
+        Rating.objects.create(barber=self.barber, client=self.client_user, rating=4)
+        other = create_client(email='outro@teste.com', username='outro')
+        rating = Rating.objects.create(barber=self.barber, client=other, rating=5)
+        rating.rating = 3
+        rating.save()
+
+        stats = BarberStats.objects.get(barber=self.barber)
+        self.assertEqual((stats.rating_sum, stats.rating_count), (7, 2))
+        self.assertEqual(stats.average_rating, 3.5)
+        self.assertEqual(Rating.get_average_rating(self.barber), 3.5)
+
+    def test_rebuild_command_restores_and_verifies_rollup(self):
+        self.create_appointment(status=Appointment.Status.COMPLETED)
+        Rating.objects.create(barber=self.barber, client=self.client_user, rating=5)
+        BarberStats.objects.filter(barber=self.barber).update(completed_count=10, rating_count=0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_barber_stats', verify_only=True, stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_barber_stats', stdout=StringIO())
+
+        stats = BarberStats.objects.get(barber=self.barber)
+        self.assertEqual((stats.completed_count, stats.rating_count), (1, 1))
+        self.assertEqual(stats.revenue, Decimal('30.00'))
+
+
+class BarberListQueryCountTest(TestCase):
+    def test_rating_fields_do_not_add_queries_per_barber(self):
+        client = create_client()
+        api = APIClient()
+        api.force_authenticate(client)
+        for i in range(10):
+            barber = create_barber(email=f'barbeiro{i}@teste.com', username=f'barbeiro{i}')
+            Rating.objects.create(barber=barber, client=client, rating=4)
+
+        with self.assertNumQueries(1):
+            response = api.get('/api/v1/auth/barbers/')
+
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]['average_rating'], 4.0)
+        self.assertEqual(response.data[0]['total_ratings'], 1)
+
+
+class BarberSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_user = create_client()
+        self.carlos = create_barber('carlos@teste.com', username='Carlos Souza')
+        self.carla = create_barber('carla@teste.com', username='Carla Mendes')
+        self.pedro = create_barber('pedro@teste.com', username='Pedro Alves')
+        Rating.objects.create(barber=self.carlos, client=self.client_user, rating=3)
+        Rating.objects.create(barber=self.carla, client=self.client_user, rating=5)
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def search(self, **params):
+        response = self.api.get('/api/v1/auth/barbers/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_results_are_ranked_by_similarity_then_rating(self):
+        self.assertEqual([barber['id'] for barber in self.search(name='carlos')], [self.carlos.id])
+        # Mesma similaridade: desempata pela média de avaliações
+        self.assertEqual([barber['id'] for barber in self.search(name='Carl')], [self.carla.id, self.carlos.id])
+
+    def test_search_tolerates_typos(self):
+        self.assertEqual([barber['id'] for barber in self.search(name='carloss')], [self.carlos.id])
+
+    def test_short_and_mid_word_queries_match_substrings(self):
+        self.assertEqual([barber['id'] for barber in self.search(name='c')], [self.carla.id, self.carlos.id])
+        self.assertEqual([barber['id'] for barber in self.search(name='arlo')], [self.carlos.id])
+        self.assertEqual([barber['id'] for barber in self.search(name='lves')], [self.pedro.id])
+        self.assertEqual([barber['id'] for barber in self.search(name='rlos so')], [self.carlos.id])
+        # Início de palavra ("Alves") vem antes do meio da palavra
+        self.assertEqual(
+            [barber['id'] for barber in self.search(name='a')], [self.pedro.id, self.carla.id, self.carlos.id]
+        )
+
+    def test_search_is_paginated(self):
+        first = self.search(name='carl', page_size=1)
+        second = self.search(name='carl', page_size=1, page=first['next_page'])
+
+        self.assertEqual([barber['id'] for barber in first['results']], [self.carla.id])
+        self.assertTrue(first['has_more'])
+        self.assertEqual([barber['id'] for barber in second['results']], [self.carlos.id])
+        self.assertIsNone(second['next_page'])
+
+    def test_unpaginated_search_loads_barbers_in_one_query(self):
+        for number in range(10):
+            create_barber(f'carlao{number}@teste.com', username=f'Carlao {number}')
+        self.search(name='carl')
+
+        # Médias dos candidatos e um único in_bulk com os barbeiros e seus consolidados
+        with self.assertNumQueries(2):
+            results = self.search(name='carl')
+        self.assertEqual(len(results), 12)
+
+    def test_profile_update_refreshes_the_name_index(self):
+        self.search(name='carlos')
+        barber_api = APIClient()
+        barber_api.force_authenticate(self.carlos)
+        with self.captureOnCommitCallbacks(execute=True):
+            barber_api.patch('/api/v1/auth/profile/', {'username': 'Renato Lima'})
+
+        self.assertEqual([barber['id'] for barber in self.search(name='renato')], [self.carlos.id])
+        self.assertEqual(self.search(name='carlos'), [])
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = create_client()
+        self.token = Token.objects.create(user=self.user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_the_token_query(self):
+        with self.assertNumQueries(1):
+            self.api.get('/api/v1/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/v1/auth/profile/')
+
+        self.assertEqual(response.data['username'], self.user.username)
+        self.assertEqual(token_cache.stats()['local_hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_shared_cache_serves_other_processes(self):
+        self.api.get('/api/v1/auth/profile/')
+        # Simula outro processo: LRU local vazio, cache compartilhado preenchido
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            self.api.get('/api/v1/auth/profile/')
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+    def test_snapshot_leaves_the_password_out(self):
+        self.api.get('/api/v1/auth/profile/')
+        snapshot = cache.get(token_cache_key(token_digest(self.token.key)))
+
+        self.assertNotIn('password', snapshot['user'])
+        self.assertEqual(snapshot['user']['id'], self.user.pk)
+
+    def test_inactive_snapshot_is_rejected(self):
+        self.api.get('/api/v1/auth/profile/')
+        # Snapshot de um usuário desativado em outro processo, ainda no cache
+        key = token_cache_key(token_digest(self.token.key))
+        snapshot = cache.get(key)
+        snapshot['user']['is_active'] = False
+        cache.set(key, snapshot)
+        token_cache.clear()
+
+        response = self.api.get('/api/v1/auth/profile/')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidation_in_another_process_discards_local_snapshot(self):
+        self.api.get('/api/v1/auth/profile/')
+        # Outro processo invalidou o usuário: só a geração compartilhada muda
+        cache.set(user_generation_key(self.user.pk), 'outro-processo')
+
+        with self.assertNumQueries(1):
+            self.api.get('/api/v1/auth/profile/')
+        with self.assertNumQueries(0):
+            self.api.get('/api/v1/auth/profile/')
+
+    def test_profile_update_keeps_columns_changed_since_snapshot(self):
+        self.api.get('/api/v1/auth/profile/')
+        User.objects.filter(pk=self.user.pk).update(confirmed_appointments_count=3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.patch('/api/v1/auth/profile/', {'first_name': 'Novo'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.confirmed_appointments_count), ('Novo', 3))
+
+    def test_profile_update_invalidates_snapshot(self):
+        self.api.get('/api/v1/auth/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.patch('/api/v1/auth/profile/', {'first_name': 'Novo'})
+
+        response = self.api.get('/api/v1/auth/profile/')
+
+        self.assertEqual(response.data['first_name'], 'Novo')
+
+    def test_logout_revokes_cached_token(self):
+        self.api.get('/api/v1/auth/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post('/api/v1/auth/logout/')
+
+        response = self.api.get('/api/v1/auth/profile/')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.assertEqual(self.api.get('/api/v1/auth/token-cache/stats/').status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        cache.clear()
+        token_cache.clear()
+        response = self.api.get('/api/v1/auth/token-cache/stats/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['misses'], 1)
+
+
+class LoyaltyConcurrencyTest(TransactionTestCase):
+    """
+    Atendimentos e resgates simultâneos do mesmo cliente não perdem incrementos
+    nem resgatam a recompensa duas vezes.
+    """
+    workers = 20
+
+    def setUp(self):
+        self.barber = create_barber()
+        self.client_user = create_client()
+
+    def run_in_parallel(self, function, arguments):
+        barrier = threading.Barrier(len(arguments))
+        results = []
+        lock = threading.Lock()
+
+        def attempt(argument):
+            outcome = 'error'
+            try:
+                barrier.wait()
+                for _ in range(100):
+                    try:
+                        outcome = function(argument)
+                        break
+                    except OperationalError:
+                        # O SQLite serializa escritores e recusa a transação concorrente: tenta de novo
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+                with lock:
+                    results.append(outcome)
+
+        threads = [threading.Thread(target=attempt, args=(argument,)) for argument in arguments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_parallel_completions_are_all_counted(self):
+        service = create_service(self.barber)
+        slots = list(create_work_day(self.barber).time_slots.filter(is_active=True)[:self.workers])
+        appointment_ids = [
+            Appointment.objects.create(
+                barber=self.barber, client=self.client_user, service=service,
+                time_slot=slot, status=Appointment.Status.CONFIRMED,
+            ).id
+            for slot in slots
+        ]
+
+        results = self.run_in_parallel(
+            lambda appointment_id: transition_appointment(appointment_id, Appointment.Status.COMPLETED, self.barber)['status'],
+            appointment_ids
+        )
+
+        self.assertEqual(results, [Appointment.Status.COMPLETED] * self.workers)
+        self.client_user.refresh_from_db()
+        self.assertEqual(self.client_user.confirmed_appointments_count, self.workers)
+
+    def test_reward_is_redeemed_once(self):
+        User.objects.filter(pk=self.client_user.pk).update(confirmed_appointments_count=loyalty.REWARD_THRESHOLD + 1)
+
+        results = self.run_in_parallel(lambda _: loyalty.redeem_reward(self.client_user.pk), range(self.workers))
+
+        self.assertEqual(results.count(True), 1)
+        self.client_user.refresh_from_db()
+        self.assertEqual(self.client_user.confirmed_appointments_count, 1)
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from users.views import (
+    AuthTokenCacheStatsView,
     BarberListView, 
     UserLoginView, 
     UserLogoutView, 
@@ -20,4 +21,5 @@ urlpatterns = [
     path('ratings/', RatingView.as_view(), name='rating'),
     path('password-reset/', PasswordResetRequestView.as_view(), name='password-reset'),
     path('password-reset/confirm/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
+    path('token-cache/stats/', AuthTokenCacheStatsView.as_view(), name='token-cache-stats'),
 ]
@@ -6,11 +6,16 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
 from django.conf import settings
 
-from core.utils.upload_images_firebase import upload_avatar_to_supabase
+from core.authentication import invalidate_user_token_cache, token_cache
+from core.pagination import PagePagination
+from core.utils.cache import barber_public_keys, barber_search_version_key, invalidate_public_cache
+from core.utils.images import image_upload_error
+from notifications.models import OutboxEmail
+from uploads.models import PendingUpload
 from users.models import User, Rating
+from users.search import rank_barbers
 from users.serializers import (
     UserLoginSerializer, 
     UserRegistrationSerializer, 
@@ -40,6 +45,8 @@ class UserRegistrationView(APIView):
         if serializer.is_valid():
             user = serializer.save()
             Token.objects.create(user=user)
+            if user.profile_type == User.Perfil.BARBER:
+                invalidate_public_cache(barber_search_version_key())
             return Response({
                 'user': UserSerializer(user).data,
                 'token': user.auth_token.key
@@ -86,6 +93,7 @@ class UserLogoutView(APIView):
     )
     def post(self, request):
         request.user.auth_token.delete()
+        invalidate_user_token_cache(request.user.pk)
         return Response(
             {'detail': 'Logout realizado com sucesso.'},
             status=status.HTTP_200_OK
@@ -114,24 +122,36 @@ class UserProfileView(APIView):
         operation_description="Atualiza o perfil do usuário autenticado, incluindo a imagem de avatar.",
         responses={
             200: "Perfil do usuário atualizado com sucesso.",
+            400: "Erro de validação, dados inválidos ou arquivo que não é imagem.",
             401: "Não autorizado. O usuário precisa estar autenticado.",
         },
         request_body=UserSerializer
     )
     def patch(self, request):
-        image_file = request.FILES.get('avatar_file')
-        if image_file:
-            avatar_url = upload_avatar_to_supabase(image_file, image_file.name)
-            request.data['avatar'] = avatar_url
+        # Arquivos que não são imagem são recusados antes de gravar o perfil
+        image_error = image_upload_error(request.FILES, 'avatar_file')
+        if image_error:
+            return Response(image_error, status=status.HTTP_400_BAD_REQUEST)
+
+        # request.user pode vir do cache de autenticação: grava sobre a linha atual do banco
         serializer = UserSerializer(
-            request.user,
+            User.objects.get(pk=request.user.pk),
             data=request.data,
             partial=True
         )
         print(serializer)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            user = serializer.save()
+            invalidate_user_token_cache(user.id)
+            if user.profile_type == User.Perfil.BARBER:
+                invalidate_public_cache(*barber_public_keys(user.id), barber_search_version_key())
+            data = serializer.data
+            # O avatar é enviado em segundo plano; a resposta indica o upload pendente
+            image_file = request.FILES.get('avatar_file')
+            if image_file:
+                upload = PendingUpload.enqueue(PendingUpload.Kind.AVATAR, user.id, image_file)
+                data = {**data, 'avatar_upload': upload.as_pending_state()}
+            return Response(data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -146,6 +166,9 @@ class UserProfileView(APIView):
         user = request.user
         user.is_active = False 
         user.save(update_fields=["is_active"])
+        invalidate_user_token_cache(user.id)
+        if user.profile_type == User.Perfil.BARBER:
+            invalidate_public_cache(*barber_public_keys(user.id), barber_search_version_key())
         return Response({'detail': 'Perfil deletado com sucesso.'}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -156,14 +179,18 @@ class BarberListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Recupera barbeiros filtrados por cidade e nome",
+        operation_description=(
+            "Recupera barbeiros da cidade do usuário. Com `name`, busca por similaridade do nome "
+            "(tolerante a erros de digitação) ordenada por relevância e avaliação."
+        ),
         manual_parameters=[
             openapi.Parameter(
                 'name',
                 openapi.IN_QUERY,
-                description="Filtrar por nome do barbeiro (busca parcial)",
+                description="Filtrar por nome do barbeiro (busca por similaridade)",
                 type=openapi.TYPE_STRING
-            )
+            ),
+            *PagePagination.swagger_parameters,
         ],
         responses={
             200: UserSerializer(many=True),
@@ -172,10 +199,16 @@ class BarberListView(APIView):
         }
     )
     def get(self, request):
-        barbers = User.objects.filter(profile_type=User.Perfil.BARBER, is_active=True, city=request.user.city)
+        barbers = UserSerializer.setup_eager_loading(
+            User.objects.filter(profile_type=User.Perfil.BARBER, is_active=True, city=request.user.city)
+        )
         name_filter = request.query_params.get('name', '')
-        if name_filter:
-            barbers = barbers.filter(username__icontains=name_filter)
+        paginator = PagePagination()
+        if name_filter or paginator.is_requested(request):
+            barbers = rank_barbers(barbers, name_filter)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(barbers, request, view=self)
+            return paginator.get_paginated_response(UserSerializer(page, many=True).data)
         serializer = UserSerializer(barbers, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -246,9 +279,8 @@ class PasswordResetRequestView(APIView):
         operation_description="Envia um email com link para redefinição de senha",
         request_body=PasswordResetRequestSerializer,
         responses={
-            200: "Email enviado com sucesso",
-            400: "Email não encontrado ou inválido",
-            500: "Erro ao enviar email"
+            200: "Email enfileirado para envio",
+            400: "Email não encontrado ou inválido"
         }
     )
     def post(self, request):
@@ -264,7 +296,7 @@ class PasswordResetRequestView(APIView):
                 # Cria o link de reset
                 reset_url = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
                 
-                # Envia o email
+                # Enfileira o email; o worker send_outbox faz o envio
                 subject = 'Recuperação de Senha - Agenda Barbe'
                 message = f'''
                 Olá {user.username},
@@ -279,13 +311,7 @@ class PasswordResetRequestView(APIView):
                 Equipe Agenda Barbe
                 '''
                 
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=False,
-                )
+                OutboxEmail.enqueue(subject, message, [email])
                 
                 return Response({
                     'detail': 'Email de recuperação enviado com sucesso.'
@@ -324,6 +350,7 @@ class PasswordResetConfirmView(APIView):
                 if default_token_generator.check_token(user, serializer.validated_data['token']):
                     user.set_password(serializer.validated_data['new_password'])
                     user.save()
+                    invalidate_user_token_cache(user.pk)
                     return Response({
                         'detail': 'Senha alterada com sucesso.'
                     })
@@ -339,3 +366,19 @@ class PasswordResetConfirmView(APIView):
                 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class AuthTokenCacheStatsView(APIView):
+    """
+    Exibe os contadores do cache de autenticação por token deste processo.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Retorna tamanho, acertos e falhas do cache de tokens do processo atual (apenas staff).",
+        responses={
+            200: "Contadores do cache de autenticação.",
+            403: "Acesso restrito a administradores.",
+        }
+    )
+    def get(self, request):
+        return Response(token_cache.stats())